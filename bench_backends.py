@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+BENCH BACKENDS
+
+Compare the output cost of the Bokeh and Plotly backends, per figure type,
+over a matrix of dataset sizes (levels × measurements).
+
+The datasets are derived from a real data file: its levels are cycled and
+each level is resampled to the requested number of measurements, then
+prepared as in `lt_analysis.main` (resistivity, events, heatmap grid).
+
+Each figure method is rendered on its own (title + figure + report file),
+and compared with a title-only report:
+
+    build     time of the figure method,
+    serialise time of `write_to_html_file`, minus the title-only report,
+    HTML      bytes of the report, minus the title-only report,
+    peak      peak memory allocated by the figure method and the report
+              writing (tracemalloc, in a separate run).
+
+Plotly converts each figure to HTML in its figure method, Bokeh when the
+report is written: compare `build + serialise` across backends.
+
+    python bench_backends.py                     # 23 levels, 500 and 1500 measurements
+    python bench_backends.py -l 8 23 100 -m 1500 6000 -n 3
+
+The results are printed as a table and rendered as a Bokeh chart in
+`out_python_bench/bench_backends.html`.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import lt_analysis
+from lt_backends import OPTIONAL_STEPS, load_backend
+from lt_events import detect_events
+from lt_resample import interp_rows, resample
+from lt_settings import load_settings
+
+
+# Backends compared (settings sections, see lt_backends.BACKENDS).
+BENCH_BACKENDS = ("BOKEH", "PLOTLY")
+
+# Figure methods benchmarked.
+FIGURE_STEPS = tuple(OPTIONAL_STEPS)
+
+# Metric -> (column title, unit, format).
+METRICS = {
+    "build": ("build", "ms", "{:9.1f}"),
+    "serialise": ("serialise", "ms", "{:9.1f}"),
+    "total": ("build+ser.", "ms", "{:10.1f}"),
+    "html": ("HTML", "kB", "{:9.1f}"),
+    "peak": ("peak mem", "MiB", "{:8.1f}"),
+}
+
+
+def make_dataset(base, level_count, meas_count, settings):
+    """
+    Dataset of `level_count` × `meas_count` derived from the dataset `base`
+    (levels cycled, each level linearly resampled along the measurements).
+    """
+
+    rows = np.arange(level_count) % base["level_count"]
+    index = np.broadcast_to(np.arange(base["meas_count"], dtype=float),
+                            (level_count, base["meas_count"]))
+    new_index = np.linspace(0, base["meas_count"] - 1, meas_count)
+    lt_data = {channel: interp_rows(new_index, index, values[rows])
+               for channel, values in base["lt_data"].items()}
+
+    data = {
+        "lt_data": lt_data,
+        "lt_name": f"bench_{level_count}x{meas_count}",
+        "file_name": base["file_name"],
+        "meas_count": meas_count,
+        "level_count": level_count,
+    }
+    data = lt_analysis.calc_resistivity(data, settings)
+    if settings["EVENTS"]["DO_IT"]:
+        data = detect_events(data, settings)
+    return resample(data, settings)
+
+
+def render(name, settings, data, step, trace=False):
+    """
+    Render the title and `step` (None: title only) with the backend `name`
+    and write the report.
+    Returns `(build s, write s, HTML bytes, peak bytes)`.
+    """
+
+    plt = load_backend(name)(settings, data)
+    plt.title()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if step is not None:
+        getattr(plt, step)()
+    built = time.perf_counter()
+    plt.write_to_html_file()
+    written = time.perf_counter()
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    html = os.path.getsize(settings[name]["OUT_DIR"] + data["lt_name"] + ".html")
+    return built - start, written - built, html, peak
+
+
+def bench(name, settings, data, runs):
+    """`{step: {metric: value}}` of the backend `name` on `data`."""
+
+    # Title-only report, subtracted from the figure reports.
+    base = [render(name, settings, data, None) for _ in range(runs)]
+    base_write = statistics.median(run[1] for run in base)
+    base_html = base[0][2]
+    base_peak = render(name, settings, data, None, trace=True)[3]
+
+    results = {}
+    for step in FIGURE_STEPS:
+        timed = [render(name, settings, data, step) for _ in range(runs)]
+        build = statistics.median(run[0] for run in timed) * 1e3
+        serialise = max(statistics.median(run[1] for run in timed) - base_write, 0) * 1e3
+        results[step] = {
+            "build": build,
+            "serialise": serialise,
+            "total": build + serialise,
+            "html": (timed[0][2] - base_html) / 1e3,
+            "peak": max(render(name, settings, data, step, trace=True)[3] - base_peak,
+                        0) / 2**20,
+        }
+    return results
+
+
+def print_table(results):
+    """ ___ """
+
+    header = f"{'size':>10} {'figure':<27} {'backend':<7}" + "".join(
+        f" {title:>9}" for title, _unit, _fmt in METRICS.values())
+    units = " " * 46 + "".join(f" {unit:>9}" for _title, unit, _fmt in METRICS.values())
+    print(header)
+    print(units)
+    for size, by_backend in results.items():
+        for step in FIGURE_STEPS:
+            for name, by_step in by_backend.items():
+                values = by_step[step]
+                print(f"{size:>10} {step:<27} {name.title():<7}" + "".join(
+                    " " + fmt.format(values[metric]).rjust(9)
+                    for metric, (_title, _unit, fmt) in METRICS.items()))
+        print()
+
+
+def plot_results(results, file_name):
+    """One grouped bar chart per metric: (figure, size) × backend."""
+
+    # Bokeh is only imported when the chart is rendered.
+    # pylint: disable=import-outside-toplevel
+    from bokeh.io import output_file, save
+    from bokeh.layouts import column
+    from bokeh.models import ColumnDataSource, FactorRange
+    from bokeh.plotting import figure
+    from bokeh.transform import dodge
+
+    factors = [(step.removeprefix("plot_"), size)
+               for step in FIGURE_STEPS for size in results]
+    colors = ("#4353c2", "#f76e1a")
+    figures = []
+    for metric, (title, unit, _fmt) in METRICS.items():
+        columns = {"x": factors}
+        for name in BENCH_BACKENDS:
+            columns[name] = [results[size][name][step][metric]
+                             for step in FIGURE_STEPS for size in results]
+        plt = figure(x_range=FactorRange(*factors), title=f"{title} ({unit})",
+                     tools="save, reset, box_zoom, hover",
+                     tooltips=[(name.title(), f"@{name}{{0.0}}") for name in BENCH_BACKENDS],
+                     width=1200, height=350)
+        source = ColumnDataSource(data=columns)
+        width = 0.8 / len(BENCH_BACKENDS)
+        for _i, name in enumerate(BENCH_BACKENDS):
+            offset = (_i - (len(BENCH_BACKENDS) - 1) / 2) * width
+            plt.vbar(x=dodge("x", offset, range=plt.x_range), top=name, width=width * 0.9,
+                     source=source, color=colors[_i % len(colors)], legend_label=name.title())
+        plt.toolbar.logo = None
+        plt.xaxis.major_label_orientation = 0.8
+        plt.y_range.start = 0
+        plt.legend.location = "top_left"
+        figures.append(plt)
+
+    output_file(file_name, title="Bokeh vs Plotly output cost")
+    save(column(children=figures))
+
+
+def main():
+    """___"""
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-f", "--data-file", default="LT01",
+                        help="data file the datasets are derived from")
+    parser.add_argument("-l", "--levels", type=int, nargs="+", default=[23],
+                        help="level counts")
+    parser.add_argument("-m", "--meas", type=int, nargs="+", default=[500, 1500],
+                        help="measurement counts per level")
+    parser.add_argument("-n", "--runs", type=int, default=1,
+                        help="runs per figure (the median is reported)")
+    parser.add_argument("-o", "--out-dir", default="./out_python_bench/",
+                        help="output dir of the chart")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        settings = load_settings(lt_analysis.SETTINGS, overrides=(
+            "GENERAL.SHOW_HTML=false",
+            "GENERAL.HTML_COMPRESSION=[]",
+            f"BOKEH.OUT_DIR='{tmp_dir}/bokeh/'",
+            f"PLOTLY.OUT_DIR='{tmp_dir}/plotly/'",
+        ))
+
+        base = lt_analysis.read_data(args.data_file, settings,
+                                     channels=("Level_mm", "KeithleyTimeStamp",
+                                               "Current_A", "Resistance_ohm"))
+        results = {}
+        for level_count in args.levels:
+            for meas_count in args.meas:
+                size = f"{level_count}x{meas_count}"
+                data = make_dataset(base, level_count, meas_count, settings)
+                results[size] = {name: bench(name, settings, data, args.runs)
+                                 for name in BENCH_BACKENDS}
+                print(f"{size} done.", flush=True)
+
+    print()
+    print_table(results)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    file_name = os.path.join(args.out_dir, "bench_backends.html")
+    plot_results(results, file_name)
+    print(f"Chart written to {file_name}")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+BENCH STARTUP
+
+Measure the cold-start import cost of `lt_analysis` with `python -X importtime`.
+
+Each scenario is run in a fresh interpreter and the cumulative import time
+of the top-level modules is reported, together with the slowest packages.
+
+    python bench_startup.py            # 5 runs per scenario
+    python bench_startup.py -n 10 -t 15
+
+@author         Nicolas Jeanmonod
+@date           2026-10-18
+
+"""
+
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+
+# Scenario name -> code run in a fresh interpreter.
+SCENARIOS = {
+    "lt_analysis (no backend)": "import lt_analysis",
+    "lt_analysis + Bokeh": "import lt_analysis; lt_analysis.load_backend('BOKEH')",
+    "lt_analysis + Plotly": "import lt_analysis; lt_analysis.load_backend('PLOTLY')",
+    "lt_analysis + all backends": (
+        "import lt_analysis\n"
+        "for name in lt_analysis.BACKENDS: lt_analysis.load_backend(name)"
+    ),
+}
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$")
+
+
+def run_importtime(code):
+    """
+    Run `code` under `-X importtime` and return
+    (total cumulative time in µs, {top-level module: cumulative µs}).
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        # Top-level imports have a one-space indentation.
+        if match and len(match.group(3)) == 1:
+            cumulative = int(match.group(2))
+            modules[match.group(4)] = modules.get(match.group(4), 0) + cumulative
+    return sum(modules.values()), modules
+
+
+def main():
+    """___"""
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--runs", type=int, default=5,
+                        help="runs per scenario (the median is reported)")
+    parser.add_argument("-t", "--top", type=int, default=5,
+                        help="slowest top-level imports listed per scenario")
+    args = parser.parse_args()
+
+    for name, code in SCENARIOS.items():
+        runs = [run_importtime(code) for _ in range(args.runs)]
+        totals = [total for total, _ in runs]
+        print(f"{name:<30} median {statistics.median(totals) / 1e3:8.1f} ms"
+              f"   min {min(totals) / 1e3:8.1f} ms")
+        _, modules = min(runs, key=lambda run: run[0])
+        for module, cumulative in sorted(modules.items(),
+                                         key=lambda item: -item[1])[:args.top]:
+            print(f"    {module:<26} {cumulative / 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,6 @@
+"""
+Pytest configuration: the modules are at the root of the repository, which
+pytest adds to `sys.path` because this file is there.
+
+    python -m pytest -q
+"""
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+EXPORT NPZ
+
+"Data only" backend: exports the per-level series prepared for the plots
+into a NumPy `.npz` archive, for dashboards that consume the analysis
+results directly. There is no HTML generation: the arrays are referenced,
+not copied, and written to disk as is.
+
+Content of `<lt_name>.npz`:
+
+    lt_name, meas_count, level_count, level_mm  (level_mm = Level_mm[:, 0])
+    time_s, current_A, resistance_ohm, level_vs_time_mm  (level, meas)
+    resistivity_levels, resistivity_indptr, resistivity_indices,
+    resistivity_values  (valid samples only, see `lt_sparse.SparseRows`)
+
+When R(I) was fitted (see lt_fit), the archive also holds `fit_degree` and
+the per-level `fit_coef` (level, degree + 1, increasing degree, for the
+current in A), `fit_count`, `fit_rms`, `fit_r2`, `fit_current_min` and
+`fit_current_max`.
+
+When the file was processed by chunks (see lt_chunks), the archive also
+holds the per-level statistics of the full-resolution channels, as
+`stats_<channel>_<count | mean | std | min | max>` (level,) arrays.
+
+When the data was resampled (see lt_resample), the archive also holds the
+shared time grid `resampled_time_s` and the `resampled_<channel>`
+(level, time) arrays.
+
+The resistivity of `level_mm[resistivity_levels[i]]` is
+`resistivity_values[resistivity_indptr[i]:resistivity_indptr[i + 1]]`, at
+times `time_s[resistivity_levels[i]][resistivity_indices[...]]`.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-18
+
+"""
+
+
+import logging
+import os
+
+import numpy as np
+
+from lt_metrics import record_written
+
+
+class ExportNpz():
+    """ ___ """
+
+    def __init__(self, settings, data):
+        """ ___ """
+
+        self.__settings = settings
+        self.__data = data
+        self.__arrays = {}
+
+        self.__logger = logging.getLogger(__name__)
+        self.__logger.debug("numpy %s", np.__version__)
+
+    def title(self):
+        """ ___ """
+
+        self.__arrays["lt_name"] = np.asarray(self.__data["lt_name"])
+        self.__arrays["meas_count"] = np.asarray(self.__data["meas_count"])
+        self.__arrays["level_count"] = np.asarray(self.__data["level_count"])
+        self.__arrays["level_mm"] = self.__data["lt_data"]["Level_mm"][:, 0]
+
+        # Full-resolution statistics of the chunked processing.
+        for channel, stats in self.__data.get("stats", {}).items():
+            for key, values in stats.items():
+                self.__arrays[f"stats_{channel}_{key}"] = values
+
+    def plot_current_vs_time(self):
+        """ ___ """
+
+        self.__arrays["time_s"] = self.__data["lt_data"]["KeithleyTimeStamp"]
+        self.__arrays["current_A"] = self.__data["lt_data"]["Current_A"]
+
+    def plot_resistance_vs_time(self):
+        """ ___ """
+
+        self.__arrays["time_s"] = self.__data["lt_data"]["KeithleyTimeStamp"]
+        self.__arrays["resistance_ohm"] = self.__data["lt_data"]["Resistance_ohm"]
+
+    def plot_level_vs_time(self):
+        """ ___ """
+
+        self.__arrays["time_s"] = self.__data["lt_data"]["KeithleyTimeStamp"]
+        self.__arrays["level_vs_time_mm"] = self.__data["lt_data"]["Level_mm"]
+
+    def plot_resistivity_vs_time(self):
+        """ ___ """
+
+        resistivity = self.__data["lt_data"]["resistivity"]
+        self.__arrays["resistivity_levels"] = resistivity.levels
+        self.__arrays["resistivity_indptr"] = resistivity.indptr
+        self.__arrays["resistivity_indices"] = resistivity.indices
+        self.__arrays["resistivity_values"] = resistivity.values
+
+    def plot_resistance_vs_current(self):
+        """ ___ """
+
+        self.__arrays["current_A"] = self.__data["lt_data"]["Current_A"]
+        self.__arrays["resistance_ohm"] = self.__data["lt_data"]["Resistance_ohm"]
+
+        # R(I) fit coefficients.
+        if "fit" in self.__data:
+            fit = self.__data["fit"]
+            self.__arrays["fit_degree"] = np.asarray(fit["degree"])
+            for key in ("coef", "count", "rms", "r2"):
+                self.__arrays[f"fit_{key}"] = fit[key]
+            self.__arrays["fit_current_min"] = fit["x_min"]
+            self.__arrays["fit_current_max"] = fit["x_max"]
+
+    def plot_heatmaps(self):
+        """ ___ """
+
+        # Resampled channels, sharing a single time column.
+        if "resampled" in self.__data:
+            self.__arrays["resampled_time_s"] = self.__data["resampled"]["time"]
+            for channel, values in self.__data["resampled"]["channels"].items():
+                self.__arrays[f"resampled_{channel}"] = values
+
+    def write_to_html_file(self):
+        """ Write the `.npz` archive (the name is the one of the renderer interface). """
+
+        #
+        # Create output dir if it does not exist.
+        #
+        if not os.path.isdir(self.__settings["NPZ"]["OUT_DIR"]):
+            self.__logger.debug("Creating output dir %s",
+                                self.__settings["NPZ"]["OUT_DIR"])
+            os.makedirs(self.__settings["NPZ"]["OUT_DIR"])
+
+        file_name = self.__settings["NPZ"]["OUT_DIR"] + \
+            self.__data["lt_name"] + ".npz"
+
+        # Uncompressed by default: written at disk speed.
+        if self.__settings["NPZ"]["COMPRESSED"]:
+            np.savez_compressed(file_name, **self.__arrays)
+        else:
+            np.savez(file_name, **self.__arrays)
+        record_written(file_name)
@@ -14,13 +14,24 @@ This module shows some basic plotting techniques with Bokeh and Plotly.
 
 
 import logging
+import os
 import numpy as np
 import sys
 import time
-import xml.etree.ElementTree as ET
-
-from plot_bokeh import PlotBokeh
-from plot_plotly import PlotPlotly
+from contextlib import nullcontext
+
+from lt_backends import BACKENDS, do_plots, load_backend, render_steps
+from lt_chunks import process_chunked
+from lt_compare import COMPARE_CHANNELS, CompareAggregate
+from lt_compress import find_data_file
+from lt_events import detect_events
+from lt_fit import fit_resistance
+from lt_index import CHANNELS, read_file, resolve_channels, scan_index, validate_index
+from lt_metrics import METRICS, record_written
+from lt_pipeline import pipeline
+from lt_report import do_plots_incremental
+from lt_resample import resample
+from lt_sparse import SparseRows
 
 
 # User choices.
@@ -36,6 +47,13 @@ SETTINGS = {
         "LOGGING_ENABLED": True,
         "LOGGING_LEVEL": 10,
         "SHOW_HTML": False,
+        "TRACE_PLOTS": True,  # One trace per level and figure.
+        "HEATMAPS": True,  # Level × time heatmaps (the data is resampled, see RESAMPLE).
+        "HTML_COMPRESSION": (),  # Precompressed report siblings, e.g. ("gz", "br").
+        "PREFETCH_DEPTH": 1,  # Files in flight between read/parse/render. 0 = sequential.
+        "RENDER_WORKERS": 0,  # Backends rendered in parallel processes. 0 = in process.
+        "INCREMENTAL": False,  # Only re-render the figures whose inputs changed (see lt_report).
+        "CACHE_DIR": "./.lt_cache/",  # Cached figures of the incremental mode.
         "COLORS": ("#30123b", "#c0f233", "#3c3285", "#dae236", "#4353c2",
                    "#f0cb3a", "#4670e8", "#fbb336", "#438efd", "#fd9229",
                    "#34aaf8", "#f76e1a", "#20c6df", "#ea500d", "#17debf",
@@ -45,14 +63,65 @@ SETTINGS = {
     "BOKEH": {
         "DO_IT": True,
         "TOOLS": "pan, box_zoom, wheel_zoom, save, reset, xzoom_in, xzoom_out",
-        "ALPHA_1": 1,  # 0.1
-        "ALPHA_6": 1,  # 0.6
+        "ALPHA_1": 1.0,  # 0.1
+        "ALPHA_6": 1.0,  # 0.6
         "CIRCLE_SIZE": 3,
+        "HEATMAP_PALETTE": "Turbo256",
         "OUT_DIR": "./out_python_bokeh/",
     },
     "PLOTLY": {
         "DO_IT": True,
+        "HEATMAP_COLORSCALE": "Turbo",
         "OUT_DIR": "./out_python_plotly/",
+    },
+    "EVENTS": {
+        "DO_IT": True,
+        "CHANNELS": ("Current_A", "Resistance_ohm"),
+        "WINDOW": 15,  # Rolling median / MAD window (samples, odd).
+        "GLITCH_SIGMA": 6.0,
+        "STEP_WINDOW": 10,  # Samples averaged on each side of a step.
+        "STEP_SIGMA": 8.0,
+        "REL_FLOOR": 0.02,  # Scale floor, relative to the level peak-to-peak.
+    },
+    "FIT": {
+        "DO_IT": True,  # Polynomial R(I) fit of each level, overlaid on the R(I) plots.
+        "DEGREE": 1,
+        "POINTS": 50,  # Samples of each fitted curve.
+    },
+    "CHUNKED": {
+        "DO_IT": False,  # For acquisitions too long to fit in memory.
+        "CHUNK_SIZE": 65536,  # Measurements processed at once.
+        "DOWNSAMPLE": 10,  # Samples averaged per output sample.
+    },
+    "RESAMPLE": {
+        "DO_IT": False,
+        "CHANNELS": ("Current_A", "Resistance_ohm", "resistivity"),
+        "STEP_S": 0.1,
+        "METHOD": "linear",  # "linear", "nearest" or "bin_mean".
+        "TIME_BASE": "relative",  # Time since level start, or "absolute".
+    },
+    "COMPARE": {
+        "DO_IT": False,
+        "DATA_FILES": ["LT01", "LT30"],  # The first one is the reference.
+        "POINTS": 500,  # Size of the common time grid.
+        "METHOD": "linear",  # See RESAMPLE.
+        "OUT_DIR": "./out_python_compare/",
+        "EXPORT_NPZ": False,  # Also export the aligned channels, differences and ratios.
+    },
+    "NPZ": {
+        "DO_IT": False,
+        "OUT_DIR": "./out_python_npz/",
+        "COMPRESSED": False,
+    },
+    "CATALOG": {
+        "DO_IT": False,  # Update the metadata index of DATA_DIR first (see lt_catalog).
+        "DB_FILE": "./lt_catalog.sqlite",
+        "SELECT": "",  # SQL condition selecting the DATA_FILES, e.g. "he_pressure_max > 1000".
+    },
+    "METRICS": {
+        "DO_IT": False,  # Throughput counters and histograms of the run (see lt_metrics).
+        "OUT_FILE": "./lt_metrics.prom",  # OpenMetrics text file, written at the end.
+        "PORT": 0,  # Also served on http://127.0.0.1:PORT/metrics during the run. 0 = not served.
     }
 }
 # fmt: on
@@ -60,50 +129,91 @@ SETTINGS = {
 # Global variables.
 LOGGER = logging.getLogger(__name__)
 
+# Channels used by the reports and the comparison (Voltage_V is never plotted).
+REPORT_CHANNELS = ("Level_mm", "KeithleyTimeStamp", "Current_A", "Resistance_ohm",
+                   "resistivity")
+
+# Loggers set to GENERAL.LOGGING_LEVEL, besides those of the backends.
+LOGGERS = ("lt_pipeline", "lt_events", "lt_fit", "lt_index", "lt_catalog", "lt_chunks",
+           "lt_report", "lt_shared", "lt_compare", "lt_metrics", "plot_compare")
+
+# Metrics of the run (see lt_metrics), the ones of the backends are in their module.
+BYTES_READ = METRICS.counter("lt_read_bytes", "Bytes of data files read, as stored.", "bytes")
+FILES_PARSED = METRICS.counter("lt_files_parsed", "Data files parsed by read_data.")
+BYTES_PARSED = METRICS.counter("lt_parsed_bytes", "Bytes of XML payload decoded.", "bytes")
+VALUES_PARSED = METRICS.counter("lt_values_parsed", "Values decoded from the data files.")
+PARSE_TIME = METRICS.histogram("lt_parse", "Time to parse a data file (read_data).", "seconds")
+RESISTIVITY_VALUES = METRICS.counter("lt_resistivity_values", "Valid resistivity samples.")
+RESISTIVITY_TIME = METRICS.histogram("lt_resistivity", "Time to calculate the resistivity.",
+                                     "seconds")
+FILES_PROCESSED = METRICS.counter("lt_files_processed", "Data files processed and rendered.")
+RUN_TIME = METRICS.gauge("lt_run_duration", "Duration of the run.", "seconds")
+
+
+def data_file_name(data_file, settings):
+    """
+    The data file may be stored uncompressed (`.xml`) or compressed
+    (`.xml.gz`, `.xml.xz`, `.xml.zst`).
+    """
+
+    return find_data_file(settings["GENERAL"]["DATA_DIR"] + data_file)
 
-def read_data(data_file, settings):
-    """___"""
+
+def read_raw(data_file, settings):
+    """
+    Read the raw bytes of a data file, without parsing them.
+    This is the I/O part of `read_data`, run ahead of time by the pipeline.
+    Compressed files are returned as is: they are decompressed while parsed.
+    """
+
+    with open(data_file_name(data_file, settings), "rb") as _file:
+        raw = _file.read()
+    BYTES_READ.inc(len(raw))
+    return raw
+
+
+@PARSE_TIME.timed
+def read_data(data_file, settings, raw=None, channels=None):
+    """
+    `raw` are the bytes of the file as returned by `read_raw`.
+    If None, the file is read from disk.
+
+    `channels` are the channels to load, by default all the channels of the
+    file. Only these are decoded: the others cost neither time nor memory.
+    Derived channels (`resistivity`) are calculated, their dependencies are
+    loaded automatically (see `lt_index.DERIVED_CHANNELS`).
+    """
 
     LOGGER.debug("Processing %s", data_file)
 
-    file_name = settings["GENERAL"]["DATA_DIR"] + data_file + ".xml"
-    tree = ET.parse(file_name)
-    root = tree.getroot()
-    reshape = True
-    lt_data = {}
-    meas_count = None
-    level_count = None
-    for child in root:
-        if child.tag in ["ID", "HePressure_mbar"]:
-            continue
-
-        #
-        # XML TAGS
-        #
-        # Level_mm
-        # Voltage_V
-        # KeithleyTimeStamp
-        # Current_A
-        # Resistance_ohm
-        #
-        for _elem in root.iter(child.tag):
-
-            meas_count, level_count = _elem.attrib["size"].split(" ")
-            meas_count, level_count = int(meas_count), int(level_count)
-
-            if reshape:
-                lt_data[child.tag] = (
-                    np.asarray(_elem.text.split(" "))
-                    .astype("float64")
-                    .reshape(level_count, meas_count)
-                )
-            else:
-                lt_data[child.tag] = np.asarray(_elem.text.split(" ")).astype("float64")
-
-    if reshape:
+    channels = CHANNELS if channels is None else tuple(channels)
+    file_channels = resolve_channels(channels)
+    file_name = data_file_name(data_file, settings)
+
+    # Cheap pre-scan of the tags, types, sizes and payload offsets, without
+    # decoding any value: a malformed or truncated file fails here.
+    index = scan_index(file_name, raw)
+    meas_count, level_count = validate_index(file_name, index, file_channels)
+
+    #
+    # XML TAGS
+    #
+    # Level_mm
+    # Voltage_V
+    # KeithleyTimeStamp
+    # Current_A
+    # Resistance_ohm
+    #
+    # ID and HePressure_mbar are stored apart, in `data["metadata"]`.
+    #
+    lt_data, metadata = read_file(file_name, index, file_channels, raw)
+    if "KeithleyTimeStamp" in lt_data:
         lt_data["KeithleyTimeStamp"] -= lt_data["KeithleyTimeStamp"][0][0]
-    else:
-        lt_data["KeithleyTimeStamp"] -= lt_data["KeithleyTimeStamp"][0]
+    LOGGER.debug("Channels decoded: %s", ", ".join(file_channels))
+    FILES_PARSED.inc()
+    BYTES_PARSED.inc(sum(index[channel]["end"] - index[channel]["start"]
+                         for channel in file_channels))
+    VALUES_PARSED.inc(meas_count * level_count * len(file_channels))
 
     data = {
         "lt_data": lt_data,
@@ -111,11 +221,15 @@ def read_data(data_file, settings):
         "file_name": file_name,
         "meas_count": meas_count,
         "level_count": level_count,
+        "metadata": metadata,
     }
 
-    if SETTINGS["GENERAL"]["REMOVE_DATA_FOR_FASTER_PROCESSING"]:
+    if settings["GENERAL"]["REMOVE_DATA_FOR_FASTER_PROCESSING"]:
         data = remove_data_for_faster_processing(data)
 
+    if "resistivity" in channels:
+        data = calc_resistivity(data, settings)
+
     return data
 
 
@@ -123,37 +237,39 @@ def remove_data_for_faster_processing(data):
     """___"""
 
     for _i in range(3):
-        data["lt_data"]["Level_mm"] = np.delete(
-            data["lt_data"]["Level_mm"], np.s_[::2], 1
-        )
-        data["lt_data"]["Voltage_V"] = np.delete(
-            data["lt_data"]["Voltage_V"], np.s_[::2], 1
-        )
-        data["lt_data"]["KeithleyTimeStamp"] = np.delete(
-            data["lt_data"]["KeithleyTimeStamp"], np.s_[::2], 1
-        )
-        data["lt_data"]["Current_A"] = np.delete(
-            data["lt_data"]["Current_A"], np.s_[::2], 1
-        )
-        data["lt_data"]["Resistance_ohm"] = np.delete(
-            data["lt_data"]["Resistance_ohm"], np.s_[::2], 1
-        )
-    data["meas_count"] = data["lt_data"]["Level_mm"].shape[1]
+        for channel, values in data["lt_data"].items():
+            data["lt_data"][channel] = np.delete(values, np.s_[::2], 1)
+    data["meas_count"] = next(iter(data["lt_data"].values())).shape[1]
     return data
 
 
+@RESISTIVITY_TIME.timed
 def calc_resistivity(data, settings):
     """___"""
 
-    # Levels equal to or higher than the LT max level are set to NaN.
-    # This is because the resistivity is not defined when `level >= max_level`.
-    filt_levels = np.copy(data["lt_data"]["Level_mm"])
+    # The resistivity is not defined when `level >= max_level`. These samples
+    # are masked out and only the valid ones are stored (see `SparseRows`), so
+    # fully invalid levels never reach the renderers.
+    levels = data["lt_data"]["Level_mm"]
+    resistance = data["lt_data"]["Resistance_ohm"]
     max_level = settings["GENERAL"]["LT_MAX_LEVEL"]
-    filt_levels[filt_levels >= max_level] = np.nan
+    mask = (levels < max_level) & np.isfinite(resistance)
 
-    # Calculate resistivity with filtered levels.
-    data["lt_data"]["resistivity"] = data["lt_data"]["Resistance_ohm"] / (
-        settings["GENERAL"]["LT_MAX_LEVEL"] - filt_levels
+    # Calculate resistivity on valid samples only.
+    data["lt_data"]["resistivity"] = SparseRows.from_mask(
+        resistance[mask] / (max_level - levels[mask]), mask
+    )
+    data["level_masks"] = {
+        "resistivity": data["lt_data"]["resistivity"].level_mask,
+    }
+    RESISTIVITY_VALUES.inc(data["lt_data"]["resistivity"].nnz)
+
+    LOGGER.debug(
+        "Resistivity: %d/%d levels, %d/%d samples valid",
+        len(data["lt_data"]["resistivity"]),
+        data["level_count"],
+        data["lt_data"]["resistivity"].nnz,
+        mask.size,
     )
 
     return data
@@ -185,84 +301,226 @@ def init_logger(settings):
     )
 
     LOGGER.setLevel(settings["GENERAL"]["LOGGING_LEVEL"])
-    logging.getLogger("plot_bokeh").setLevel(settings["GENERAL"]["LOGGING_LEVEL"])
-    logging.getLogger("plot_plotly").setLevel(settings["GENERAL"]["LOGGING_LEVEL"])
+    for module_name, _class_name, _label in BACKENDS.values():
+        logging.getLogger(module_name).setLevel(settings["GENERAL"]["LOGGING_LEVEL"])
+    for logger_name in LOGGERS:
+        logging.getLogger(logger_name).setLevel(settings["GENERAL"]["LOGGING_LEVEL"])
 
     LOGGER.debug("python %s", sys.version.split(" ")[0])
     LOGGER.debug("numpy %s", np.__version__)
 
 
-def plot_with_bokeh(settings, data):
-    """___"""
+def plot_with_backend(name, settings, data):
+    """
+    Render `data` with the backend `name` (see `lt_backends.BACKENDS`).
+    The backend module is only imported when its `DO_IT` setting is True.
+    """
 
-    if not settings["PLOTLY"]["DO_IT"]:
-        LOGGER.debug("Skipping Plotly plot.")
+    label = BACKENDS[name][2]
+    if not settings[name]["DO_IT"]:
+        LOGGER.debug("Skipping %s.", label)
         return
 
     start_time = time.time()
-    plotb = PlotBokeh(settings, data)
-    do_plots(plotb)
+    plt = load_backend(name)(settings, data)
+    if settings["GENERAL"]["INCREMENTAL"] and hasattr(plt, "render_fragment"):
+        do_plots_incremental(name, plt, render_steps(settings), data, settings)
+    else:
+        do_plots(plt, render_steps(settings))
     total_time = time.time() - start_time
-    LOGGER.debug("Bokeh time for %s : %0.1f s", data["lt_name"], total_time)
+    LOGGER.debug("%s time for %s : %0.1f s", label, data["lt_name"], total_time)
 
 
-def plot_with_plotly(settings, data):
-    """___"""
+def init_worker(settings):
+    """Initializer of the render processes."""
+
+    init_logger(settings)
+    METRICS.enable(settings["METRICS"]["DO_IT"])
+
+
+def render_shared(name, settings, descriptor):
+    """
+    `plot_with_backend` in a worker process, on the data published in
+    shared memory by the main process (see lt_shared).
+    Returns the metrics of the rendering, merged by the main process.
+    """
+
+    from lt_shared import attach  # pylint: disable=import-outside-toplevel
 
-    if not settings["BOKEH"]["DO_IT"]:
-        LOGGER.debug("Skipping Bokeh plot.")
+    # Only the metrics of this job: the previous ones were already returned.
+    METRICS.reset()
+    with attach(descriptor) as data:
+        plot_with_backend(name, settings, data)
+    return METRICS.snapshot()
+
+
+def run_comparison(settings):
+    """
+    Compare the files `settings["COMPARE"]["DATA_FILES"]` in a single report.
+    The files are streamed one at a time into the comparison aggregate.
+    """
+
+    if not settings["COMPARE"]["DO_IT"]:
+        LOGGER.debug("Skipping comparison.")
         return
 
     start_time = time.time()
-    plotp = PlotPlotly(settings, data)
-    do_plots(plotp)
-    total_time = time.time() - start_time
-    LOGGER.debug("Plotly time for %s : %0.1f s", data["lt_name"], total_time)
+    aggregate = CompareAggregate(settings["COMPARE"]["POINTS"],
+                                 method=settings["COMPARE"]["METHOD"])
 
+    def load(data_file):
+        return read_data(data_file, settings, read_raw(data_file, settings),
+                         REPORT_CHANNELS)
 
-def do_plots(plt):
-    """___"""
+    for data in pipeline(settings["COMPARE"]["DATA_FILES"], (load,),
+                         settings["GENERAL"]["PREFETCH_DEPTH"]):
+        aggregate.add(data)
+        del data
+
+    # Bokeh is only imported when a comparison is actually rendered.
+    from plot_compare import PlotCompare  # pylint: disable=import-outside-toplevel
 
+    plt = PlotCompare(settings, aggregate)
     plt.title()
-    plt.plot_current_vs_time()
-    plt.plot_resistance_vs_time()
-    plt.plot_level_vs_time()
-    plt.plot_resistivity_vs_time()
-    plt.plot_resistance_vs_current()
+    for channel in COMPARE_CHANNELS:
+        plt.plot_overlay(channel)
+        plt.plot_difference(channel)
+        plt.plot_ratio(channel)
     plt.write_to_html_file()
 
+    if settings["COMPARE"]["EXPORT_NPZ"]:
+        file_name = os.path.join(settings["COMPARE"]["OUT_DIR"],
+                                 "_vs_".join(aggregate.names) + ".npz")
+        np.savez(file_name, **aggregate.to_arrays())
+        record_written(file_name)
+    total_time = time.time() - start_time
+    LOGGER.debug("Comparison time for %s : %0.1f s",
+                 " vs ".join(aggregate.names), total_time)
+
 
-def read_settings():
+def select_data_files(settings):
+    """
+    The files to process: GENERAL.DATA_FILES, or the files of the metadata
+    index matching CATALOG.SELECT. With CATALOG.DO_IT, the index is updated first.
     """
-    In this simple example, the parameters are stored in this file.
-    In a production environment, they would be stored externally.
 
-    TODO: Perform sanity checks.
+    opts = settings["CATALOG"]
+    if not opts["DO_IT"] and not opts["SELECT"]:
+        return settings["GENERAL"]["DATA_FILES"]
+
+    from lt_catalog import Catalog  # pylint: disable=import-outside-toplevel
+
+    with Catalog(opts["DB_FILE"]) as catalog:
+        if opts["DO_IT"]:
+            catalog.update(settings["GENERAL"]["DATA_DIR"])
+        if not opts["SELECT"]:
+            return settings["GENERAL"]["DATA_FILES"]
+        data_dir = os.path.abspath(settings["GENERAL"]["DATA_DIR"])
+        data_files = list(dict.fromkeys(
+            row["name"] for row in catalog.query(opts["SELECT"])
+            if os.path.dirname(row["path"]) == data_dir))
+    LOGGER.debug("Files selected by %r: %s", opts["SELECT"], ", ".join(data_files))
+    return data_files
+
+
+def read_settings(argv=None):
     """
+    The defaults are stored in this file (SETTINGS). They are updated with
+    an optional TOML file (`--config`) and command line overrides
+    (`--set SECTION.KEY=VALUE`), validated once and frozen (see lt_settings).
+    """
+
+    # pylint: disable=import-outside-toplevel
+    import argparse
 
-    settings = SETTINGS
-    return settings
+    from lt_settings import SettingsError, load_settings
 
+    parser = argparse.ArgumentParser(description="LT current test analysis.")
+    parser.add_argument("-c", "--config", help="TOML settings file")
+    parser.add_argument("-s", "--set", dest="overrides", action="append", default=[],
+                        metavar="SECTION.KEY=VALUE", help="override a setting (repeatable)")
+    args = parser.parse_args(argv)
 
-def main():
+    try:
+        return load_settings(SETTINGS, args.config, args.overrides)
+    except SettingsError as error:
+        parser.error(str(error))
+
+
+def main(argv=None):
     """___"""
 
     # Init.
-    settings = read_settings()
+    settings = read_settings(argv)
     init_logger(settings)
+    start_time = time.perf_counter()
+    METRICS.enable(settings["METRICS"]["DO_IT"])
+    server = METRICS.serve(settings["METRICS"]["PORT"]) \
+        if settings["METRICS"]["DO_IT"] and settings["METRICS"]["PORT"] else None
 
-    # Process data files.
-    for data_file in settings["GENERAL"]["DATA_FILES"]:
+    # Pipeline stages. The file N+1 is read while the file N is parsed,
+    # and parsed while the file N is rendered.
+    # In chunked mode, the files are streamed by the parse stage itself.
+    chunked = settings["CHUNKED"]["DO_IT"]
 
-        # Read data and calculate resistivity.
-        data = read_data(data_file, settings)
-        data = calc_resistivity(data, settings)
+    def read_stage(data_file):
+        return data_file, None if chunked else read_raw(data_file, settings)
 
-        # Plot with Plotly.
-        plot_with_plotly(settings, data)
+    def parse_stage(item):
+        # Read data and calculate resistivity.
+        data_file, raw = item
+        if chunked:
+            data = process_chunked(data_file, data_file_name(data_file, settings), settings)
+        else:
+            data = read_data(data_file, settings, raw, REPORT_CHANNELS)
+        if settings["EVENTS"]["DO_IT"]:
+            data = detect_events(data, settings)
+        if settings["FIT"]["DO_IT"]:
+            data = fit_resistance(data, settings)
+        if settings["RESAMPLE"]["DO_IT"] or settings["GENERAL"]["HEATMAPS"]:
+            data = resample(data, settings)
+        return data
+
+    # Optional pool of render processes.
+    workers = settings["GENERAL"]["RENDER_WORKERS"]
+    if workers:
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ProcessPoolExecutor
+
+        from lt_shared import publish
+        pool = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(settings,))
+    else:
+        pool = nullcontext()
 
-        # Plot with Bokeh.
-        plot_with_bokeh(settings, data)
+    # Process data files.
+    with pool:
+        for data in pipeline(select_data_files(settings),
+                             (read_stage, parse_stage),
+                             settings["GENERAL"]["PREFETCH_DEPTH"]):
+
+            # Render with each backend (Plotly, Bokeh, data export...).
+            FILES_PROCESSED.inc()
+            if not workers:
+                for name in BACKENDS:
+                    plot_with_backend(name, settings, data)
+                continue
+
+            # The workers share the arrays of `data` instead of a pickled copy.
+            with publish(data) as descriptor:
+                futures = [pool.submit(render_shared, name, settings, descriptor)
+                           for name in BACKENDS if settings[name]["DO_IT"]]
+                for future in futures:
+                    METRICS.merge(future.result())
+
+    # Cross-file comparison report.
+    run_comparison(settings)
+
+    # Metrics of the run, e.g. files/s = lt_files_processed_total / lt_run_duration_seconds.
+    if settings["METRICS"]["DO_IT"]:
+        RUN_TIME.set(time.perf_counter() - start_time)
+        METRICS.write(settings["METRICS"]["OUT_FILE"])
+    if server is not None:
+        server.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT BACKENDS
+
+Renderer interface and registry of the output backends.
+
+A backend is a class built with `(settings, data)` that implements the
+`Renderer` protocol. `do_plots` calls its methods in the order of
+`RENDER_STEPS`. Backends are registered by settings section name, and their
+module is only imported the first time they are used (Bokeh and Plotly are
+slow to import).
+
+@author         Nicolas Jeanmonod
+@date           2026-10-18
+
+"""
+
+
+import importlib
+from typing import Protocol, runtime_checkable
+
+from lt_metrics import METRICS
+
+
+@runtime_checkable
+class Renderer(Protocol):
+    """Interface implemented by the output backends."""
+
+    def title(self):
+        """Report title / header."""
+
+    def plot_current_vs_time(self):
+        """I(t) for each level."""
+
+    def plot_resistance_vs_time(self):
+        """R(t) for each level."""
+
+    def plot_level_vs_time(self):
+        """L(t) for each level."""
+
+    def plot_resistivity_vs_time(self):
+        """ϱ(t) for each level with a defined resistivity."""
+
+    def plot_resistance_vs_current(self):
+        """R(I) for each level."""
+
+    def plot_heatmaps(self):
+        """Level × time heatmaps of the resampled channels."""
+
+    def write_to_html_file(self):
+        """Write the report (HTML, or the data file of export backends)."""
+
+
+# Methods called by `do_plots`, in order.
+RENDER_STEPS = (
+    "title",
+    "plot_current_vs_time",
+    "plot_resistance_vs_time",
+    "plot_level_vs_time",
+    "plot_resistivity_vs_time",
+    "plot_resistance_vs_current",
+    "plot_heatmaps",
+    "write_to_html_file",
+)
+
+# Optional steps: step -> GENERAL setting enabling it.
+# The per-level trace figures grow with the number of levels, the heatmaps don't.
+OPTIONAL_STEPS = {
+    "plot_current_vs_time": "TRACE_PLOTS",
+    "plot_resistance_vs_time": "TRACE_PLOTS",
+    "plot_level_vs_time": "TRACE_PLOTS",
+    "plot_resistivity_vs_time": "TRACE_PLOTS",
+    "plot_resistance_vs_current": "TRACE_PLOTS",
+    "plot_heatmaps": "HEATMAPS",
+}
+
+# Data each figure step depends on (dotted paths in the data dict), see lt_report.
+# The settings they depend on are specific to each backend (`INPUTS`).
+FIGURE_DATA = {
+    "title": ("lt_name",),
+    "plot_current_vs_time": ("lt_name", "lt_data.KeithleyTimeStamp", "lt_data.Current_A",
+                             "lt_data.Level_mm", "events.Current_A"),
+    "plot_resistance_vs_time": ("lt_name", "lt_data.KeithleyTimeStamp",
+                                "lt_data.Resistance_ohm", "lt_data.Level_mm",
+                                "events.Resistance_ohm"),
+    "plot_level_vs_time": ("lt_name", "lt_data.KeithleyTimeStamp", "lt_data.Level_mm"),
+    "plot_resistivity_vs_time": ("lt_name", "lt_data.KeithleyTimeStamp",
+                                 "lt_data.resistivity", "lt_data.Level_mm"),
+    "plot_resistance_vs_current": ("lt_name", "lt_data.Current_A", "lt_data.Resistance_ohm",
+                                   "lt_data.Level_mm", "fit"),
+    "plot_heatmaps": ("lt_name", "lt_data.Level_mm", "resampled"),
+}
+
+# Data each heatmap depends on, besides its own `resampled.channels.<channel>`.
+HEATMAP_DATA = ("lt_name", "lt_data.Level_mm", "resampled.time", "resampled.time_base")
+
+# Time of each render step, by backend class and step, see lt_metrics.
+RENDER_TIME = METRICS.histogram("lt_render", "Time of a render step.", "seconds")
+
+# Backends, by settings section: (module, class, label).
+# The settings section holds at least `DO_IT`.
+BACKENDS = {
+    "PLOTLY": ("plot_plotly", "PlotPlotly", "Plotly"),
+    "BOKEH": ("plot_bokeh", "PlotBokeh", "Bokeh"),
+    "NPZ": ("export_npz", "ExportNpz", "NPZ export"),
+}
+
+
+def register_backend(name, module_name, class_name, label=None):
+    """
+    Register the backend `class_name` of `module_name` under the settings
+    section `name`. The module is only imported by `load_backend`, which
+    checks that the class implements `Renderer`.
+    """
+
+    BACKENDS[name] = (module_name, class_name, label or name.title())
+
+
+def load_backend(name) -> type[Renderer]:
+    """
+    Import the module of the backend `name` (a key of BACKENDS) and return
+    its class. Raises TypeError if it does not implement `Renderer`.
+    """
+
+    module_name, class_name, _label = BACKENDS[name]
+    backend = getattr(importlib.import_module(module_name), class_name)
+    if not isinstance(backend, type) or not issubclass(backend, Renderer):
+        missing = [step for step in RENDER_STEPS if not callable(getattr(backend, step, None))]
+        raise TypeError(f"Backend {name} ({module_name}.{class_name}) does not implement "
+                        f"the Renderer protocol: missing {', '.join(missing) or 'class'}.")
+    return backend
+
+
+def render_steps(settings):
+    """The steps of RENDER_STEPS enabled in `settings`."""
+
+    return tuple(step for step in RENDER_STEPS
+                 if step not in OPTIONAL_STEPS
+                 or settings["GENERAL"][OPTIONAL_STEPS[step]])
+
+
+def do_plots(plt: Renderer, steps=RENDER_STEPS):
+    """___"""
+
+    for step in steps:
+        with RENDER_TIME.time(backend=type(plt).__name__, step=step):
+            getattr(plt, step)()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT CATALOG
+
+Persistent metadata index (SQLite) of the data files of a directory:
+ID, He pressure, file hash, dimensions and summary statistics, one row per
+file. Campaign queries ("all tests of magnet X", "all runs above pressure
+P") and the selection of the files to process then run on the index
+instead of parsing every XML file.
+
+The index is updated incrementally: a file whose size and modification
+time did not change is skipped, a file whose content hash did not change
+is not parsed again, and the rows of deleted files are removed. The files
+that could not be read are recorded with their error in the `failures`
+table, and skipped as well until they change.
+
+    python lt_catalog.py update
+    python lt_catalog.py query "id LIKE 'HCQILEFBSC-%' AND he_pressure_max > 1000"
+    python lt_catalog.py query --names "level_count = 23"
+
+In `lt_analysis`, set `CATALOG.DO_IT = True` to update the index before
+processing, and `CATALOG.SELECT` to an SQL condition to select the
+`DATA_FILES` from it.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from lt_compress import DATA_SUFFIXES, decode_errors
+from lt_index import LTFormatError, read_file, scan_index, validate_index
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Bytes hashed at once.
+HASH_BLOCK_SIZE = 1 << 20
+
+# Channels summarised in the index (min / max columns).
+STATS_CHANNELS = {"Level_mm": "level", "Current_A": "current", "Resistance_ohm": "resistance"}
+
+# Columns of the `files` table, after `path`.
+COLUMNS = {
+    "name": "TEXT NOT NULL",  # Data file name, as in DATA_FILES (e.g. LT01).
+    "size": "INTEGER NOT NULL",
+    "mtime_ns": "INTEGER NOT NULL",
+    "sha256": "TEXT NOT NULL",
+    "id": "TEXT",
+    "meas_count": "INTEGER",
+    "level_count": "INTEGER",
+    "duration_s": "REAL",
+    "he_pressure_min": "REAL",
+    "he_pressure_mean": "REAL",
+    "he_pressure_max": "REAL",
+    **{f"{prefix}_{stat}": "REAL" for prefix in STATS_CHANNELS.values()
+       for stat in ("min", "max")},
+    "indexed_at": "REAL NOT NULL",
+}
+
+# Columns of the `failures` table (files that could not be indexed), after `path`.
+FAILURE_COLUMNS = {
+    "name": "TEXT NOT NULL",
+    "size": "INTEGER NOT NULL",
+    "mtime_ns": "INTEGER NOT NULL",
+    "sha256": "TEXT NOT NULL",
+    "error": "TEXT NOT NULL",
+    "failed_at": "REAL NOT NULL",
+}
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, "
+    + ", ".join(f"{column} {decl}" for column, decl in COLUMNS.items()) + ")",
+    "CREATE TABLE IF NOT EXISTS failures (path TEXT PRIMARY KEY, "
+    + ", ".join(f"{column} {decl}" for column, decl in FAILURE_COLUMNS.items()) + ")",
+    "CREATE INDEX IF NOT EXISTS files_id ON files (id)",
+    "CREATE INDEX IF NOT EXISTS files_name ON files (name)",
+    "CREATE INDEX IF NOT EXISTS files_he_pressure ON files (he_pressure_max)",
+)
+
+
+def data_name(file_name):
+    """`./data/LT01.xml.gz` -> `LT01`, None for other files."""
+
+    base = os.path.basename(file_name)
+    for suffix in DATA_SUFFIXES:
+        if base.endswith(suffix):
+            return base[:-len(suffix)]
+    return None
+
+
+def file_hash(file_name):
+    """SHA-256 of the file content, as stored (compressed or not)."""
+
+    digest = hashlib.sha256()
+    with open(file_name, "rb") as _file:
+        for block in iter(lambda: _file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _finite_stats(values):
+    """(min, mean, max) of the finite values, None when there are none."""
+
+    values = values[np.isfinite(values)]
+    if not values.size:
+        return None, None, None
+    return float(values.min()), float(values.mean()), float(values.max())
+
+
+def file_metadata(file_name):
+    """
+    Metadata row of a data file (the columns of COLUMNS that depend on the
+    content). Only the metadata and the summarised channels are decoded.
+    """
+
+    index = scan_index(file_name)
+    channels = tuple(STATS_CHANNELS) + ("KeithleyTimeStamp",)
+    meas_count, level_count = validate_index(file_name, index, channels)
+    lt_data, metadata = read_file(file_name, index, channels)
+
+    row = {
+        "id": metadata["id"],
+        "meas_count": meas_count,
+        "level_count": level_count,
+    }
+    time_s = lt_data["KeithleyTimeStamp"]
+    row["duration_s"] = float(np.nanmax(time_s) - np.nanmin(time_s)) if time_s.size else None
+    pressure = metadata["he_pressure_mbar"]
+    (row["he_pressure_min"], row["he_pressure_mean"],
+     row["he_pressure_max"]) = _finite_stats(pressure if pressure is not None else np.empty(0))
+    for channel, prefix in STATS_CHANNELS.items():
+        row[f"{prefix}_min"], _mean, row[f"{prefix}_max"] = _finite_stats(lt_data[channel])
+    return row
+
+
+class Catalog():
+    """ SQLite metadata index of the data files. """
+
+    def __init__(self, db_file):
+        """ ___ """
+
+        self.db_file = db_file
+        self.__db = sqlite3.connect(db_file)
+        self.__db.row_factory = sqlite3.Row
+        with self.__db:
+            for statement in SCHEMA:
+                self.__db.execute(statement)
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.close()
+
+    def close(self):
+        """ ___ """
+
+        self.__db.close()
+
+    def __insert(self, table, columns, row):
+
+        self.__db.execute(f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                          f"VALUES ({', '.join('?' * len(columns))})",
+                          tuple(row[column] for column in columns))
+
+    def update(self, data_dir):
+        """
+        Bring the index of the data files of `data_dir` up to date.
+        Returns `{"added", "updated", "unchanged", "removed", "failed"}` counts;
+        "failed" counts the files that can't be read, see `failures`.
+        """
+
+        counts = dict.fromkeys(("added", "updated", "unchanged", "removed", "failed"), 0)
+        known = {row["path"]: row for row in self.__db.execute(
+            "SELECT path, size, mtime_ns, sha256 FROM files")}
+        failed = {row["path"]: row for row in self.__db.execute(
+            "SELECT path, size, mtime_ns, sha256 FROM failures")}
+        found = set()
+
+        for entry in sorted(os.scandir(data_dir), key=lambda entry: entry.name):
+            if not entry.is_file() or data_name(entry.name) is None:
+                continue
+            path = os.path.abspath(entry.path)
+            found.add(path)
+            stat = entry.stat()
+            old = known.get(path)
+            bad = failed.get(path)
+            if bad is not None and (bad["size"], bad["mtime_ns"]) == (stat.st_size,
+                                                                      stat.st_mtime_ns):
+                LOGGER.debug("%s skipped, it failed before and did not change.", path)
+                counts["failed"] += 1
+                continue
+            if old is not None and (old["size"], old["mtime_ns"]) == (stat.st_size,
+                                                                      stat.st_mtime_ns):
+                counts["unchanged"] += 1
+                continue
+
+            sha256 = file_hash(path)
+            with self.__db:
+                # Touched but identical: no need to parse it again.
+                if bad is not None and bad["sha256"] == sha256:
+                    self.__db.execute("UPDATE failures SET size = ?, mtime_ns = ? WHERE path = ?",
+                                      (stat.st_size, stat.st_mtime_ns, path))
+                    counts["failed"] += 1
+                    continue
+                if old is not None and old["sha256"] == sha256:
+                    self.__db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                                      (stat.st_size, stat.st_mtime_ns, path))
+                    counts["unchanged"] += 1
+                    continue
+                row = {"path": path, "name": data_name(entry.name), "size": stat.st_size,
+                       "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+                try:
+                    row.update(file_metadata(path))
+                except (LTFormatError,) + decode_errors() as error:
+                    LOGGER.warning("%s not indexed: %s", path, error)
+                    row.update(error=f"{type(error).__name__}: {error}", failed_at=time.time())
+                    self.__db.execute("DELETE FROM files WHERE path = ?", (path,))
+                    self.__insert("failures", ("path",) + tuple(FAILURE_COLUMNS), row)
+                    counts["failed"] += 1
+                    continue
+                row["indexed_at"] = time.time()
+                self.__db.execute("DELETE FROM failures WHERE path = ?", (path,))
+                self.__insert("files", ("path",) + tuple(COLUMNS), row)
+            counts["added" if old is None else "updated"] += 1
+            LOGGER.debug("Indexed %s", path)
+
+        # Files of `data_dir` that were deleted.
+        data_dir = os.path.abspath(data_dir)
+        removed = [path for path in known
+                   if os.path.dirname(path) == data_dir and path not in found]
+        with self.__db:
+            self.__db.executemany("DELETE FROM files WHERE path = ?",
+                                  [(path,) for path in removed])
+            self.__db.executemany("DELETE FROM failures WHERE path = ?",
+                                  [(path,) for path in failed
+                                   if os.path.dirname(path) == data_dir and path not in found])
+        counts["removed"] = len(removed)
+
+        LOGGER.debug("Catalog %s updated: %s", self.db_file,
+                     ", ".join(f"{count} {key}" for key, count in counts.items()))
+        return counts
+
+    def query(self, where="", params=()):
+        """
+        Rows (sqlite3.Row) of the files matching the SQL condition `where`
+        (all the files when empty), e.g. `"he_pressure_max > ?"`, `(1000,)`.
+        """
+
+        sql = "SELECT * FROM files"
+        if where:
+            sql += f" WHERE {where}"
+        return self.__db.execute(sql + " ORDER BY name, path", params).fetchall()
+
+    def failures(self):
+        """Rows (sqlite3.Row) of the files that could not be indexed, with their error."""
+
+        return self.__db.execute("SELECT * FROM failures ORDER BY name, path").fetchall()
+
+    def names(self, where="", params=()):
+        """Names of the files matching `where`, for DATA_FILES."""
+
+        return list(dict.fromkeys(row["name"] for row in self.query(where, params)))
+
+
+def main():
+    """___"""
+
+    parser = argparse.ArgumentParser(description="Metadata index of the LT data files.")
+    parser.add_argument("-d", "--data-dir", default="./data/", help="data directory")
+    parser.add_argument("--db", default="./lt_catalog.sqlite", help="SQLite index file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("update", help="update the index")
+    query = commands.add_parser("query", help="list the indexed files")
+    query.add_argument("where", nargs="?", default="", help="SQL condition")
+    query.add_argument("--names", action="store_true", help="only print the file names")
+    args = parser.parse_args()
+
+    with Catalog(args.db) as catalog:
+        if args.command == "update":
+            start_time = time.perf_counter()
+            counts = catalog.update(args.data_dir)
+            print(", ".join(f"{count} {key}" for key, count in counts.items()),
+                  f"({time.perf_counter() - start_time:0.3f} s)")
+            for row in catalog.failures():
+                print(f"{row['path']}: {row['error']}")
+            return
+
+        if args.names:
+            print(" ".join(catalog.names(args.where)))
+            return
+        rows = catalog.query(args.where)
+        columns = ("name", "id", "level_count", "meas_count", "duration_s",
+                   "he_pressure_min", "he_pressure_max", "sha256")
+        print("  ".join(f"{column:>19}" for column in columns))
+        for row in rows:
+            print("  ".join(f"{row[column]:>19.6g}" if isinstance(row[column], float)
+                            else f"{str(row[column])[:19]:>19}" for column in columns))
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT CHUNKS
+
+Memory-bounded, chunked processing of very long acquisitions.
+
+`read_data` holds every channel as a full (level_count, meas_count) array.
+Here, the file is processed by fixed-size windows of measurements instead:
+
+    1. `lt_index.scan_index` finds the byte range of the payload of each
+       channel with a streaming scan of the file, without decoding any value.
+    2. One reader per channel is positioned at the start of its payload, and
+       the readers are advanced in lockstep: the values are stored level by
+       level, so the k-th window of every channel covers the same samples.
+    3. Each window is processed (resistivity, statistics) and fed to an
+       incremental downsampler, then dropped.
+
+The peak memory is bounded by the chunk size and the downsampled output,
+not by the file size. Compressed files are supported (see lt_compress),
+each reader decompressing its own stream.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import logging
+
+import numpy as np
+
+from lt_compress import open_data_stream
+from lt_index import LTFormatError, read_metadata, scan_index, validate_index
+from lt_sparse import SparseRows
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Bytes read at once by the value readers.
+BLOCK_SIZE = 1 << 20
+
+# Channels read by the chunked processing.
+CHUNK_CHANNELS = ("Level_mm", "KeithleyTimeStamp", "Current_A", "Resistance_ohm")
+
+
+class ValueReader():
+    """ Read the space separated values of a payload, `count` at a time. """
+
+    def __init__(self, file_name, start, end):
+
+        self.__file_name = file_name
+        self.__stream = open_data_stream(file_name)
+        self.__stream.seek(start)
+        self.__remaining = end - start
+        self.__tail = b""
+        self.__values = np.empty(0)
+
+    def __decode_block(self):
+        """Decode the next block, None at the end of the payload."""
+
+        if self.__remaining <= 0 and not self.__tail:
+            return None
+        raw = self.__stream.read(min(BLOCK_SIZE, max(self.__remaining, 0)))
+        if not raw and self.__remaining > 0:
+            raise LTFormatError(f"{self.__file_name}: the payload ends {self.__remaining} "
+                                "bytes early, the file is truncated.")
+        self.__remaining -= len(raw)
+        text = self.__tail + raw
+        if self.__remaining > 0 and raw:
+            # The last token may be cut: keep it for the next block.
+            cut = max(text.rfind(b" "), text.rfind(b"\n"), text.rfind(b"\t"))
+            if cut < 0:
+                self.__tail = text
+                return np.empty(0)
+            text, self.__tail = text[:cut], text[cut:]
+        else:
+            self.__tail = b""
+        return np.array(text.split(), dtype=np.float64)
+
+    def read(self, count):
+        """The next `count` values."""
+
+        parts = [self.__values]
+        available = len(self.__values)
+        while available < count:
+            values = self.__decode_block()
+            if values is None:
+                raise LTFormatError(f"{self.__file_name}: payload truncated, "
+                                    f"{count - available} values missing.")
+            parts.append(values)
+            available += len(values)
+        values = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        self.__values = values[count:]
+        return values[:count]
+
+    def close(self):
+        """___"""
+
+        self.__stream.close()
+
+
+def iter_chunks(file_name, index, channels, chunk_size):
+    """
+    Yield `(level, meas_start, {channel: values})` for consecutive windows of
+    at most `chunk_size` measurements. A window never spans two levels.
+    """
+
+    meas_count, level_count = index[channels[0]]["size"]
+    readers = {channel: ValueReader(file_name, index[channel]["start"], index[channel]["end"])
+               for channel in channels}
+    try:
+        for level in range(level_count):
+            for meas_start in range(0, meas_count, chunk_size):
+                count = min(chunk_size, meas_count - meas_start)
+                yield level, meas_start, {channel: reader.read(count)
+                                          for channel, reader in readers.items()}
+    finally:
+        for reader in readers.values():
+            reader.close()
+
+
+class RunningStats():
+    """ Per-level count, mean, standard deviation, min and max, updated chunk by chunk. """
+
+    def __init__(self, level_count):
+
+        self.count = np.zeros(level_count, dtype=np.int64)
+        self.sum = np.zeros(level_count)
+        self.sum_sq = np.zeros(level_count)
+        self.min = np.full(level_count, np.inf)
+        self.max = np.full(level_count, -np.inf)
+        self.__shift = np.full(level_count, np.nan)
+
+    def update(self, level, values):
+        """Add the `values` of `level` (NaN are ignored)."""
+
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        # Shifted sums, numerically stable for large offsets (e.g. timestamps).
+        if np.isnan(self.__shift[level]):
+            self.__shift[level] = values[0]
+        shifted = values - self.__shift[level]
+        self.count[level] += len(values)
+        self.sum[level] += shifted.sum()
+        self.sum_sq[level] += np.dot(shifted, shifted)
+        self.min[level] = min(self.min[level], values.min())
+        self.max[level] = max(self.max[level], values.max())
+
+    def result(self):
+        """`{"count", "mean", "std", "min", "max"}` arrays, NaN for empty levels."""
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum / self.count
+            var = np.maximum(self.sum_sq / self.count - mean ** 2, 0)
+        empty = self.count == 0
+        return {
+            "count": self.count,
+            "mean": np.where(empty, np.nan, mean + np.nan_to_num(self.__shift)),
+            "std": np.where(empty, np.nan, np.sqrt(var)),
+            "min": np.where(empty, np.nan, self.min),
+            "max": np.where(empty, np.nan, self.max),
+        }
+
+
+class Downsampler():
+    """
+    Incremental downsampling by `factor`: each output sample is the mean of
+    `factor` consecutive input samples of a level (NaN ignored). The input
+    is fed chunk by chunk, the partial bucket is carried over.
+    """
+
+    def __init__(self, level_count, meas_count, factor):
+
+        self.factor = factor
+        self.values = np.full((level_count, -(-meas_count // factor)), np.nan)
+        self.__pending = {}
+
+    def update(self, level, meas_start, values):
+        """Add the `values` of `level`, starting at measurement `meas_start`."""
+
+        pending = self.__pending.pop(level, None)
+        if pending is not None:
+            values = np.concatenate((pending, values))
+            meas_start -= len(pending)
+        full = len(values) - len(values) % self.factor
+        if full:
+            buckets = values[:full].reshape(-1, self.factor)
+            valid = np.isfinite(buckets)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = np.where(valid, buckets, 0).sum(axis=1) / valid.sum(axis=1)
+            first = meas_start // self.factor
+            self.values[level, first:first + len(means)] = means
+        if full < len(values):
+            self.__pending[level] = values[full:]
+
+    def finish(self):
+        """Flush the partial buckets and return the (level, meas / factor) array."""
+
+        for level, values in self.__pending.items():
+            valid = values[np.isfinite(values)]
+            if len(valid):
+                self.values[level, -1] = valid.mean()
+        self.__pending = {}
+        return self.values
+
+
+def process_chunked(data_file, file_name, settings):
+    """
+    Chunked equivalent of `read_data` + `calc_resistivity`: returns the same
+    data dict, whose channels are downsampled by `CHUNKED.DOWNSAMPLE`, plus
+    the per-level statistics of the full-resolution channels in
+    `data["stats"]`.
+    """
+
+    opts = settings["CHUNKED"]
+    max_level = settings["GENERAL"]["LT_MAX_LEVEL"]
+    index = scan_index(file_name)
+    meas_count, level_count = validate_index(file_name, index, CHUNK_CHANNELS)
+
+    channels = CHUNK_CHANNELS + ("resistivity",)
+    stats = {channel: RunningStats(level_count) for channel in channels}
+    samplers = {channel: Downsampler(level_count, meas_count, opts["DOWNSAMPLE"])
+                for channel in channels}
+    t_origin = None
+
+    for level, meas_start, chunk in iter_chunks(file_name, index, CHUNK_CHANNELS,
+                                                opts["CHUNK_SIZE"]):
+        if t_origin is None:
+            t_origin = chunk["KeithleyTimeStamp"][0]
+        chunk["KeithleyTimeStamp"] = chunk["KeithleyTimeStamp"] - t_origin
+
+        # Resistivity, undefined (NaN) when `level >= max_level`.
+        levels = chunk["Level_mm"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            chunk["resistivity"] = np.where(levels < max_level,
+                                            chunk["Resistance_ohm"] / (max_level - levels),
+                                            np.nan)
+
+        for channel in channels:
+            stats[channel].update(level, chunk[channel])
+            samplers[channel].update(level, meas_start, chunk[channel])
+
+    lt_data = {channel: samplers[channel].finish() for channel in CHUNK_CHANNELS}
+    lt_data["resistivity"] = SparseRows.from_dense(samplers["resistivity"].finish())
+    data = {
+        "lt_data": lt_data,
+        "lt_name": data_file,
+        "file_name": file_name,
+        "meas_count": lt_data["Level_mm"].shape[1],
+        "level_count": level_count,
+        "metadata": read_metadata(file_name, index),
+        "stats": {channel: stats[channel].result() for channel in channels},
+        "level_masks": {"resistivity": lt_data["resistivity"].level_mask},
+    }
+    LOGGER.debug("%s processed by chunks of %d, %d -> %d measurements per level",
+                 data_file, opts["CHUNK_SIZE"], meas_count, data["meas_count"])
+    for channel, result in data["stats"].items():
+        # fmin / fmax ignore the empty levels (NaN) without warning.
+        LOGGER.debug("%s %s: %d samples, min %.6g, max %.6g, level means %.6g to %.6g",
+                     data_file, channel, result["count"].sum(),
+                     np.fmin.reduce(result["min"]), np.fmax.reduce(result["max"]),
+                     np.fmin.reduce(result["mean"]), np.fmax.reduce(result["mean"]))
+    return data
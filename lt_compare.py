@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT COMPARE
+
+Cross-file comparison (e.g. LT01 vs LT30).
+
+The datasets are aligned on the level value (Level_mm) and on the time
+elapsed since the start of each level (relative KeithleyTimeStamp), and
+resampled onto a common, downsampled time grid. They are streamed one at a
+time into the aggregate and can be dropped right after, so the memory is
+bounded by `file_count × level_count × POINTS` whatever the file sizes.
+
+The difference and ratio channels are computed against the first dataset
+(the reference), vectorised across all the files.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import logging
+
+import numpy as np
+
+from lt_resample import resample_rows
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Channels compared.
+COMPARE_CHANNELS = ("Current_A", "Resistance_ohm", "resistivity")
+
+
+def match_levels(ref_levels, levels, tol=1e-6):
+    """
+    Row of `levels` holding each value of `ref_levels`, -1 when missing.
+    The levels may be in any order (e.g. LT30 is stored top to bottom).
+    """
+
+    order = np.argsort(levels)
+    pos = np.clip(np.searchsorted(levels[order], ref_levels), 0, len(levels) - 1)
+    rows = order[pos]
+    found = np.abs(levels[rows] - ref_levels) <= tol
+    return np.where(found, rows, -1)
+
+
+class CompareAggregate():
+    """ Downsampled, aligned channels of the datasets added so far. """
+
+    def __init__(self, points, duration=None, method="linear"):
+        """
+        `points` is the size of the common time grid, spanning `duration`
+        seconds (default: the longest level of the first dataset).
+        `method` is the resampling method (see lt_resample.METHODS).
+        """
+
+        self.points = points
+        self.duration = duration
+        self.method = method
+        self.names = []
+        self.level_mm = None
+        self.time = None
+        self.__channels = {channel: [] for channel in COMPARE_CHANNELS}
+
+    def add(self, data):
+        """ Resample the dataset `data` and add it to the aggregate. """
+
+        lt_data = data["lt_data"]
+        level_mm = lt_data["Level_mm"][:, 0]
+        time_rel = lt_data["KeithleyTimeStamp"] - lt_data["KeithleyTimeStamp"][:, :1]
+
+        # The first dataset is the reference: it defines the levels and the grid.
+        if self.level_mm is None:
+            self.level_mm = level_mm.copy()
+            duration = self.duration or float(np.max(time_rel[:, -1]))
+            self.time = np.linspace(0, duration, self.points)
+
+        rows = match_levels(self.level_mm, level_mm)
+        found = rows >= 0
+        for channel in COMPARE_CHANNELS:
+            values = lt_data[channel]
+            if hasattr(values, "to_dense"):
+                values = values.to_dense()
+            aligned = np.full((len(self.level_mm), self.points), np.nan)
+            aligned[found] = resample_rows(self.time, time_rel[rows[found]],
+                                           values[rows[found]], self.method)
+            self.__channels[channel].append(aligned)
+
+        self.names.append(data["lt_name"])
+        LOGGER.debug("Added %s to the comparison (%d/%d levels matched)",
+                     data["lt_name"], np.count_nonzero(found), len(self.level_mm))
+
+    def channel(self, channel):
+        """ (file, level, time) array of `channel`. """
+
+        return np.stack(self.__channels[channel])
+
+    def difference(self, channel):
+        """ (file, level, time) difference against the reference dataset. """
+
+        stacked = self.channel(channel)
+        return stacked - stacked[:1]
+
+    def ratio(self, channel):
+        """ (file, level, time) ratio to the reference dataset. """
+
+        stacked = self.channel(channel)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return stacked / stacked[:1]
+
+    def to_arrays(self):
+        """
+        The aggregate as a dict of arrays, e.g. for `np.savez`: `names`,
+        `level_mm`, `time_s`, and `<channel>`, `<channel>_difference`,
+        `<channel>_ratio` (file, level, time) for each compared channel.
+        """
+
+        arrays = {"names": np.asarray(self.names), "level_mm": self.level_mm,
+                  "time_s": self.time}
+        for channel in COMPARE_CHANNELS:
+            arrays[channel] = self.channel(channel)
+            arrays[f"{channel}_difference"] = self.difference(channel)
+            arrays[f"{channel}_ratio"] = self.ratio(channel)
+        return arrays
+
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT COMPRESS
+
+Transparent (de)compression of the data files.
+
+The LabView XML files compress about 10×, so archived campaigns are stored
+as `.xml.gz`, `.xml.xz` or `.xml.zst`. The streams returned here decompress
+on the fly, chunk by chunk, so a compressed file is never fully
+decompressed, neither in memory nor on disk.
+
+The reports can also be written with precompressed siblings
+(`.html.gz`, `.html.br`) that a static file server can send as is.
+
+`.zst` input requires the optional `zstandard` package and `.br` output
+the optional `brotli` package.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-18
+
+"""
+
+
+import gzip
+import io
+import lzma
+import os
+import sys
+import zlib
+
+from lt_metrics import record_written
+
+
+# Suffixes probed, in order, when looking for a data file.
+DATA_SUFFIXES = (".xml", ".xml.gz", ".xml.xz", ".xml.zst")
+
+
+def find_data_file(base_name):
+    """
+    Return the path of the data file `base_name` + one of `DATA_SUFFIXES`.
+    Falls back on the uncompressed name when none exists, so the error
+    raised later on mentions the expected file.
+    """
+
+    for suffix in DATA_SUFFIXES:
+        if os.path.isfile(base_name + suffix):
+            return base_name + suffix
+    return base_name + DATA_SUFFIXES[0]
+
+
+def _open_zstd(file_obj):
+    """___"""
+
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+    except ImportError as exc:
+        file_obj.close()
+        raise ImportError(
+            "Reading .zst files requires the `zstandard` package "
+            "(python3 -m pip install zstandard)."
+        ) from exc
+    return zstandard.ZstdDecompressor().stream_reader(file_obj, closefd=True)
+
+
+def open_data_stream(file_name, raw=None):
+    """
+    Open `file_name` as a binary stream of uncompressed XML.
+
+    `raw` are the (possibly compressed) bytes of the file, already read in
+    memory. They are then decompressed on the fly instead of reading the file.
+    """
+
+    if file_name.endswith(".gz"):
+        if raw is None:
+            return gzip.open(file_name, "rb")
+        return gzip.GzipFile(fileobj=io.BytesIO(raw), mode="rb")
+    if file_name.endswith(".xz"):
+        return lzma.LZMAFile(file_name if raw is None else io.BytesIO(raw), mode="rb")
+    if file_name.endswith(".zst"):
+        return _open_zstd(open(file_name, "rb") if raw is None else io.BytesIO(raw))
+    return open(file_name, "rb") if raw is None else io.BytesIO(raw)
+
+
+def decode_errors():
+    """
+    Exceptions raised while reading a corrupt, truncated or unsupported data
+    file: I/O, decompression (gzip, xz, zstandard once imported) and a
+    missing optional decompressor.
+    """
+
+    errors = (OSError, EOFError, ValueError, lzma.LZMAError, zlib.error, ImportError)
+    zstandard = sys.modules.get("zstandard")
+    return errors + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+class _BrotliFile():
+    """Minimal writable file compressing to Brotli."""
+
+    def __init__(self, file_name):
+
+        try:
+            import brotli  # pylint: disable=import-outside-toplevel
+        except ImportError as exc:
+            raise ImportError(
+                "Writing .br files requires the `brotli` package "
+                "(python3 -m pip install brotli)."
+            ) from exc
+        self.__file = open(file_name, "wb")
+        self.__compressor = brotli.Compressor(mode=brotli.MODE_TEXT)
+
+    def write(self, chunk):
+        self.__file.write(self.__compressor.process(chunk))
+
+    def close(self):
+        self.__file.write(self.__compressor.finish())
+        self.__file.close()
+
+
+# Formats of the precompressed report siblings.
+REPORT_FORMATS = ("gz", "br")
+
+
+def remove_stale_siblings(file_name, formats):
+    """
+    Remove the precompressed siblings of `file_name` in the formats not in
+    `formats`: left over by a previous run, a static file server would keep
+    serving them instead of the new report.
+    """
+
+    for fmt in REPORT_FORMATS:
+        if fmt not in formats and os.path.exists(f"{file_name}.{fmt}"):
+            os.remove(f"{file_name}.{fmt}")
+
+
+def _open_compressed_sink(file_name, fmt):
+    """___"""
+
+    if fmt == "gz":
+        # mtime=0 makes the output reproducible.
+        return gzip.GzipFile(file_name + ".gz", mode="wb", compresslevel=9, mtime=0)
+    if fmt == "br":
+        return _BrotliFile(file_name + ".br")
+    raise ValueError(f"Unknown compression format {fmt!r}, expected 'gz' or 'br'.")
+
+
+class ReportWriter():
+    """
+    Write a report to `file_name` and, at the same time, to precompressed
+    siblings (`file_name.gz`, `file_name.br`) for each format in `formats`.
+
+    Each chunk is compressed as it is written, the report is never held
+    entirely in memory. The siblings in other formats are removed.
+    Use as a context manager.
+    """
+
+    def __init__(self, file_name, formats=()):
+
+        remove_stale_siblings(file_name, formats)
+        self.__file_names = [file_name] + [f"{file_name}.{fmt}" for fmt in formats]
+        self.__sinks = [open(file_name, "wb")]
+        try:
+            for fmt in formats:
+                self.__sinks.append(_open_compressed_sink(file_name, fmt))
+        except Exception:
+            self.close()
+            raise
+
+    def write(self, text):
+        """Write `text` (str, encoded in UTF-8, or bytes) to all the outputs."""
+
+        chunk = text.encode("utf-8") if isinstance(text, str) else text
+        for sink in self.__sinks:
+            sink.write(chunk)
+
+    def close(self):
+        """___"""
+
+        for sink in self.__sinks:
+            sink.close()
+        if self.__sinks:
+            record_written(*self.__file_names)
+        self.__sinks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def compress_file(file_name, formats, chunk_size=1 << 20):
+    """
+    Write precompressed siblings of the existing file `file_name`,
+    reading it chunk by chunk. The siblings in other formats are removed.
+    """
+
+    remove_stale_siblings(file_name, formats)
+    if not formats:
+        return
+    sinks = []
+    try:
+        for fmt in formats:
+            sinks.append(_open_compressed_sink(file_name, fmt))
+        with open(file_name, "rb") as _file:
+            while chunk := _file.read(chunk_size):
+                for sink in sinks:
+                    sink.write(chunk)
+    finally:
+        for sink in sinks:
+            sink.close()
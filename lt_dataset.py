@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT DATASET
+
+Interactive API for notebooks: lazily loaded data files and chainable,
+copy-free views over them.
+
+    from lt_dataset import LTDataset
+
+    ds = LTDataset.open("./data/LT01.xml")      # Pre-scan only, nothing decoded.
+    ds                                          # Summary and downsampled preview.
+    view = ds.levels(slice(5, 12)).window(300, 900)
+    view["Current_A"]                           # (levels, meas) array.
+    view.preview("resistivity")
+
+`open` only scans the index of the file (see `lt_index`). A channel is
+decoded on first access, whole (its text payload can't be indexed by value),
+and kept read-only by the file, for all the views derived from it.
+
+The filters (`levels`, `level_mm`, `window`) return new views and copy no
+data: a view is the file plus a level selection and a time window. The
+arrays returned for a view are numpy views on the decoded channel when
+the selected levels are evenly spaced and no time window cuts them;
+otherwise only the selection is copied, with the samples outside the
+window set to NaN.
+
+The levels are recorded one after the other, so the time window is
+resolved per level as a range of samples, from its increasing time stamps. The preview
+(`_repr_html_`) picks at most `PREVIEW_POINTS` samples in the view and
+draws them as an inline SVG: it never gathers more than the displayed points.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import html
+import logging
+import os
+
+import numpy as np
+
+from lt_compress import find_data_file
+from lt_index import (CHANNELS, DERIVED_CHANNELS, LTFormatError, read_channels, read_metadata,
+                      scan_index, validate_index)
+from lt_settings import load_settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Samples drawn by the preview, all levels together.
+PREVIEW_POINTS = 4000
+
+# Size of the preview (pixels).
+PREVIEW_WIDTH = 720
+PREVIEW_HEIGHT = 260
+
+
+def _as_index(levels):
+    """Level indices -> slice when evenly spaced (numpy view), else array."""
+
+    if len(levels) == 1:
+        return slice(levels[0], levels[0] + 1)
+    steps = np.diff(levels)
+    if len(levels) and np.all(steps == steps[0]) and steps[0] > 0:
+        return slice(levels[0], levels[-1] + 1, int(steps[0]))
+    return np.asarray(levels, dtype=np.intp)
+
+
+class _LTFile():
+    """ Index and decoded channels of a data file, shared by its views. """
+
+    def __init__(self, file_name, settings):
+        """ ___ """
+
+        self.file_name = file_name
+        self.settings = settings
+        self.index = scan_index(file_name)
+        self.channels = tuple(channel for channel in CHANNELS if channel in self.index)
+        if not self.channels:
+            raise LTFormatError(f"{file_name}: no channel found.")
+        self.meas_count, self.level_count = validate_index(file_name, self.index, self.channels)
+        self.__arrays = {}
+        self.__metadata = None
+
+    @property
+    def metadata(self):
+        """See `lt_index.read_metadata`, decoded on first access."""
+
+        if self.__metadata is None:
+            self.__metadata = read_metadata(self.file_name, self.index)
+        return self.__metadata
+
+    @property
+    def loaded(self):
+        """ ___ """
+
+        return tuple(self.__arrays)
+
+    def load(self, channels):
+        """Decode the `channels` not decoded yet, in a single pass over the file."""
+
+        missing = [channel for channel in channels if channel not in self.__arrays]
+        unknown = [channel for channel in missing if channel not in self.channels]
+        if unknown:
+            raise KeyError(f"{self.file_name}: unknown channel {unknown[0]!r}, expected one of "
+                           f"{', '.join(self.channels + tuple(DERIVED_CHANNELS))}.")
+        if not missing:
+            return
+        arrays = read_channels(self.file_name, self.index, missing)
+        if "KeithleyTimeStamp" in arrays:
+            # As in `lt_analysis.read_data`.
+            arrays["KeithleyTimeStamp"] -= arrays["KeithleyTimeStamp"][0][0]
+        for channel, values in arrays.items():
+            values.flags.writeable = False
+            self.__arrays[channel] = values
+        LOGGER.debug("%s: decoded %s", self.file_name, ", ".join(missing))
+
+    def channel(self, channel):
+        """The whole decoded (level_count, meas_count) channel, read-only."""
+
+        self.load((channel,))
+        return self.__arrays[channel]
+
+
+class LTDataset():
+    """
+    Lazy view over a data file: a selection of levels and a time window.
+    Build it with `LTDataset.open`, narrow it with `levels`, `level_mm` and
+    `window` (chainable, no data copied), read it with `view[channel]`.
+    """
+
+    def __init__(self, source, levels, window):
+        """ Use `LTDataset.open`. """
+
+        self.__source = source
+        self.__levels = levels
+        self.__window = window
+
+    @classmethod
+    def open(cls, path, settings=None):
+        """
+        Open the data file `path` (the suffix may be omitted, e.g.
+        `./data/LT01`). Only its index is read. `settings` default to
+        `lt_analysis.SETTINGS` (LT_MAX_LEVEL for the resistivity, COLORS).
+        """
+
+        if settings is None:
+            from lt_analysis import SETTINGS  # pylint: disable=import-outside-toplevel
+            settings = load_settings(SETTINGS)
+        file_name = path if os.path.isfile(path) else find_data_file(path)
+        source = _LTFile(file_name, settings)
+        return cls(source, tuple(range(source.level_count)), (None, None))
+
+    # Filters.
+
+    def __derive(self, levels=None, window=None):
+
+        return LTDataset(self.__source,
+                         self.__levels if levels is None else levels,
+                         self.__window if window is None else window)
+
+    def levels(self, selection):
+        """
+        View restricted to the levels `selection` of the file: an index,
+        a slice, a range or a sequence of indices (e.g. `slice(5, 12)`).
+        """
+
+        all_levels = range(self.__source.level_count)
+        if isinstance(selection, (int, np.integer)):
+            selected = {all_levels[selection]}
+        elif isinstance(selection, slice):
+            selected = set(all_levels[selection])
+        else:
+            selected = {all_levels[level] for level in selection}
+        return self.__derive(levels=tuple(level for level in self.__levels if level in selected))
+
+    def level_mm(self, low=None, high=None):
+        """View restricted to the levels with `low <= Level_mm < high` (mm)."""
+
+        level_mm = self.__source.channel("Level_mm")
+        with np.errstate(invalid="ignore"):
+            values = np.nanmedian(level_mm[_as_index(self.__levels)], axis=1) \
+                if self.__levels else np.empty(0)
+        keep = np.isfinite(values)
+        if low is not None:
+            keep &= values >= low
+        if high is not None:
+            keep &= values < high
+        return self.__derive(levels=tuple(np.asarray(self.__levels)[keep].tolist()))
+
+    def window(self, start=None, stop=None):
+        """View restricted to the samples with `start <= time < stop` (s)."""
+
+        old_start, old_stop = self.__window
+        if old_start is not None:
+            start = old_start if start is None else max(start, old_start)
+        if old_stop is not None:
+            stop = old_stop if stop is None else min(stop, old_stop)
+        return self.__derive(window=(start, stop))
+
+    # Content.
+
+    def __bounds(self):
+        """
+        `(levels, first, stop)`: the levels of the view holding samples in
+        the time window and, for each, the range of its samples.
+        """
+
+        levels = np.asarray(self.__levels, dtype=np.intp)
+        meas_count = self.__source.meas_count
+        first = np.zeros(len(levels), dtype=np.intp)
+        stop = np.full(len(levels), meas_count, dtype=np.intp)
+        start_s, stop_s = self.__window
+        if len(levels) and (start_s is not None or stop_s is not None):
+            # Time stamps are increasing within a level: count the samples before.
+            time_s = self.__source.channel("KeithleyTimeStamp")[_as_index(levels)]
+            if start_s is not None:
+                first = np.count_nonzero(time_s < start_s, axis=1)
+            if stop_s is not None:
+                stop = np.count_nonzero(time_s < stop_s, axis=1)
+            keep = stop > first
+            levels, first, stop = levels[keep], first[keep], stop[keep]
+        return levels, first, stop
+
+    def __take(self, channel, rows, cols):
+        """Values of `channel` at `[rows, cols]`, derived channels included."""
+
+        if channel == "resistivity":
+            max_level = self.__source.settings["GENERAL"]["LT_MAX_LEVEL"]
+            levels = self.__source.channel("Level_mm")[rows, cols]
+            resistance = self.__source.channel("Resistance_ohm")[rows, cols]
+            # As in `lt_analysis.calc_resistivity`, undefined for level >= max_level.
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(levels < max_level, resistance / (max_level - levels), np.nan)
+        return self.__source.channel(channel)[rows, cols]
+
+    def __getitem__(self, channel):
+        """
+        (levels, meas) array of `channel` over the view, see `level_indices`.
+        The columns span the time window; samples outside of it are NaN.
+        """
+
+        self.load(channel)
+        levels, first, stop = self.__bounds()
+        if not len(levels):
+            return np.empty((0, 0))
+        cols = slice(int(first.min()), int(stop.max()))
+        values = self.__take(channel, _as_index(levels), cols)
+        outside = ((np.arange(cols.start, cols.stop) < first[:, np.newaxis])
+                   | (np.arange(cols.start, cols.stop) >= stop[:, np.newaxis]))
+        if outside.any():
+            values = np.where(outside, np.nan, values)
+        return values
+
+    def load(self, *channels):
+        """Decode `channels` (and their dependencies) at once. Returns the view."""
+
+        wanted = []
+        for channel in channels:
+            wanted.extend(DERIVED_CHANNELS.get(channel, (channel,)))
+        self.__source.load(wanted)
+        return self
+
+    @property
+    def name(self):
+        """`./data/LT01.xml` -> `LT01`."""
+
+        return os.path.basename(self.__source.file_name).split(".")[0]
+
+    @property
+    def file_name(self):
+        """ ___ """
+
+        return self.__source.file_name
+
+    @property
+    def channels(self):
+        """Channels of the file, derived ones included."""
+
+        return self.__source.channels + tuple(
+            channel for channel, deps in DERIVED_CHANNELS.items()
+            if set(deps) <= set(self.__source.channels))
+
+    @property
+    def metadata(self):
+        """`{"id", "he_pressure_mbar"}`, see `lt_index.read_metadata`."""
+
+        return self.__source.metadata
+
+    @property
+    def level_indices(self):
+        """Levels of the file in the view, i.e. the rows of `view[channel]`."""
+
+        return self.__bounds()[0]
+
+    @property
+    def shape(self):
+        """(levels, meas) shape of `view[channel]`."""
+
+        levels, first, stop = self.__bounds()
+        return (len(levels), int(stop.max() - first.min()) if len(levels) else 0)
+
+    def __len__(self):
+
+        return len(self.level_indices)
+
+    def __repr__(self):
+
+        start_s, stop_s = self.__window
+        window = "" if self.__window == (None, None) else \
+            f", window [{'' if start_s is None else start_s}, {'' if stop_s is None else stop_s}) s"
+        return (f"<LTDataset {self.name}: {len(self)}/{self.__source.level_count} "
+                f"levels × {self.__source.meas_count} meas{window}>")
+
+    # Preview.
+
+    def __sample(self, channel, points):
+        """
+        Time stamps and values of about `points` samples of the view, evenly
+        spread over each level: `[(level, time_s, values), ...]`.
+        Only these samples are gathered.
+        """
+
+        levels, first, stop = self.__bounds()
+        if not len(levels):
+            return []
+        per_level = max(2, points // len(levels))
+        samples = []
+        for level, _first, _stop in zip(levels, first, stop):
+            cols = np.unique(np.linspace(_first, _stop - 1, min(per_level, _stop - _first))
+                             .astype(np.intp))
+            time_s = self.__take("KeithleyTimeStamp", level, cols)
+            values = self.__take(channel, level, cols)
+            valid = np.isfinite(time_s) & np.isfinite(values)
+            samples.append((int(level), time_s[valid], values[valid]))
+        return samples
+
+    def preview(self, channel="Current_A", points=PREVIEW_POINTS):
+        """HTML summary of the view and SVG plot of `channel` vs time (downsampled)."""
+
+        self.load("KeithleyTimeStamp", channel)
+        samples = [sample for sample in self.__sample(channel, points) if sample[1].size]
+        metadata = self.metadata
+        rows = {
+            "File": self.file_name,
+            "ID": metadata["id"] or "—",
+            "Levels": f"{len(self)} / {self.__source.level_count}",
+            "Measurements": self.__source.meas_count,
+            "Window": "all" if self.__window == (None, None) else
+                      " – ".join("…" if value is None else f"{value:g} s" for value in self.__window),
+            "Decoded": ", ".join(self.__source.loaded) or "—",
+        }
+        table = "".join(f"<tr><th style='text-align:left'>{html.escape(key)}</th>"
+                        f"<td style='text-align:left'>{html.escape(str(value))}</td></tr>"
+                        for key, value in rows.items())
+        return (f"<div><strong>{html.escape(repr(self))}</strong>"
+                f"<table>{table}</table>{self.__svg(channel, samples)}</div>")
+
+    def __svg(self, channel, samples):
+        """Inline SVG of the `samples` of `__sample`."""
+
+        if not samples:
+            return f"<p>{html.escape(channel)}: no sample in the view.</p>"
+        time_all = np.concatenate([sample[1] for sample in samples])
+        values_all = np.concatenate([sample[2] for sample in samples])
+        t_min, t_max = float(time_all.min()), float(time_all.max())
+        v_min, v_max = float(values_all.min()), float(values_all.max())
+        margin = 40
+        width, height = PREVIEW_WIDTH - 2 * margin, PREVIEW_HEIGHT - 2 * margin
+
+        def scale(values, low, high, size):
+            return (values - low) / (high - low) * size if high > low else np.full_like(values, size / 2)
+
+        colors = self.__source.settings["GENERAL"]["COLORS"]
+        lines = []
+        for level, time_s, values in samples:
+            x = margin + scale(time_s, t_min, t_max, width)
+            y = margin + height - scale(values, v_min, v_max, height)
+            coords = " ".join(f"{_x:.1f},{_y:.1f}" for _x, _y in zip(x, y))
+            lines.append(f"<polyline points='{coords}' fill='none' stroke-width='1' "
+                         f"stroke='{colors[level % len(colors)]}'><title>level {level}</title>"
+                         f"</polyline>")
+        labels = (
+            f"<text x='{margin}' y='{margin - 8}' font-size='11'>{html.escape(channel)}</text>",
+            f"<text x='{margin - 4}' y='{margin + 4}' font-size='10' "
+            f"text-anchor='end'>{v_max:.4g}</text>",
+            f"<text x='{margin - 4}' y='{margin + height}' font-size='10' "
+            f"text-anchor='end'>{v_min:.4g}</text>",
+            f"<text x='{margin}' y='{margin + height + 14}' font-size='10'>{t_min:.4g} s</text>",
+            f"<text x='{margin + width}' y='{margin + height + 14}' font-size='10' "
+            f"text-anchor='end'>{t_max:.4g} s</text>",
+        )
+        return (f"<svg xmlns='http://www.w3.org/2000/svg' width='{PREVIEW_WIDTH}' "
+                f"height='{PREVIEW_HEIGHT}' font-family='sans-serif'>"
+                f"<rect x='{margin}' y='{margin}' width='{width}' height='{height}' "
+                f"fill='none' stroke='#ccc'/>{''.join(lines)}{''.join(labels)}</svg>")
+
+    def _repr_html_(self):
+        """Notebook display, see `preview`."""
+
+        return self.preview()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT EVENTS
+
+Detection of glitches (isolated outliers, e.g. Keithley glitches) and step
+changes (e.g. quench-like resistance jumps) along the measurement axis of
+the (level, meas) channels.
+
+Everything is vectorised over all the levels at once:
+
+    - glitches: rolling median, with a selection network (element-wise
+      min / max) over chunks of measurements, and rolling MAD (median
+      absolute deviation) on the strided windows (`sliding_window_view`)
+      of the candidates only. The (odd) window is centered.
+    - steps: difference between the means of the `STEP_WINDOW` samples after
+      and before each sample, computed from cumulative sums.
+
+The scales are robust (MAD based) and floored at `REL_FLOOR × peak-to-peak`
+of each level, so that smooth ramps (e.g. Current_A) do not trigger events.
+The level medians are taken on at most `LEVEL_SAMPLES` samples per level,
+evenly spaced.
+
+Both channels of the default settings (Current_A, Resistance_ohm) take
+about 0.8 s for 23 levels × 150000 measurements.
+
+Missing samples (NaN) are never flagged and don't hide the events of their
+level: the rolling windows and the cumulative sums run on the values where
+each NaN is replaced by the previous valid sample of the level, and the
+level statistics ignore them.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import functools
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+LOGGER = logging.getLogger(__name__)
+
+# MAD to standard deviation, for normally distributed noise.
+MAD_TO_SIGMA = 1.4826
+
+# Measurements processed at once by the rolling median.
+CHUNK_SIZE = 1 << 9
+
+# Samples of each level the level medians are taken on (decimated beyond).
+LEVEL_SAMPLES = 1 << 14
+
+
+def _pad_edges(values, window):
+    """Pad the last axis with the first / last value for centered windows."""
+
+    half = window // 2
+    return np.pad(values, ((0, 0), (half, window - 1 - half)), mode="edge")
+
+
+def fill_missing(values):
+    """
+    `values` with each NaN replaced by the previous valid sample of its
+    level (the first valid one for leading NaNs), and the validity mask.
+    Fully invalid levels stay NaN.
+    """
+
+    valid = np.isfinite(values)
+    # Only the levels holding missing samples are filled.
+    rows = np.flatnonzero(~valid.all(axis=1))
+    if not len(rows):
+        return values, valid
+    index = np.where(valid[rows], np.arange(values.shape[1]), -1)
+    np.maximum.accumulate(index, axis=1, out=index)
+    index = np.where(index < 0, np.argmax(valid[rows], axis=1)[:, np.newaxis], index)
+    filled = values.copy()
+    filled[rows] = np.take_along_axis(values[rows], index, axis=1)
+    return filled, valid
+
+
+def _nanmedian_rows(values):
+    """
+    Per-level median of the valid samples, (levels, 1), NaN for fully
+    invalid levels. Long levels are decimated to about LEVEL_SAMPLES samples.
+    """
+
+    values = values[:, ::max(1, values.shape[1] // LEVEL_SAMPLES)]
+    finite = np.isfinite(values)
+    if finite.all():
+        return np.median(values, axis=1, keepdims=True)
+    out = np.full((values.shape[0], 1), np.nan)
+    valid = finite.any(axis=1)
+    if valid.any():
+        out[valid, 0] = np.nanmedian(values[valid], axis=1)
+    return out
+
+
+@functools.lru_cache()
+def _median_network(window):
+    """
+    Comparators `(low, high, keep_low, keep_high)` selecting the median of
+    `window` wires: Batcher's odd-even merge sort network, pruned to the
+    comparators (and the outputs) the middle wire depends on.
+    """
+
+    size = 1 << (window - 1).bit_length()
+    pairs = []
+    merged = 1
+    while merged < size:
+        step = merged
+        while step >= 1:
+            for start in range(step % merged, size - step, 2 * step):
+                for _i in range(min(step, size - start - step)):
+                    low, high = _i + start, _i + start + step
+                    if low // (merged * 2) == high // (merged * 2) and high < window:
+                        pairs.append((low, high))
+            step //= 2
+        merged *= 2
+
+    needed = {window // 2}
+    network = []
+    for low, high in reversed(pairs):
+        if low in needed or high in needed:
+            network.append((low, high, low in needed, high in needed))
+            needed.update((low, high))
+    return network[::-1]
+
+
+def rolling_median(values, window):
+    """
+    Centered rolling median along the last axis, same shape as `values`.
+
+    The `window` shifted copies of a chunk of measurements go through a
+    median selection network (element-wise min / max, in place): no window
+    is sorted, and the chunks stay in the CPU cache.
+    """
+
+    padded = _pad_edges(values, window)
+    out = np.empty(values.shape, dtype=np.float64)
+    meas_count = values.shape[1]
+    network = _median_network(window)
+    # One buffer per wire, plus a spare one, reused by all the chunks.
+    buffers = np.empty((window + 1, values.shape[0], min(CHUNK_SIZE, meas_count)))
+    for start in range(0, meas_count, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, meas_count)
+        wires = list(buffers[:, :, :stop - start])
+        for _k in range(window):
+            wires[_k][...] = padded[:, start + _k:stop + _k]
+        spare = wires.pop()
+        for low, high, keep_low, keep_high in network:
+            if keep_low and keep_high:
+                np.minimum(wires[low], wires[high], out=spare)
+                np.maximum(wires[low], wires[high], out=wires[high])
+                wires[low], spare = spare, wires[low]
+            elif keep_low:
+                np.minimum(wires[low], wires[high], out=wires[low])
+            else:
+                np.maximum(wires[low], wires[high], out=wires[high])
+        out[:, start:stop] = wires[window // 2]
+    return out
+
+
+def _robust_scale(deviations, values, rel_floor):
+    """
+    Per-level robust standard deviation, floored relative to the level range.
+    NaN (nothing flagged) for the levels without valid samples.
+    """
+
+    scale = MAD_TO_SIGMA * _nanmedian_rows(deviations)
+    # fmax / fmin ignore NaN, fully invalid levels give NaN.
+    peak_to_peak = (np.fmax.reduce(values, axis=1, keepdims=True)
+                    - np.fmin.reduce(values, axis=1, keepdims=True))
+    return np.maximum(scale, rel_floor * peak_to_peak)
+
+
+def find_glitches(values, window, n_sigma, rel_floor):
+    """
+    (levels, meas) indices of the samples deviating from the rolling median
+    by more than `n_sigma` robust standard deviations, both over the level
+    and over the rolling window (rolling MAD).
+    """
+
+    window |= 1
+    filled, valid = fill_missing(values)
+    deviations = np.abs(filled - rolling_median(filled, window))
+    deviations[~valid] = np.nan
+
+    # The level scale is cheap and rejects nearly all the samples, so the
+    # rolling MAD is only computed on the windows of the remaining candidates.
+    level_scale = _robust_scale(deviations, values, rel_floor)
+    with np.errstate(invalid="ignore"):
+        levels, meas = np.nonzero(deviations > n_sigma * level_scale)
+    windows = sliding_window_view(_pad_edges(deviations, window), window, axis=1)
+    # Each candidate window holds at least the candidate itself.
+    local_mad = np.nanmedian(windows[levels, meas], axis=-1)
+    keep = deviations[levels, meas] > n_sigma * MAD_TO_SIGMA * local_mad
+    return levels[keep], meas[keep]
+
+
+def step_changes(values, window):
+    """
+    Mean of the `window` samples from `i` minus the mean of the `window`
+    samples before `i`, for each sample `i` (0 where undefined).
+    """
+
+    level_count, meas_count = values.shape
+    steps = np.zeros(values.shape, dtype=np.float64)
+    if meas_count < 2 * window:
+        return steps
+    cumsum = np.zeros((level_count, meas_count + 1), dtype=np.float64)
+    np.cumsum(values, axis=1, out=cumsum[:, 1:])
+    left = cumsum[:, window:meas_count - window + 1] - cumsum[:, :meas_count - 2 * window + 1]
+    right = cumsum[:, 2 * window:] - cumsum[:, window:meas_count - window + 1]
+    steps[:, window:meas_count - window + 1] = (right - left) / window
+    return steps
+
+
+def find_steps(values, window, n_sigma, rel_floor):
+    """
+    (levels, meas) indices of the step changes: the largest `|step|` of each
+    run of consecutive samples whose step deviates from the typical step of
+    the level by more than `n_sigma` robust standard deviations.
+    """
+
+    filled, valid = fill_missing(values)
+    steps = step_changes(filled, window)
+    steps[~valid] = np.nan
+    deviations = np.abs(steps - _nanmedian_rows(steps))
+    with np.errstate(invalid="ignore"):
+        flags = deviations > n_sigma * _robust_scale(deviations, values, rel_floor)
+
+    # Runs of flagged samples, numbered over the flattened array.
+    padded = np.pad(flags, ((0, 0), (1, 0)))
+    starts = padded[:, 1:] & ~padded[:, :-1]
+    run_ids = np.cumsum(starts.ravel())[flags.ravel()]
+    flat_idx = np.flatnonzero(flags)
+    if not len(flat_idx):
+        return flat_idx, flat_idx
+
+    # Keep the sample with the largest deviation of each run.
+    order = np.lexsort((-deviations.ravel()[flat_idx], run_ids))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = run_ids[order][1:] != run_ids[order][:-1]
+    return np.unravel_index(np.sort(flat_idx[order[first]]), values.shape)
+
+
+def detect_events(data, settings):
+    """
+    Detect the glitches and steps of the channels `settings["EVENTS"]["CHANNELS"]`.
+
+    The events are stored in `data["events"][channel]["glitch" | "step"]` as
+    `(level_indices, meas_indices)`, in the format of `np.nonzero`.
+    """
+
+    opts = settings["EVENTS"]
+    data["events"] = {}
+    for channel in opts["CHANNELS"]:
+        values = data["lt_data"][channel]
+        glitches = find_glitches(values, opts["WINDOW"],
+                                 opts["GLITCH_SIGMA"], opts["REL_FLOOR"])
+        steps = find_steps(values, opts["STEP_WINDOW"],
+                           opts["STEP_SIGMA"], opts["REL_FLOOR"])
+        data["events"][channel] = {"glitch": glitches, "step": steps}
+        LOGGER.debug("%s %s: %d glitches, %d steps", data["lt_name"], channel,
+                     len(glitches[0]), len(steps[0]))
+
+    return data
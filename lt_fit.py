@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT FIT
+
+Polynomial R(I) fit of every level, solved as one batched least-squares
+problem on the stacked (level, meas) arrays.
+
+For each level, the abscissas are centred and scaled to [-1, 1] (for the
+conditioning of the Vandermonde matrix), the invalid samples (NaN in x or
+y) get a zero weight, and the normal equations of all the levels are
+solved at once (stacked pseudo-inverses of (degree + 1)² matrices).
+A level with fewer valid samples than coefficients, or a constant
+current (unless degree 0), has NaN coefficients. There is no Python loop over the levels.
+
+The coefficients are returned for the raw abscissas, in increasing degree
+(`coef[level, k]` multiplies `I ** k`, as in `numpy.polynomial`), together
+with the residual RMS and the coefficient of determination of each level.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import logging
+from math import comb
+
+import numpy as np
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _vandermonde(x, degree):
+    """(..., meas) -> (..., meas, degree + 1), increasing powers."""
+
+    return np.cumprod(np.concatenate(
+        (np.ones(x.shape + (1,)), np.repeat(x[..., np.newaxis], degree, axis=-1)),
+        axis=-1), axis=-1)
+
+
+def _unscale(coef, center, scale):
+    """
+    Coefficients of `p((x - center) / scale)` -> coefficients of the same
+    polynomial in `x`, for each row.
+    """
+
+    degree = coef.shape[-1] - 1
+    # (x - c)^k / s^k = sum_j C(k, j) (-c)^(k - j) x^j / s^k
+    k = np.arange(degree + 1)
+    binom = np.array([[comb(_k, _j) for _j in k] for _k in k], dtype=float)
+    power = np.clip(k[:, np.newaxis] - k[np.newaxis, :], 0, None)
+    transform = (binom * (-center[:, np.newaxis, np.newaxis]) ** power
+                 / scale[:, np.newaxis, np.newaxis] ** k[:, np.newaxis])
+    return np.einsum("lk,lkj->lj", coef, transform)
+
+
+def fit_rows(x, y, degree=1):
+    """
+    Least-squares polynomial fit of `y` against `x`, row by row (NaN ignored).
+
+    Returns a dict of per-row arrays:
+        coef     (rows, degree + 1) coefficients for the raw `x`, increasing degree,
+        count    valid samples,
+        rms      residual root mean square,
+        r2       coefficient of determination,
+        x_min, x_max  range of the valid `x`.
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.isfinite(x) & np.isfinite(y)
+    count = valid.sum(axis=1)
+
+    with np.errstate(invalid="ignore"):
+        x_min = np.where(valid, x, np.inf).min(axis=1)
+        x_max = np.where(valid, x, -np.inf).max(axis=1)
+        center = (x_max + x_min) / 2
+        scale = (x_max - x_min) / 2
+    solvable = (count > degree) & ((scale > 0) | (degree == 0))
+    center = np.where(solvable, center, 0)
+    # A constant abscissa (scale 0) is only solvable for degree 0: not scaled.
+    scale = np.where(solvable & (scale > 0), scale, 1)
+
+    # Weighted (0 / 1) Vandermonde matrices of the scaled abscissas.
+    weight = valid & solvable[:, np.newaxis]
+    x_scaled = np.where(weight, (x - center[:, np.newaxis]) / scale[:, np.newaxis], 0)
+    y_valid = np.where(weight, y, 0)
+    vander = _vandermonde(x_scaled, degree) * weight[..., np.newaxis]
+
+    # Normal equations, (rows, degree + 1, degree + 1): small and well
+    # conditioned on [-1, 1]. The pseudo-inverse copes with degenerate rows.
+    vander_t = vander.transpose(0, 2, 1)
+    gram = vander_t @ vander
+    moments = (vander_t @ y_valid[..., np.newaxis])[..., 0]
+    coef_scaled = (np.linalg.pinv(gram, hermitian=True) @ moments[..., np.newaxis])[..., 0]
+
+    # Residuals and goodness of fit.
+    residuals = np.where(weight, y_valid - (vander @ coef_scaled[..., np.newaxis])[..., 0], 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sum_sq = (residuals ** 2).sum(axis=1)
+        rms = np.sqrt(sum_sq / count)
+        y_mean = y_valid.sum(axis=1) / count
+        total_sq = (np.where(weight, y_valid - y_mean[:, np.newaxis], 0) ** 2).sum(axis=1)
+        r2 = 1 - sum_sq / total_sq
+
+    coef = _unscale(coef_scaled, center, scale)
+    coef[~solvable] = np.nan
+    return {
+        "coef": coef,
+        "count": count,
+        "rms": np.where(solvable, rms, np.nan),
+        "r2": np.where(solvable, r2, np.nan),
+        "x_min": np.where(solvable, x_min, np.nan),
+        "x_max": np.where(solvable, x_max, np.nan),
+    }
+
+
+def evaluate_rows(coef, x):
+    """
+    Value of the polynomial of each row of `coef` at the abscissas `x`
+    (1-D, or one row per polynomial), by Horner's scheme.
+    """
+
+    x = np.asarray(x, dtype=float)
+    out = np.zeros(np.broadcast_shapes(coef.shape[:1] + (1,), x.shape))
+    for k in range(coef.shape[1] - 1, -1, -1):
+        out = out * x + coef[:, k:k + 1]
+    return out
+
+
+def fit_resistance(data, settings):
+    """
+    Fit R(I) for each level and store the result in `data["fit"]`:
+    the arrays of `fit_rows`, the `degree`, and the fitted curves
+    `curve_i` / `curve_r` ((level, FIT.POINTS)) drawn over the
+    current range of each level.
+    """
+
+    opts = settings["FIT"]
+    fit = fit_rows(data["lt_data"]["Current_A"], data["lt_data"]["Resistance_ohm"],
+                   opts["DEGREE"])
+    fit["degree"] = opts["DEGREE"]
+
+    steps = np.linspace(0, 1, opts["POINTS"])
+    fit["curve_i"] = (fit["x_min"][:, np.newaxis]
+                      + (fit["x_max"] - fit["x_min"])[:, np.newaxis] * steps)
+    fit["curve_r"] = evaluate_rows(fit["coef"], fit["curve_i"])
+    data["fit"] = fit
+
+    LOGGER.debug("%s R(I) degree %d fit: %d/%d levels, median RMS %.3g Ω",
+                 data["lt_name"], opts["DEGREE"], np.count_nonzero(np.isfinite(fit["rms"])),
+                 data["level_count"],
+                 np.nanmedian(fit["rms"]) if np.isfinite(fit["rms"]).any() else np.nan)
+    return data
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT INDEX
+
+Header pre-scan, schema validation and byte-offset index of the LabView
+XML data files.
+
+`scan_index` streams over the file once and records, for each element
+directly under the root, its `type`, its `size` and the byte range of its
+text payload, without decoding any value. `validate_index` then checks the
+expected channels and dimensions, so that a malformed file fails in
+milliseconds instead of deep into the parse:
+
+    - missing or repeated channels,
+    - unexpected type, or inconsistent sizes between channels,
+    - payload too short for its declared size, unclosed elements
+      (truncated file).
+
+The index lets `read_channels` seek straight to the payloads of the
+requested channels and decode only them. `resolve_channels` turns a list
+of wanted channels, derived ones included, into the file channels to decode.
+`read_metadata` decodes the per-file metadata (ID, HePressure_mbar), and
+`read_file` both, in one pass.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import html
+import logging
+import re
+
+import numpy as np
+
+from lt_compress import open_data_stream
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Bytes read at once by the scanner.
+BLOCK_SIZE = 1 << 20
+
+# Channels of shape (level_count, meas_count), stored as `size="meas level"`.
+CHANNELS = ("Level_mm", "Voltage_V", "KeithleyTimeStamp", "Current_A", "Resistance_ohm")
+
+# Channels computed from others (see `lt_analysis.calc_resistivity`): channel -> dependencies.
+DERIVED_CHANNELS = {
+    "resistivity": ("Level_mm", "Resistance_ohm"),
+}
+
+# Expected type of each known element.
+TYPES = {
+    "ID": "char",
+    "HePressure_mbar": "double",
+    **{channel: "double" for channel in CHANNELS},
+}
+
+# Opening or closing tag, with its attributes.
+TAG_RE = re.compile(rb"<(/?)([A-Za-z_][\w.-]*)([^>]*?)(/?)>")
+ATTRIB_RE = re.compile(rb'([\w.-]+)="([^"]*)"')
+
+
+class LTFormatError(ValueError):
+    """ The data file does not match the expected LabView XML schema. """
+
+
+def _parse_size(file_name, tag, size):
+    """`"1500 23"` -> (1500, 23)."""
+
+    try:
+        dims = tuple(int(_s) for _s in size.split())
+    except ValueError:
+        dims = ()
+    if len(dims) != 2 or min(dims) < 0:
+        raise LTFormatError(f"{file_name}: invalid size {size!r} for <{tag}>.")
+    return dims
+
+
+def scan_index(file_name, raw=None):
+    """
+    Pre-scan the file (or its already read bytes `raw`) and return its index:
+    `{tag: {"type": str, "size": (rows, cols), "start": int, "end": int}}`
+    for each element directly under the root, where `start` and `end`
+    delimit the text payload in the (uncompressed) stream.
+    No value is decoded. Raises LTFormatError on repeated or unclosed elements.
+    """
+
+    index = {}
+    depth = 0
+    offset = 0  # Stream position of `buffer[0]`.
+    buffer = b""
+    current = None
+    with open_data_stream(file_name, raw) as stream:
+        while True:
+            block = stream.read(BLOCK_SIZE)
+            buffer += block
+            pos = 0
+            for match in TAG_RE.finditer(buffer):
+                pos = match.end()
+                closing, tag, attrib, empty = (match.group(1), match.group(2).decode(),
+                                               match.group(3), match.group(4))
+                if closing:
+                    depth -= 1
+                    if depth == 1 and current is not None:
+                        current["end"] = offset + match.start()
+                        index[current.pop("tag")] = current
+                        current = None
+                    continue
+                if depth == 1:
+                    if tag in index:
+                        raise LTFormatError(f"{file_name}: <{tag}> is repeated.")
+                    attrib = {key.decode(): value.decode()
+                              for key, value in ATTRIB_RE.findall(attrib)}
+                    current = {
+                        "tag": tag,
+                        "type": attrib.get("type"),
+                        "size": _parse_size(file_name, tag, attrib.get("size", "")),
+                        "start": offset + match.end(),
+                    }
+                    if empty:
+                        # `<tag ... />`: empty payload.
+                        current["end"] = current["start"]
+                        index[current.pop("tag")] = current
+                        current = None
+                if not empty:
+                    depth += 1
+            if not block:
+                break
+
+            # Keep the unprocessed tail: it may hold the beginning of a tag.
+            tail_start = buffer.rfind(b"<", pos)
+            if tail_start < 0:
+                tail_start = len(buffer)
+            offset += tail_start
+            buffer = buffer[tail_start:]
+
+    if depth != 0 or current is not None:
+        raise LTFormatError(f"{file_name}: unclosed element, the file is truncated.")
+    return index
+
+
+def validate_index(file_name, index, channels=CHANNELS):
+    """
+    Check that `channels` are present, with the expected type and a common
+    size, and that the payloads are long enough for their declared size.
+    Returns `(meas_count, level_count)`.
+    """
+
+    missing = [channel for channel in channels if channel not in index]
+    if missing:
+        raise LTFormatError(f"{file_name}: missing channels {', '.join(missing)}.")
+
+    for tag, entry in index.items():
+        if tag in TYPES and entry["type"] != TYPES[tag]:
+            raise LTFormatError(f"{file_name}: <{tag}> has type {entry['type']!r}, "
+                                f"expected {TYPES[tag]!r}.")
+        if tag not in TYPES:
+            LOGGER.debug("%s: unknown element <%s> ignored.", file_name, tag)
+
+    sizes = {index[channel]["size"] for channel in channels}
+    if len(sizes) > 1:
+        details = ", ".join(f"{channel} {index[channel]['size']}" for channel in channels)
+        raise LTFormatError(f"{file_name}: inconsistent channel sizes ({details}).")
+    meas_count, level_count = sizes.pop() if sizes else (0, 0)
+
+    # N values need at least 2N - 1 bytes (one digit and one separator each).
+    for channel in channels:
+        count = meas_count * level_count
+        if index[channel]["end"] - index[channel]["start"] < 2 * count - 1:
+            raise LTFormatError(f"{file_name}: <{channel}> payload too short for "
+                                f"{count} values, the file is truncated.")
+
+    if "HePressure_mbar" in index and index["HePressure_mbar"]["size"][0] != level_count:
+        raise LTFormatError(f"{file_name}: <HePressure_mbar> has size "
+                            f"{index['HePressure_mbar']['size']}, expected {level_count} levels.")
+
+    return meas_count, level_count
+
+
+def resolve_channels(channels):
+    """
+    File channels to decode for `channels`, derived channels replaced by
+    their dependencies, in file order and without duplicates.
+    """
+
+    wanted = set()
+    for channel in channels:
+        if channel in DERIVED_CHANNELS:
+            wanted.update(DERIVED_CHANNELS[channel])
+        elif channel in CHANNELS:
+            wanted.add(channel)
+        else:
+            raise ValueError(f"Unknown channel {channel!r}, expected one of "
+                             f"{', '.join(CHANNELS + tuple(DERIVED_CHANNELS))}.")
+    return tuple(channel for channel in CHANNELS if channel in wanted)
+
+
+def _iter_payloads(file_name, index, tags, raw=None):
+    """
+    Yield `(tag, payload bytes)` for `tags`, in file order, from a single
+    stream seeking forward over the other payloads.
+    """
+
+    with open_data_stream(file_name, raw) as stream:
+        for tag in sorted(tags, key=lambda tag: index[tag]["start"]):
+            entry = index[tag]
+            stream.seek(entry["start"])
+            yield tag, stream.read(entry["end"] - entry["start"])
+
+
+def _decode_values(file_name, tag, entry, payload):
+    """Payload of `tag` -> (cols, rows) array, LTFormatError when malformed."""
+
+    rows, cols = entry["size"]
+    try:
+        values = np.array(payload.split(), dtype=np.float64)
+    except ValueError as exc:
+        raise LTFormatError(f"{file_name}: <{tag}> holds a non-numeric value ({exc}).") from exc
+    if values.size != rows * cols:
+        raise LTFormatError(f"{file_name}: <{tag}> holds {values.size} values, "
+                            f"expected {rows} × {cols}.")
+    return values.reshape(cols, rows)
+
+
+def read_file(file_name, index, channels, raw=None):
+    """
+    Decode the payloads of `channels` and the metadata in one pass over the
+    stream. Returns `(channels, metadata)`, see `read_channels` and
+    `read_metadata`.
+
+    With `scan_index`, a compressed file is thus decompressed twice: once
+    for the index, once for the values.
+    """
+
+    out = {}
+    metadata = {"id": None, "he_pressure_mbar": None}
+    tags = tuple(channels) + tuple(tag for tag in ("ID", "HePressure_mbar") if tag in index)
+    for tag, payload in _iter_payloads(file_name, index, tags, raw):
+        if tag == "ID":
+            metadata["id"] = html.unescape(payload.decode()).strip()
+        elif tag == "HePressure_mbar":
+            metadata["he_pressure_mbar"] = _decode_values(file_name, tag, index[tag],
+                                                          payload).ravel()
+        else:
+            out[tag] = _decode_values(file_name, tag, index[tag], payload)
+    return out, metadata
+
+
+def read_channels(file_name, index, channels, raw=None):
+    """
+    Decode only the payloads of `channels` (in any order) and return
+    `{channel: (level_count, meas_count) array}`.
+
+    A single stream is used: the payloads are visited in file order and
+    the stream seeks forward over the others.
+    """
+
+    return {channel: _decode_values(file_name, channel, index[channel], payload)
+            for channel, payload in _iter_payloads(file_name, index, channels, raw)}
+
+
+def read_metadata(file_name, index, raw=None):
+    """
+    Decode the metadata elements of the file:
+    `{"id": str, "he_pressure_mbar": (level_count,) array}`, None when absent.
+    """
+
+    return read_file(file_name, index, (), raw)[1]
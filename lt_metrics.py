@@ -0,0 +1,402 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT METRICS
+
+Throughput metrics of the batch runs (files and bytes parsed, points
+rendered, bytes written, time of each stage), as counters, gauges and
+histograms, exposed in the OpenMetrics text format (Prometheus).
+
+The metrics are declared once, at import time, by the instrumented modules,
+and updated on the hot paths:
+
+    FILES_READ = METRICS.counter("lt_files_read", "Data files read.")
+    READ_TIME = METRICS.histogram("lt_read", "Time to parse a data file.", "seconds")
+
+    FILES_READ.inc()
+    with READ_TIME.time():
+        ...
+
+    @READ_TIME.timed
+    def read(...):
+        ...
+
+`METRICS` is disabled by default: `inc`, `set`, `observe`, `time` and `timed`
+then return at once, without taking a lock or reading the clock. In
+`lt_analysis`, `METRICS.DO_IT = True` enables it; the metrics are written
+to `METRICS.OUT_FILE` at the end of the run, and served on
+`http://127.0.0.1:<METRICS.PORT>/metrics` during the run when PORT > 0.
+
+The worker processes (RENDER_WORKERS) send their `snapshot` back with
+each result, merged into the registry of the main process.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import bisect
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, for durations (s).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Returned by `time` when the registry is disabled.
+_NO_TIMER = nullcontext()
+
+
+def _key(labels):
+    """Labels dict -> hashable, ordered key."""
+
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key, extra=()):
+    """`{name="value",...}`, escaped as in the OpenMetrics text format."""
+
+    pairs = tuple(key) + tuple(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _name, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"'
+                          for (name, _value), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    """ ___ """
+
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+class _Metric():
+    """ Base of the metrics: name, help, unit and the values of each label set. """
+
+    TYPE = ""
+
+    def __init__(self, registry, name, help_text, unit=""):
+
+        self.registry = registry
+        # OpenMetrics: the name of a metric with a unit ends with the unit.
+        self.name = name if not unit or name.endswith(f"_{unit}") else f"{name}_{unit}"
+        self.help_text = help_text
+        self.unit = unit
+        self.values = {}
+
+    def header(self):
+        """ ___ """
+
+        lines = [f"# TYPE {self.name} {self.TYPE}"]
+        if self.unit:
+            lines.append(f"# UNIT {self.name} {self.unit}")
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        return lines
+
+
+class Counter(_Metric):
+    """ Monotonic total, e.g. files read or bytes written. """
+
+    TYPE = "counter"
+
+    def inc(self, value=1, **labels):
+        """ ___ """
+
+        if not self.registry.enabled:
+            return
+        key = _key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def merge(self, values):
+        """ ___ """
+
+        for key, value in values.items():
+            self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self):
+        """ ___ """
+
+        return [f"{self.name}_total{_format_labels(key)} {_format_value(value)}"
+                for key, value in self.values.items()]
+
+
+class Gauge(_Metric):
+    """ Current value, e.g. the duration of the run. """
+
+    TYPE = "gauge"
+
+    def set(self, value, **labels):
+        """ ___ """
+
+        if not self.registry.enabled:
+            return
+        with self.registry.lock:
+            self.values[_key(labels)] = value
+
+    def merge(self, values):
+        """ ___ """
+
+        self.values.update(values)
+
+    def samples(self):
+        """ ___ """
+
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}"
+                for key, value in self.values.items()]
+
+
+class Histogram(_Metric):
+    """ Distribution of observed values (durations by default). """
+
+    TYPE = "histogram"
+
+    def __init__(self, registry, name, help_text, unit="", buckets=DEFAULT_BUCKETS):
+
+        super().__init__(registry, name, help_text, unit)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """ ___ """
+
+        if not self.registry.enabled:
+            return
+        key = _key(labels)
+        with self.registry.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # Per bucket (not cumulative), the last one is +Inf, then sum.
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def time(self, **labels):
+        """Context manager observing the time spent in its block (s)."""
+
+        if not self.registry.enabled:
+            return _NO_TIMER
+        return _Timer(self, labels)
+
+    def timed(self, func):
+        """Decorator observing the time spent in each call of `func`."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.registry.enabled:
+                return func(*args, **kwargs)
+            with _Timer(self, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def merge(self, values):
+        """ ___ """
+
+        for key, counts in values.items():
+            own = self.values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for _i, count in enumerate(counts):
+                own[_i] += count
+
+    def samples(self):
+        """ ___ """
+
+        lines = []
+        for key, counts in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = _format_labels(key, (("le", _format_value(float(bound))),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class _Timer():
+    """ ___ """
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+
+        self.histogram = histogram
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry():
+    """ The metrics of the process, by name. """
+
+    def __init__(self):
+        """ ___ """
+
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.__metrics = {}
+
+    def enable(self, enabled=True):
+        """ ___ """
+
+        self.enabled = enabled
+
+    def __declare(self, cls, name, *args, **kwargs):
+
+        metric = cls(self, name, *args, **kwargs)
+        existing = self.__metrics.get(metric.name)
+        if existing is not None:
+            if not isinstance(existing, cls):
+                raise ValueError(f"Metric {metric.name} is already declared "
+                                 f"as a {existing.TYPE}.")
+            return existing
+        self.__metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, unit=""):
+        """Declare (or get) the counter `name`."""
+
+        return self.__declare(Counter, name, help_text, unit)
+
+    def gauge(self, name, help_text, unit=""):
+        """Declare (or get) the gauge `name`."""
+
+        return self.__declare(Gauge, name, help_text, unit)
+
+    def histogram(self, name, help_text, unit="", buckets=DEFAULT_BUCKETS):
+        """Declare (or get) the histogram `name`."""
+
+        return self.__declare(Histogram, name, help_text, unit, buckets)
+
+    def reset(self):
+        """Clear the values of all the metrics."""
+
+        with self.lock:
+            for metric in self.__metrics.values():
+                metric.values = {}
+
+    def snapshot(self):
+        """
+        Picklable copy of the metrics, e.g. to be sent by a worker process:
+        `{name: (class, help, unit, buckets, values)}`.
+        """
+
+        with self.lock:
+            return {name: (type(metric), metric.help_text, metric.unit,
+                           getattr(metric, "buckets", None),
+                           {key: list(value) if isinstance(value, list) else value
+                            for key, value in metric.values.items()})
+                    for name, metric in self.__metrics.items() if metric.values}
+
+    def merge(self, snapshot):
+        """
+        Add the values of a `snapshot` to this registry. Its metrics are
+        declared here if needed (e.g. those of a module only imported by the
+        workers).
+        """
+
+        with self.lock:
+            for name, (cls, help_text, unit, buckets, values) in snapshot.items():
+                args = (help_text, unit) if buckets is None else (help_text, unit, buckets)
+                self.__declare(cls, name, *args).merge(values)
+
+    def to_openmetrics(self):
+        """All the metrics, in the OpenMetrics text format."""
+
+        lines = []
+        with self.lock:
+            for metric in self.__metrics.values():
+                lines.extend(metric.header())
+                lines.extend(metric.samples())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_name):
+        """Write `to_openmetrics` to `file_name` (atomically, for scrapers)."""
+
+        directory = os.path.dirname(file_name)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(file_name + ".tmp", "w", encoding="utf-8") as _file:
+            _file.write(self.to_openmetrics())
+        os.replace(file_name + ".tmp", file_name)
+        LOGGER.debug("Metrics written to %s", file_name)
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serve `to_openmetrics` on `http://host:port/metrics`, from a daemon
+        thread. Returns the server: call its `shutdown()` to stop it.
+        """
+
+        # pylint: disable=import-outside-toplevel
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """ ___ """
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """ ___ """
+
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.to_openmetrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/openmetrics-text; "
+                                 "version=1.0.0; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                LOGGER.debug(format, *args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        LOGGER.debug("Metrics served on http://%s:%d/metrics", host, server.server_address[1])
+        return server
+
+
+# Registry of the process.
+METRICS = Registry()
+
+# Output written by the backends, by format (file suffix).
+FILES_WRITTEN = METRICS.counter("lt_files_written", "Report and export files written.")
+BYTES_WRITTEN = METRICS.counter("lt_written_bytes", "Bytes of report and export files written.",
+                                "bytes")
+
+
+def record_written(*file_names):
+    """Count the files written (reports, exports and their siblings) in the metrics."""
+
+    if not METRICS.enabled:
+        return
+    for file_name in file_names:
+        if os.path.isfile(file_name):
+            fmt = os.path.splitext(file_name)[1].lstrip(".")
+            FILES_WRITTEN.inc(format=fmt)
+            BYTES_WRITTEN.inc(os.path.getsize(file_name), format=fmt)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT PIPELINE
+
+Thread-backed prefetching pipeline used to overlap file reads (I/O bound),
+parsing (CPU bound) and rendering.
+
+Each stage runs in its own thread and hands its results to the next one
+through a bounded queue. A full queue blocks the producer (backpressure),
+so at most `depth` items are in flight between two stages and the memory
+stays flat however many files are processed. The last stage is run by the
+caller, which consumes the generator returned by `pipeline`.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-18
+
+"""
+
+
+import logging
+import queue
+import threading
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Marks the end of a stream.
+_DONE = object()
+
+# Period at which blocked threads check whether the pipeline was closed.
+_POLL_S = 0.1
+
+
+class _Failure():
+    """Exception raised by a stage, forwarded downstream to the caller."""
+
+    __slots__ = ("exc",)
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def _put(out_queue, item, stop):
+    """Blocking put that gives up when the pipeline is closed."""
+
+    while not stop.is_set():
+        try:
+            out_queue.put(item, timeout=_POLL_S)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(in_queue, stop):
+    """Blocking get that gives up when the pipeline is closed."""
+
+    while not stop.is_set():
+        try:
+            return in_queue.get(timeout=_POLL_S)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def _run_source(items, out_queue, stop):
+    """Feed the items into the first queue."""
+
+    try:
+        for item in items:
+            if not _put(out_queue, item, stop):
+                return
+    except Exception as exc:  # pylint: disable=broad-except
+        _put(out_queue, _Failure(exc), stop)
+    _put(out_queue, _DONE, stop)
+
+
+def _run_stage(func, in_queue, out_queue, stop):
+    """Apply `func` to every item of `in_queue` and push the results downstream."""
+
+    while True:
+        item = _get(in_queue, stop)
+        if item is _DONE or isinstance(item, _Failure):
+            _put(out_queue, item, stop)
+            return
+        try:
+            result = func(item)
+        except Exception as exc:  # pylint: disable=broad-except
+            _put(out_queue, _Failure(exc), stop)
+            return
+        if not _put(out_queue, result, stop):
+            return
+
+
+def pipeline(items, stages, depth=1):
+    """
+    Yield `stages[-1](...stages[0](item))` for each item, in order.
+
+    Every stage runs in a dedicated thread while the caller consumes the
+    results, so e.g. the file N+1 is read while the file N is parsed and
+    rendered. `depth` is the size of the queues between the stages.
+    With `depth < 1`, everything runs sequentially in the caller thread.
+    """
+
+    if depth < 1:
+        for item in items:
+            for func in stages:
+                item = func(item)
+            yield item
+        return
+
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=depth) for _ in range(len(stages) + 1)]
+    threads = [threading.Thread(target=_run_source,
+                                args=(items, queues[0], stop),
+                                name="lt-pipeline-source", daemon=True)]
+    for _i, func in enumerate(stages):
+        threads.append(threading.Thread(target=_run_stage,
+                                        args=(func, queues[_i], queues[_i + 1], stop),
+                                        name=f"lt-pipeline-{_i}", daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        # Release the stage threads, even when the consumer stops early.
+        stop.set()
+        for thread in threads:
+            thread.join()
+        LOGGER.debug("Pipeline closed.")
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT REPORT
+
+Incremental report update: each figure of a report is rendered to an HTML
+fragment, cached on disk, and only re-rendered when its inputs changed.
+
+A renderer supporting it (PlotBokeh, PlotPlotly) declares, for each step,
+the data and settings it depends on:
+
+    INPUTS = {step: (data paths, settings paths)}
+
+with dotted paths such as `"lt_data.Current_A"`, `"events.Current_A"` or
+`"GENERAL.PLOT_WIDTH"`, and implements:
+
+    render_fragment(step, part=None) -> str  run the step, return its HTML fragment
+    write_fragments(fragments)               splice the fragments into the report
+
+Each figure is rendered to its own fragment. A step drawing several figures
+splits them into parts with `fragment_inputs(step) -> [(part, inputs)]`,
+e.g. one heatmap per channel, keyed on that channel only. The figures
+sharing an axis (e.g. the Bokeh time traces) are linked in the browser by
+the script of `write_fragments`.
+
+The cache key of a fragment is a digest of the backend, its version, the
+step, the part and the values of their inputs. E.g. a new `LT_MAX_LEVEL`
+changes the resistivity only, so only the resistivity figures are
+re-rendered; the other fragments are read back from the cache.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import glob
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+from lt_backends import RENDER_TIME
+from lt_metrics import METRICS
+from lt_sparse import SparseRows
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Placeholder digested for the inputs absent from the data.
+MISSING = b"<missing>"
+
+# Fragments read from the cache (hit) or rendered (miss), see lt_metrics.
+FRAGMENTS = METRICS.counter("lt_fragments", "Report fragments, by cache result.")
+
+
+def _update_digest(digest, value):
+    """Feed `value` (arrays, SparseRows, containers, scalars) to `digest`."""
+
+    if isinstance(value, np.ndarray):
+        digest.update(f"array {value.dtype.str} {value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, SparseRows):
+        digest.update(f"sparse {tuple(value.shape)}".encode())
+        for field in ("levels", "indptr", "indices", "values"):
+            _update_digest(digest, getattr(value, field))
+    elif isinstance(value, dict):
+        digest.update(f"dict {len(value)}".encode())
+        for key in sorted(value, key=str):
+            digest.update(repr(key).encode())
+            _update_digest(digest, value[key])
+    elif isinstance(value, (tuple, list)):
+        digest.update(f"seq {len(value)}".encode())
+        for item in value:
+            _update_digest(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+
+def _lookup(root, path):
+    """Value at the dotted `path` of the nested mapping `root`, MISSING if absent."""
+
+    value = root
+    for key in path.split("."):
+        try:
+            value = value[key]
+        except (KeyError, TypeError):
+            return MISSING
+    return value
+
+
+class FragmentCache():
+    """ Rendered fragments of the reports, one file per (backend, file, fragment). """
+
+    def __init__(self, cache_dir):
+        """ ___ """
+
+        self.cache_dir = cache_dir
+        self.__digests = {}
+
+    def key(self, backend, version, step, inputs, data, settings):
+        """Cache key of the fragment of `step`, for `inputs` = (data paths, settings paths)."""
+
+        data_paths, settings_paths = inputs
+        digest = hashlib.blake2b(f"{backend} {version} {step}".encode(), digest_size=16)
+        for path in data_paths:
+            # The digests of the data inputs are shared by the steps.
+            if path not in self.__digests:
+                value_digest = hashlib.blake2b(digest_size=16)
+                _update_digest(value_digest, _lookup(data, path))
+                self.__digests[path] = value_digest.digest()
+            digest.update(path.encode() + self.__digests[path])
+        for path in settings_paths:
+            digest.update(path.encode())
+            _update_digest(digest, _lookup(settings, path))
+        return digest.hexdigest()
+
+    def __path(self, backend, lt_name, step, key):
+
+        return os.path.join(self.cache_dir, backend, lt_name, f"{step}-{key}.html")
+
+    def get(self, backend, lt_name, step, key):
+        """The cached fragment, None on a miss."""
+
+        try:
+            with open(self.__path(backend, lt_name, step, key), encoding="utf-8") as _file:
+                return _file.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, backend, lt_name, step, key, fragment):
+        """Store `fragment`, replacing the previous versions of the same step."""
+
+        file_name = self.__path(backend, lt_name, step, key)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        pattern = glob.escape(os.path.join(os.path.dirname(file_name), step)) + "-*.html"
+        for stale in glob.glob(pattern):
+            os.remove(stale)
+        with open(file_name + ".tmp", "w", encoding="utf-8") as _file:
+            _file.write(fragment)
+        os.replace(file_name + ".tmp", file_name)
+
+
+def fragment_inputs(plt, step):
+    """
+    `[(part, inputs)]` of the fragments of `step`: those of the renderer's
+    `fragment_inputs`, else a single fragment with the inputs of the step.
+    """
+
+    if hasattr(plt, "fragment_inputs"):
+        return plt.fragment_inputs(step)
+    return [(None, plt.INPUTS[step])]
+
+
+def do_plots_incremental(name, plt, steps, data, settings):
+    """
+    `lt_backends.do_plots` with cached fragments: the figures of `steps`
+    whose inputs did not change since the last run are read from the cache
+    of `GENERAL.CACHE_DIR`. The last step must be `write_to_html_file`.
+    """
+
+    cache = FragmentCache(settings["GENERAL"]["CACHE_DIR"])
+    version = getattr(plt, "FRAGMENT_VERSION", "")
+    fragments = []
+    rendered = []
+    for step in steps:
+        if step == "write_to_html_file":
+            continue
+        for part, inputs in fragment_inputs(plt, step):
+            fragment_name = step if part is None else f"{step}.{part}"
+            key = cache.key(name, version, fragment_name, inputs, data, settings)
+            fragment = cache.get(name, data["lt_name"], fragment_name, key)
+            FRAGMENTS.inc(backend=name, result="hit" if fragment is not None else "miss")
+            if fragment is None:
+                with RENDER_TIME.time(backend=type(plt).__name__, step=step):
+                    fragment = plt.render_fragment(step, part)
+                cache.put(name, data["lt_name"], fragment_name, key, fragment)
+                rendered.append(fragment_name)
+            fragments.append(fragment)
+    with RENDER_TIME.time(backend=type(plt).__name__, step="write_to_html_file"):
+        plt.write_fragments(fragments)
+
+    LOGGER.debug("%s %s: %d/%d fragments rendered (%s)", name, data["lt_name"],
+                 len(rendered), len(fragments), ", ".join(rendered) or "none")
+    return rendered
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT RESAMPLE
+
+Resampling of (level, meas) channels, each level on its own irregular
+time base, onto a common uniform time grid, so that all the levels share a
+single time column.
+
+Methods: "linear" (interpolation), "nearest" (nearest sample) and
+"bin_mean" (mean of the samples in the bin centered on each grid point).
+
+All the levels are processed at once: for "linear" and "nearest", each
+level is shifted along the time axis by a multiple of an offset larger than
+any time span, so that the concatenated rows form one non-decreasing
+abscissa for a single `np.interp` / `np.searchsorted` call. "bin_mean" uses
+a single `np.bincount` over (level, bin) indices.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import numpy as np
+
+
+def _row_offsets(xp, x):
+    """Offsets separating the rows of `xp` (and of `x`) on a single axis."""
+
+    low = min(np.nanmin(xp), np.nanmin(x))
+    high = max(np.nanmax(xp), np.nanmax(x))
+    span = (high - low) + 1.0
+    return (np.arange(xp.shape[0], dtype=np.float64) * span)[:, None] - low
+
+
+def interp_rows(x, xp, fp):
+    """
+    Linear interpolation of each row of `fp` (abscissas `xp`, non-decreasing
+    along each row) at the abscissas `x`.
+
+    `x` is either 1-D (same grid for all rows) or 2-D (one grid per row).
+    Values outside the range of a row are NaN.
+    """
+
+    x = np.broadcast_to(x, (xp.shape[0],) + np.shape(x)[-1:])
+    offsets = _row_offsets(xp, x)
+    out = np.interp((x + offsets).ravel(), (xp + offsets).ravel(),
+                    fp.ravel()).reshape(x.shape)
+    out[(x < xp[:, :1]) | (x > xp[:, -1:])] = np.nan
+    return out
+
+
+def nearest_rows(x, xp, fp):
+    """
+    Nearest-sample resampling of each row of `fp` (abscissas `xp`,
+    non-decreasing along each row) at the abscissas `x` (1-D or 2-D).
+    Values outside the range of a row are NaN.
+    """
+
+    x = np.broadcast_to(x, (xp.shape[0],) + np.shape(x)[-1:])
+    offsets = _row_offsets(xp, x)
+    xp_flat = (xp + offsets).ravel()
+    x_flat = (x + offsets).ravel()
+
+    # Index of the right neighbour in the flattened rows, then pick the closest
+    # of the left / right neighbours. Rows are kept apart by the offsets and
+    # the out of range values are masked below.
+    right = np.clip(np.searchsorted(xp_flat, x_flat), 1, len(xp_flat) - 1)
+    left = right - 1
+    idx = np.where(x_flat - xp_flat[left] <= xp_flat[right] - x_flat, left, right)
+    out = fp.ravel()[idx].reshape(x.shape)
+    out[(x < xp[:, :1]) | (x > xp[:, -1:])] = np.nan
+    return out
+
+
+def bin_mean_rows(x, xp, fp):
+    """
+    Mean of the samples of each row of `fp` (abscissas `xp`) falling in the
+    bins centered on the uniform grid `x` (1-D). Empty bins are NaN.
+    All the rows are binned in a single `np.bincount`.
+    """
+
+    level_count = xp.shape[0]
+    bin_count = len(x)
+    step = (x[-1] - x[0]) / (bin_count - 1) if bin_count > 1 else 1.0
+    bins = np.floor((xp - x[0]) / step + 0.5)
+    valid = np.isfinite(fp) & (bins >= 0) & (bins < bin_count)
+    flat_bins = (np.arange(level_count)[:, None] * bin_count + bins)[valid].astype(np.int64)
+    size = level_count * bin_count
+    sums = np.bincount(flat_bins, weights=fp[valid], minlength=size)
+    counts = np.bincount(flat_bins, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (sums / counts).reshape(level_count, bin_count)
+
+
+# Resampling methods: name -> function(x, xp, fp).
+METHODS = {
+    "linear": interp_rows,
+    "nearest": nearest_rows,
+    "bin_mean": bin_mean_rows,
+}
+
+
+def resample_rows(x, xp, fp, method="linear"):
+    """ Resample each row of `fp` (abscissas `xp`) at `x` with `method` (see METHODS). """
+
+    try:
+        func = METHODS[method]
+    except KeyError as exc:
+        raise ValueError(f"Unknown resampling method {method!r}, "
+                         f"expected one of {', '.join(METHODS)}.") from exc
+    return func(x, xp, fp)
+
+
+def resample(data, settings):
+    """
+    Resample the channels `settings["RESAMPLE"]["CHANNELS"]` onto a shared
+    uniform time grid of step `STEP_S`.
+
+    With `TIME_BASE = "relative"`, the time is counted from the start of each
+    level (the levels are measured one after the other, so this is the base
+    on which they can be compared). With `"absolute"`, the time is the
+    KeithleyTimeStamp itself.
+
+    The result is stored in `data["resampled"]`:
+    `{"time": (n,) grid, "time_base": ..., "method": ...,
+    "channels": {channel: (level_count, n)}}`.
+    """
+
+    opts = settings["RESAMPLE"]
+    time_s = data["lt_data"]["KeithleyTimeStamp"]
+    if opts["TIME_BASE"] == "relative":
+        time_s = time_s - time_s[:, :1]
+    elif opts["TIME_BASE"] != "absolute":
+        raise ValueError(f"Unknown time base {opts['TIME_BASE']!r}, "
+                         "expected 'relative' or 'absolute'.")
+
+    start, stop = np.min(time_s[:, 0]), np.max(time_s[:, -1])
+    grid = start + opts["STEP_S"] * np.arange(int(np.floor((stop - start) / opts["STEP_S"])) + 1)
+
+    channels = {}
+    for channel in opts["CHANNELS"]:
+        values = data["lt_data"][channel]
+        if hasattr(values, "to_dense"):
+            values = values.to_dense()
+        channels[channel] = resample_rows(grid, time_s, values, opts["METHOD"])
+
+    data["resampled"] = {
+        "time": grid,
+        "time_base": opts["TIME_BASE"],
+        "method": opts["METHOD"],
+        "channels": channels,
+    }
+    return data
+
+
+def level_raster(data, channel, dtype=np.float32):
+    """
+    Level × time raster of the resampled `channel`, for heatmaps:
+    `(time, level_mm, raster)` with the levels sorted in increasing order.
+    `dtype` defaults to float32, which halves the size of the reports.
+    """
+
+    resampled = data["resampled"]
+    level_mm = data["lt_data"]["Level_mm"][:, 0]
+    order = np.argsort(level_mm)
+    raster = resampled["channels"][channel][order].astype(dtype)
+    return resampled["time"], level_mm[order], raster
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT SETTINGS
+
+Settings loaded from a TOML file and command line overrides, validated once
+against the defaults (`lt_analysis.SETTINGS`) and frozen.
+
+    python lt_analysis.py --config batch.toml --set GENERAL.LT_MAX_LEVEL=300
+
+The TOML file holds one table per settings section, with any subset of
+the keys:
+
+    [GENERAL]
+    DATA_FILES = ["LT01"]
+    PREFETCH_DEPTH = 2
+
+    [CHUNKED]
+    DO_IT = true
+
+`--set SECTION.KEY=VALUE` overrides are applied after the file. The value
+is read as a TOML value (`300`, `true`, `["LT01", "LT30"]`), or else as a
+plain string.
+
+Every key must exist in the defaults, with a value of the same type (an
+integer is accepted for a float, a list for a tuple). The result is a
+`Settings` object: sections are read-only mappings, lists are turned into
+tuples, and the per-level styles used by the renderers are precomputed.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import functools
+import tomllib
+from types import MappingProxyType
+
+
+class SettingsError(ValueError):
+    """ Invalid settings file, override or value. """
+
+
+# Additional checks: (section, key) -> (predicate, expected).
+CHECKS = {
+    ("GENERAL", "LT_MAX_LEVEL"): (lambda value: value > 0, "> 0"),
+    ("GENERAL", "PLOT_WIDTH"): (lambda value: value > 0, "> 0"),
+    ("GENERAL", "PLOT_HEIGHT"): (lambda value: value > 0, "> 0"),
+    ("GENERAL", "PREFETCH_DEPTH"): (lambda value: value >= 0, ">= 0"),
+    ("GENERAL", "RENDER_WORKERS"): (lambda value: value >= 0, ">= 0"),
+    ("GENERAL", "COLORS"): (lambda value: len(value) > 0, "at least one colour"),
+    ("GENERAL", "HTML_COMPRESSION"): (lambda value: set(value) <= {"gz", "br"},
+                                      'among "gz", "br"'),
+    ("EVENTS", "WINDOW"): (lambda value: value >= 3 and value % 2, "odd and >= 3"),
+    ("EVENTS", "STEP_WINDOW"): (lambda value: value >= 1, ">= 1"),
+    ("FIT", "DEGREE"): (lambda value: 0 <= value <= 5, "between 0 and 5"),
+    ("FIT", "POINTS"): (lambda value: value >= 2, ">= 2"),
+    ("CHUNKED", "CHUNK_SIZE"): (lambda value: value > 0, "> 0"),
+    ("CHUNKED", "DOWNSAMPLE"): (lambda value: value >= 1, ">= 1"),
+    ("RESAMPLE", "STEP_S"): (lambda value: value > 0, "> 0"),
+    ("RESAMPLE", "METHOD"): (lambda value: value in ("linear", "nearest", "bin_mean"),
+                             '"linear", "nearest" or "bin_mean"'),
+    ("RESAMPLE", "TIME_BASE"): (lambda value: value in ("relative", "absolute"),
+                                '"relative" or "absolute"'),
+    ("COMPARE", "POINTS"): (lambda value: value >= 2, ">= 2"),
+    ("COMPARE", "METHOD"): (lambda value: value in ("linear", "nearest", "bin_mean"),
+                            '"linear", "nearest" or "bin_mean"'),
+    ("METRICS", "PORT"): (lambda value: 0 <= value <= 65535, "between 0 and 65535"),
+}
+
+
+class Settings():
+    """
+    Frozen, validated settings.
+
+    `settings["SECTION"]["KEY"]` reads a value, as with the SETTINGS dict.
+
+    level_styles : `(color, alpha_1, alpha_6, circle_size)` of each colour,
+                   precomputed from GENERAL.COLORS and the BOKEH alphas/size,
+                   see `level_style`.
+    """
+
+    __slots__ = ("sections", "level_styles")
+
+    def __init__(self, sections):
+
+        sections = MappingProxyType({name: MappingProxyType(dict(section))
+                                     for name, section in sections.items()})
+        object.__setattr__(self, "sections", sections)
+        object.__setattr__(self, "level_styles", _level_styles(sections))
+
+    def __setattr__(self, name, value):
+
+        raise AttributeError("Settings are frozen.")
+
+    def __reduce__(self):
+        # Mapping proxies can't be pickled, e.g. to be sent to worker processes.
+        return (Settings, (self.to_dict(),))
+
+    def __getitem__(self, name):
+
+        return self.sections[name]
+
+    def __contains__(self, name):
+
+        return name in self.sections
+
+    def __iter__(self):
+
+        return iter(self.sections)
+
+    def to_dict(self):
+        """Mutable copy, e.g. to derive other settings."""
+
+        return {name: dict(section) for name, section in self.sections.items()}
+
+
+@functools.lru_cache(maxsize=16)
+def _styles(colors, alpha_1, alpha_6, circle_size):
+    """ ___ """
+
+    return tuple((color, alpha_1, alpha_6, circle_size) for color in colors)
+
+
+def _level_styles(sections):
+    """
+    `(color, alpha_1, alpha_6, circle_size)` of each colour of GENERAL.COLORS,
+    memoised on these settings (e.g. for the plain dicts, see `level_style`).
+    """
+
+    bokeh = sections["BOKEH"]
+    return _styles(tuple(sections["GENERAL"]["COLORS"]),
+                   bokeh["ALPHA_1"], bokeh["ALPHA_6"], bokeh["CIRCLE_SIZE"])
+
+
+def level_style(settings, level):
+    """
+    `(color, alpha_1, alpha_6, circle_size)` of `level`. The colours are
+    cycled when there are more levels than GENERAL.COLORS. `settings` is
+    a `Settings` or a plain SETTINGS dict.
+    """
+
+    styles = getattr(settings, "level_styles", None) or _level_styles(settings)
+    return styles[level % len(styles)]
+
+
+def _freeze(value):
+    """Lists -> tuples, recursively."""
+
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _check_value(section, key, value, default):
+    """Validate `value` against the type of `default`, return the frozen value."""
+
+    name = f"{section}.{key}"
+    if isinstance(default, bool):
+        valid = isinstance(value, bool)
+    elif isinstance(default, int):
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    elif isinstance(default, float):
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        value = float(value) if valid else value
+    elif isinstance(default, (list, tuple)):
+        valid = isinstance(value, (list, tuple))
+    else:
+        valid = isinstance(value, type(default))
+    if not valid:
+        raise SettingsError(f"{name}: expected {type(default).__name__}, "
+                            f"got {type(value).__name__} ({value!r}).")
+
+    value = _freeze(value)
+    predicate, expected = CHECKS.get((section, key), (None, None))
+    if predicate is not None and not predicate(value):
+        raise SettingsError(f"{name}: {value!r} is invalid, expected {expected}.")
+    return value
+
+
+def parse_override(override):
+    """`"SECTION.KEY=VALUE"` -> `(section, key, value)`."""
+
+    name, sep, text = override.partition("=")
+    section, dot, key = name.strip().partition(".")
+    if not sep or not dot or not section or not key:
+        raise SettingsError(f"Invalid override {override!r}, expected SECTION.KEY=VALUE.")
+    try:
+        value = tomllib.loads(f"value = {text.strip()}")["value"]
+    except tomllib.TOMLDecodeError:
+        value = text.strip()
+    return section, key, value
+
+
+def load_settings(defaults, config_file=None, overrides=()):
+    """
+    Validate the `defaults` updated with `config_file` (TOML) and the
+    `overrides` (`"SECTION.KEY=VALUE"` strings), and return a `Settings`.
+    """
+
+    sections = {name: dict(section) for name, section in defaults.items()}
+
+    updates = []
+    if config_file is not None:
+        try:
+            with open(config_file, "rb") as _file:
+                content = tomllib.load(_file)
+        except (OSError, tomllib.TOMLDecodeError) as error:
+            raise SettingsError(f"{config_file}: {error}") from error
+        for section, values in content.items():
+            if not isinstance(values, dict):
+                raise SettingsError(f"{config_file}: {section} is not a [section].")
+            updates.extend((section, key, value) for key, value in values.items())
+    updates.extend(parse_override(override) for override in overrides)
+
+    for section, key, value in updates:
+        if section not in sections:
+            raise SettingsError(f"Unknown settings section {section!r}.")
+        if key not in sections[section]:
+            raise SettingsError(f"Unknown setting {section}.{key}.")
+        sections[section][key] = value
+
+    for section, values in sections.items():
+        for key, value in values.items():
+            values[key] = _check_value(section, key, value, defaults[section][key])
+
+    return Settings(sections)
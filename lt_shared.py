@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT SHARED
+
+Zero-copy handoff of a data dict (as returned by `read_data` and the
+processing steps) to worker processes, through `multiprocessing.shared_memory`.
+
+The owner copies every array of the data dict, once, into a single shared
+memory segment, and hands the workers a small, picklable descriptor
+(segment name, offset / shape / dtype of each array, and the scalar
+values). The workers reattach to the segment and get the data dict back
+with read-only array views on it, instead of unpickling their own copy.
+
+    with publish(data) as descriptor:
+        pool.map(job, [descriptor] * n)
+
+    def job(descriptor):
+        with attach(descriptor) as data:
+            ...
+
+Only the owner unlinks the segment, when `publish` exits, whatever
+happened in the workers (a crashed worker just drops its mapping). If
+the owner itself dies, the segment is unlinked by the resource tracker of
+multiprocessing.
+
+Supported content: nested dicts, tuples / lists, numpy arrays, SparseRows
+and scalars (str, int, float, bool, None, numpy scalars).
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import logging
+import sys
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from lt_sparse import SparseRows
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Alignment of the arrays in the segment (bytes).
+ALIGNMENT = 64
+
+# Tag of the SparseRows nodes in the descriptor.
+SPARSE_FIELDS = ("levels", "indptr", "indices", "values")
+
+
+def _layout(node, arrays):
+    """
+    Descriptor tree of `node`: the arrays are appended to `arrays` and
+    replaced by `("array", index)`.
+    """
+
+    if isinstance(node, np.ndarray):
+        arrays.append(node)
+        return ("array", len(arrays) - 1)
+    if isinstance(node, SparseRows):
+        return ("sparse", tuple(node.shape),
+                {field: _layout(getattr(node, field), arrays) for field in SPARSE_FIELDS})
+    if isinstance(node, dict):
+        return ("dict", {key: _layout(value, arrays) for key, value in node.items()})
+    if isinstance(node, (tuple, list)):
+        return ("tuple" if isinstance(node, tuple) else "list",
+                [_layout(value, arrays) for value in node])
+    if isinstance(node, np.generic):
+        return ("value", node.item())
+    if node is None or isinstance(node, (str, int, float, bool)):
+        return ("value", node)
+    raise TypeError(f"Cannot share a {type(node).__name__}.")
+
+
+def _rebuild(layout, arrays):
+    """Inverse of `_layout`, with the arrays taken from `arrays`."""
+
+    kind = layout[0]
+    if kind == "array":
+        return arrays[layout[1]]
+    if kind == "sparse":
+        fields = {field: _rebuild(value, arrays) for field, value in layout[2].items()}
+        return SparseRows(layout[1], **fields)
+    if kind == "dict":
+        return {key: _rebuild(value, arrays) for key, value in layout[1].items()}
+    if kind == "tuple":
+        return tuple(_rebuild(value, arrays) for value in layout[1])
+    if kind == "list":
+        return [_rebuild(value, arrays) for value in layout[1]]
+    return layout[1]
+
+
+def _views(buf, entries):
+    """Read-only arrays on the shared buffer `buf`."""
+
+    arrays = []
+    for offset, shape, dtype in entries:
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=buf, offset=offset)
+        array.flags.writeable = False
+        arrays.append(array)
+    return arrays
+
+
+def _close(shm):
+    """Close the mapping of `shm`, unless views on it are still referenced."""
+
+    try:
+        shm.close()
+    except BufferError:
+        # Views still alive: the mapping is released with them.
+        LOGGER.debug("Shared memory %s still referenced, left mapped.", shm.name)
+
+
+@contextmanager
+def publish(data):
+    """
+    Copy the arrays of `data` into a new shared memory segment and yield
+    its descriptor. The segment is unlinked on exit, even on error.
+    """
+
+    arrays = []
+    layout = _layout(data, arrays)
+
+    entries = []
+    size = 0
+    for array in arrays:
+        size = -(-size // ALIGNMENT) * ALIGNMENT
+        entries.append((size, array.shape, array.dtype.str))
+        size += array.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        for array, view in zip(arrays, _views(shm.buf, entries)):
+            view.flags.writeable = True
+            view[...] = array
+            del view
+        descriptor = {"shm_name": shm.name, "size": size, "entries": entries, "layout": layout}
+        LOGGER.debug("Published %d arrays (%0.1f MB) to %s",
+                     len(arrays), size / 1e6, shm.name)
+        yield descriptor
+    finally:
+        _close(shm)
+        shm.unlink()
+        LOGGER.debug("Unlinked %s", shm.name)
+
+
+@contextmanager
+def attach(descriptor):
+    """
+    Reattach to the segment of `descriptor` (see `publish`) and yield the
+    data dict, whose arrays are read-only views on the shared memory.
+    The segment is not unlinked: it belongs to the publisher.
+    """
+
+    # The workers started by multiprocessing share the resource tracker of
+    # the publisher: registering the segment again there is harmless (the
+    # publisher unregisters it when unlinking). From Python 3.13, it is not
+    # registered at all.
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(descriptor["shm_name"], track=False)  # pylint: disable=unexpected-keyword-arg
+    else:
+        shm = shared_memory.SharedMemory(descriptor["shm_name"])
+    try:
+        arrays = _views(shm.buf, descriptor["entries"])
+        data = _rebuild(descriptor["layout"], arrays)
+        del arrays
+        yield data
+    finally:
+        data = None
+        _close(shm)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+LT SPARSE
+
+Row-compressed storage for (level, meas) channels where only part of the
+samples are defined, e.g. the resistivity which is undefined for
+`level >= LT_MAX_LEVEL`.
+
+Only the valid samples are stored (CSR layout), so the memory footprint and
+the work done by the renderers scale with the number of valid samples
+instead of `level_count × meas_count`.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-18
+
+"""
+
+
+import numpy as np
+
+
+class SparseRows():
+    """
+    Valid samples of a (level_count, meas_count) channel.
+
+    levels  : indices of the levels holding at least one valid sample.
+    indptr  : `values[indptr[i]:indptr[i + 1]]` belong to `levels[i]`.
+    indices : measurement index of each stored value.
+    values  : the valid samples, level after level.
+    """
+
+    __slots__ = ("shape", "levels", "indptr", "indices", "values")
+
+    def __init__(self, shape, levels, indptr, indices, values):
+
+        self.shape = shape
+        self.levels = levels
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+
+    @classmethod
+    def from_mask(cls, values, mask):
+        """
+        Build from the valid samples `values`, taken from a dense array in
+        row-major order with the boolean `mask` (i.e. `dense[mask]`).
+        """
+
+        counts = np.count_nonzero(mask, axis=1)
+        levels = np.flatnonzero(counts)
+        indptr = np.zeros(len(levels) + 1, dtype=np.int64)
+        np.cumsum(counts[levels], out=indptr[1:])
+        indices = np.nonzero(mask)[1]
+        return cls(mask.shape, levels, indptr, indices, values)
+
+    @classmethod
+    def from_dense(cls, dense):
+        """Build from a dense array where invalid samples are NaN."""
+
+        mask = np.isfinite(dense)
+        return cls.from_mask(dense[mask], mask)
+
+    def __iter__(self):
+        """Yield `(level, meas_indices, values)` for each valid level."""
+
+        for _i, level in enumerate(self.levels):
+            start, stop = self.indptr[_i], self.indptr[_i + 1]
+            yield int(level), self.indices[start:stop], self.values[start:stop]
+
+    def iter_lines(self):
+        """
+        `__iter__`, with a NaN sample inserted where measurements are skipped
+        (at the index of the previous sample): a line drawn through the
+        samples of a level is broken at the gaps instead of bridging them.
+        """
+
+        for level, meas, values in self:
+            gaps = np.flatnonzero(np.diff(meas) > 1) + 1
+            if len(gaps):
+                meas = np.insert(meas, gaps, meas[gaps - 1])
+                values = np.insert(values, gaps, np.nan)
+            yield level, meas, values
+
+    def __len__(self):
+        return len(self.levels)
+
+    @property
+    def level_mask(self):
+        """Per-level validity: True if the level holds at least one sample."""
+
+        mask = np.zeros(self.shape[0], dtype=bool)
+        mask[self.levels] = True
+        return mask
+
+    @property
+    def nnz(self):
+        """Number of stored (valid) samples."""
+
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        """Memory used by the stored arrays."""
+
+        return (self.levels.nbytes + self.indptr.nbytes
+                + self.indices.nbytes + self.values.nbytes)
+
+    def to_dense(self, fill_value=np.nan):
+        """Dense (level_count, meas_count) copy, invalid samples set to `fill_value`."""
+
+        dense = np.full(self.shape, fill_value, dtype=self.values.dtype)
+        rows = np.repeat(self.levels, np.diff(self.indptr))
+        dense[rows, self.indices] = self.values
+        return dense
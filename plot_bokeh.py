@@ -13,19 +13,87 @@ This module shows some basic plotting techniques with Bokeh.
 """
 
 
+import json
 import logging
 import os
 
 import bokeh
+import numpy as np
+from bokeh.embed import components
 from bokeh.layouts import column
-from bokeh.models import ColumnDataSource, Legend, NumeralTickFormatter, Title
+from bokeh.models import (ColorBar, ColumnDataSource, Legend, LinearColorMapper,
+                          NumeralTickFormatter, Title)
 from bokeh.models.widgets import Div
 from bokeh.plotting import figure, output_file, save, show
+from bokeh.resources import CDN
+from bokeh.util.browser import view
+
+from lt_backends import FIGURE_DATA, HEATMAP_DATA
+from lt_compress import ReportWriter, compress_file
+from lt_metrics import METRICS, record_written
+from lt_resample import level_raster
+from lt_settings import level_style
+
+
+# Settings each figure depends on, see lt_report.
+FIGURE_SETTINGS = ("GENERAL.COLORS", "GENERAL.PLOT_WIDTH", "GENERAL.PLOT_HEIGHT",
+                   "BOKEH.TOOLS", "BOKEH.ALPHA_1", "BOKEH.ALPHA_6", "BOKEH.CIRCLE_SIZE")
+
+# Samples sent to the figures, see lt_metrics.
+POINTS_RENDERED = METRICS.counter("lt_points_rendered", "Samples drawn in the figures.")
+
+# Names of the groups of figures sharing their x axis (time).
+LINKED_AXES = ("lt_time_trace", "lt_heatmap")
+
+# Heatmaps: (channel, label, unit, tick format).
+HEATMAPS = (("Current_A", "Current", "A", "0.000"),
+            ("Resistance_ohm", "Resistance", "Ω", "0"),
+            ("resistivity", "Resistivity", "Ω/mm", "0.000"))
+
+# Links the x axes of the figures of each group of LINKED_AXES, when they
+# are rendered in separate fragments, i.e. separate Bokeh documents.
+LINK_AXES_SCRIPT = """<script>
+window.addEventListener("load", function () {
+  for (const name of %s) {
+    const ranges = Bokeh.documents
+      .map((doc) => doc.get_model_by_name(name))
+      .filter((plot) => plot != null)
+      .map((plot) => plot.x_range);
+    let syncing = false;
+    for (const source of ranges) {
+      const sync = () => {
+        if (syncing) {
+          return;
+        }
+        syncing = true;
+        for (const range of ranges) {
+          if (range !== source) {
+            range.setv({start: source.start, end: source.end});
+          }
+        }
+        syncing = false;
+      };
+      source.properties.start.change.connect(sync);
+      source.properties.end.change.connect(sync);
+    }
+  }
+});
+</script>
+"""
 
 
 class PlotBokeh():
     """ ___ """
 
+    # Inputs of each step: (data paths, settings paths), see lt_report.
+    INPUTS = {
+        **{step: (paths, FIGURE_SETTINGS) for step, paths in FIGURE_DATA.items()},
+        "title": (FIGURE_DATA["title"], ()),
+        "plot_heatmaps": (FIGURE_DATA["plot_heatmaps"],
+                          FIGURE_SETTINGS + ("BOKEH.HEATMAP_PALETTE",)),
+    }
+    FRAGMENT_VERSION = f"bokeh {bokeh.__version__}"
+
     def __init__(self, settings, data):
         """ ___ """
 
@@ -34,12 +102,57 @@ class PlotBokeh():
         self.__html_elems = []
         self.__plot_margin = (20, 100, 20, 100)
 
-        # ID of the plot that is used for common x_range.
-        self.__master_x_range = 1
+        # First figure of each group of LINKED_AXES, whose x_range is shared
+        # by the other ones.
+        self.__linked = {}
 
         self.__logger = logging.getLogger(__name__)
         self.__logger.debug("bokeh %s", bokeh.__version__)
 
+    def __append(self, plt):
+        """ Append the figure `plt` to the HTML elements of the report. """
+
+        if METRICS.enabled:
+            # Each data source counts once, even when drawn by several glyphs.
+            sources = {id(renderer.data_source): renderer.data_source
+                       for renderer in plt.renderers}
+            POINTS_RENDERED.inc(sum(max((np.size(values) for values in source.data.values()),
+                                        default=0) for source in sources.values()),
+                                backend="bokeh")
+        self.__html_elems.append(plt)
+
+    def __plot_events(self, plt, channel, legend_labels):
+        """ Mark the glitches and steps detected on `channel` (see lt_events). """
+
+        events = self.__data.get("events", {}).get(channel)
+        if events is None:
+            return
+
+        for kind, label, marker, color in (("glitch", "Glitches", "x", "black"),
+                                            ("step", "Steps", "triangle", "red")):
+            levels, meas = events[kind]
+            if not len(levels):
+                continue
+            data_source = ColumnDataSource(data=dict(
+                t=self.__data["lt_data"]["KeithleyTimeStamp"][levels, meas],
+                y=self.__data["lt_data"][channel][levels, meas]))
+            pe = plt.scatter("t", "y", source=data_source,
+                             marker=marker, color=color,
+                             size=3 * self.__settings["BOKEH"]["CIRCLE_SIZE"])
+            legend_labels.append((f"{label} ({len(levels)})", [pe]))
+
+    def __link_x_range(self, plt, name):
+        """
+        Share the x axis of the first figure of the group `name` (see
+        LINKED_AXES). Across fragments, the axes are linked in the browser.
+        """
+
+        plt.name = name
+        if name not in self.__linked:
+            self.__linked[name] = plt
+        else:
+            plt.x_range = self.__linked[name].x_range
+
     def title(self):
         """ ___ """
 
@@ -72,18 +185,23 @@ class PlotBokeh():
             _y = self.__data["lt_data"]["Current_A"][level]
             data_source = ColumnDataSource(data=dict(t=_t, y=_y))
 
+            color, alpha_1, alpha_6, size = level_style(self.__settings, level)
+
             pl = plt.line("t", "y", source=data_source,
-                          color=self.__settings["GENERAL"]["COLORS"][level],
-                          alpha=self.__settings["BOKEH"]["ALPHA_1"])
+                          color=color,
+                          alpha=alpha_1)
             pc = plt.scatter("t", "y", source=data_source,
-                            color=self.__settings["GENERAL"]["COLORS"][level],
-                            size=self.__settings["BOKEH"]["CIRCLE_SIZE"],
-                            alpha=self.__settings["BOKEH"]["ALPHA_6"])
+                            color=color,
+                            size=size,
+                            alpha=alpha_6)
 
             level_val = self.__data["lt_data"]["Level_mm"][level][0]
             legend_label = f"I(t) @ L{level_val:0.0f}mm"
             legend_labels.append((legend_label, [pl, pc]))
 
+        # Glitches and steps detected on the channel (if any).
+        self.__plot_events(plt, "Current_A", legend_labels)
+
         #
         # Format plot.
         #
@@ -99,6 +217,7 @@ class PlotBokeh():
         plt.xaxis.axis_label = "Time (s)"
         plt.yaxis.axis_label = "Current (A)"
         plt.yaxis.formatter = NumeralTickFormatter(format="0.000")
+        self.__link_x_range(plt, "lt_time_trace")
         plt.margin = self.__plot_margin
         legend = Legend(items=legend_labels, location="top_center")
         plt.add_layout(legend, "right")
@@ -107,7 +226,7 @@ class PlotBokeh():
         #
         # Append plot to HTML elements for final report.
         #
-        self.__html_elems.append(plt)
+        self.__append(plt)
 
     def plot_resistance_vs_time(self):
         """ ___ """
@@ -123,18 +242,23 @@ class PlotBokeh():
             _y = self.__data["lt_data"]["Resistance_ohm"][level]
             data_source = ColumnDataSource(data=dict(t=_t, y=_y))
 
+            color, alpha_1, alpha_6, size = level_style(self.__settings, level)
+
             pl = plt.line("t", "y", source=data_source,
-                          color=self.__settings["GENERAL"]["COLORS"][level],
-                          alpha=self.__settings["BOKEH"]["ALPHA_1"])
+                          color=color,
+                          alpha=alpha_1)
             pc = plt.scatter("t", "y", source=data_source,
-                            color=self.__settings["GENERAL"]["COLORS"][level],
-                            size=self.__settings["BOKEH"]["CIRCLE_SIZE"],
-                            alpha=self.__settings["BOKEH"]["ALPHA_6"])
+                            color=color,
+                            size=size,
+                            alpha=alpha_6)
 
             level_val = self.__data["lt_data"]["Level_mm"][level][0]
             legend_label = f"R(t) @ L{level_val:0.0f}mm"
             legend_labels.append((legend_label, [pl, pc]))
 
+        # Glitches and steps detected on the channel (if any).
+        self.__plot_events(plt, "Resistance_ohm", legend_labels)
+
         #
         # Format plot.
         #
@@ -150,7 +274,7 @@ class PlotBokeh():
         plt.xaxis.axis_label = "Time (s)"
         plt.yaxis.axis_label = "Resistance (Ω)"
         plt.yaxis.formatter = NumeralTickFormatter(format="0")
-        plt.x_range = self.__html_elems[self.__master_x_range].x_range
+        self.__link_x_range(plt, "lt_time_trace")
         plt.margin = self.__plot_margin
         legend = Legend(items=legend_labels, location="top_center")
         plt.add_layout(legend, "right")
@@ -159,7 +283,7 @@ class PlotBokeh():
         #
         # Append plot to HTML elements for final report.
         #
-        self.__html_elems.append(plt)
+        self.__append(plt)
 
     def plot_level_vs_time(self):
         """ ___ """
@@ -175,13 +299,15 @@ class PlotBokeh():
             _y = self.__data["lt_data"]["Level_mm"][level]
             data_source = ColumnDataSource(data=dict(t=_t, y=_y))
 
+            color, alpha_1, alpha_6, size = level_style(self.__settings, level)
+
             pl = plt.line("t", "y", source=data_source,
-                          color=self.__settings["GENERAL"]["COLORS"][level],
-                          alpha=self.__settings["BOKEH"]["ALPHA_1"])
+                          color=color,
+                          alpha=alpha_1)
             pc = plt.scatter("t", "y", source=data_source,
-                            color=self.__settings["GENERAL"]["COLORS"][level],
-                            size=self.__settings["BOKEH"]["CIRCLE_SIZE"],
-                            alpha=self.__settings["BOKEH"]["ALPHA_6"])
+                            color=color,
+                            size=size,
+                            alpha=alpha_6)
 
             level_val = self.__data["lt_data"]["Level_mm"][level][0]
             legend_label = f"L(t) @ L{level_val:0.0f}mm"
@@ -202,7 +328,7 @@ class PlotBokeh():
         plt.xaxis.axis_label = "Time (s)"
         plt.yaxis.axis_label = "Level (mm)"
         plt.yaxis.formatter = NumeralTickFormatter(format="0")
-        plt.x_range = self.__html_elems[self.__master_x_range].x_range
+        self.__link_x_range(plt, "lt_time_trace")
         plt.margin = self.__plot_margin
         legend = Legend(items=legend_labels, location="top_center")
         plt.add_layout(legend, "right")
@@ -211,7 +337,7 @@ class PlotBokeh():
         #
         # Append plot to HTML elements for final report.
         #
-        self.__html_elems.append(plt)
+        self.__append(plt)
 
     def plot_resistivity_vs_time(self):
         """ ___ """
@@ -222,18 +348,21 @@ class PlotBokeh():
         plt = figure(tools=self.__settings["BOKEH"]["TOOLS"])
         legend_labels = []
 
-        for level in range(self.__data["level_count"]):
-            _t = self.__data["lt_data"]["KeithleyTimeStamp"][level]
-            _y = self.__data["lt_data"]["resistivity"][level]
+        # Only levels holding valid resistivity samples are plotted, the lines
+        # are broken where samples are masked.
+        for level, meas, _y in self.__data["lt_data"]["resistivity"].iter_lines():
+            _t = self.__data["lt_data"]["KeithleyTimeStamp"][level][meas]
             data_source = ColumnDataSource(data=dict(t=_t, y=_y))
 
+            color, alpha_1, alpha_6, size = level_style(self.__settings, level)
+
             pl = plt.line("t", "y", source=data_source,
-                          color=self.__settings["GENERAL"]["COLORS"][level],
-                          alpha=self.__settings["BOKEH"]["ALPHA_1"])
+                          color=color,
+                          alpha=alpha_1)
             pc = plt.scatter("t", "y", source=data_source,
-                            color=self.__settings["GENERAL"]["COLORS"][level],
-                            size=self.__settings["BOKEH"]["CIRCLE_SIZE"],
-                            alpha=self.__settings["BOKEH"]["ALPHA_6"])
+                            color=color,
+                            size=size,
+                            alpha=alpha_6)
 
             level_val = self.__data["lt_data"]["Level_mm"][level][0]
             legend_label = f"ϱ(t) @ L{level_val:0.0f}mm"
@@ -254,7 +383,7 @@ class PlotBokeh():
         plt.xaxis.axis_label = "Time (s)"
         plt.yaxis.axis_label = "Resistivity (Ω/mm)"
         plt.yaxis.formatter = NumeralTickFormatter(format="0.000")
-        plt.x_range = self.__html_elems[self.__master_x_range].x_range
+        self.__link_x_range(plt, "lt_time_trace")
         plt.margin = self.__plot_margin
         legend = Legend(items=legend_labels, location="top_center")
         plt.add_layout(legend, "right")
@@ -263,7 +392,7 @@ class PlotBokeh():
         #
         # Append plot to HTML elements for final report.
         #
-        self.__html_elems.append(plt)
+        self.__append(plt)
 
     def plot_resistance_vs_current(self):
         """ ___ """
@@ -279,17 +408,26 @@ class PlotBokeh():
             _r = self.__data["lt_data"]["Resistance_ohm"][level]
             data_source = ColumnDataSource(data=dict(i=_i, r=_r))
 
+            color, alpha_1, alpha_6, size = level_style(self.__settings, level)
+
             pl = plt.line("i", "r", source=data_source,
-                          color=self.__settings["GENERAL"]["COLORS"][level],
-                          alpha=self.__settings["BOKEH"]["ALPHA_6"])
+                          color=color,
+                          alpha=alpha_6)
             pc = plt.scatter("i", "r", source=data_source,
-                            color=self.__settings["GENERAL"]["COLORS"][level],
-                            size=self.__settings["BOKEH"]["CIRCLE_SIZE"],
-                            alpha=self.__settings["BOKEH"]["ALPHA_1"])
+                            color=color,
+                            size=size,
+                            alpha=alpha_1)
+
+            # Fitted R(I) curve (see lt_fit), hidden together with the level.
+            renderers = [pl, pc]
+            if "fit" in self.__data and np.isfinite(self.__data["fit"]["rms"][level]):
+                renderers.append(plt.line(self.__data["fit"]["curve_i"][level],
+                                          self.__data["fit"]["curve_r"][level],
+                                          color=color, line_width=2, line_dash="dashed"))
 
             level_val = self.__data["lt_data"]["Level_mm"][level][0]
             legend_label = f"R(I) @ L{level_val:0.0f}mm"
-            legend_labels.append((legend_label, [pl, pc]))
+            legend_labels.append((legend_label, renderers))
 
         #
         # Format plot.
@@ -314,21 +452,144 @@ class PlotBokeh():
         #
         # Append plot to HTML elements for final report.
         #
-        self.__html_elems.append(plt)
+        self.__append(plt)
 
-    def write_to_html_file(self):
-        """ ___ """
+    def __plot_heatmap(self, channel, label, unit, tick_format):
+        """ Level × time raster of `channel`, drawn as a single image glyph. """
+
+        time_s, level_mm, raster = level_raster(self.__data, channel)
+        step = time_s[1] - time_s[0] if len(time_s) > 1 else 1
 
         #
-        # Create output dir if it does not exist.
+        # Create figure and plot the image. The y axis is the level index,
+        # labelled with the level values, so the levels need not be equidistant.
         #
+        plt = figure(tools=self.__settings["BOKEH"]["TOOLS"])
+        finite = raster[np.isfinite(raster)]
+        mapper = LinearColorMapper(
+            palette=self.__settings["BOKEH"]["HEATMAP_PALETTE"],
+            low=finite.min() if finite.size else 0,
+            high=finite.max() if finite.size else 1,
+            nan_color="rgba(0, 0, 0, 0)")
+        plt.image(image=[raster], x=time_s[0] - step / 2, y=-0.5,
+                  dw=len(time_s) * step, dh=len(level_mm), color_mapper=mapper)
+
+        #
+        # Format plot.
+        #
+        plt.toolbar.logo = None
+        plt.width = self.__settings["GENERAL"]["PLOT_WIDTH"]
+        plt.height = self.__settings["GENERAL"]["PLOT_HEIGHT"]
+        plt.add_layout(
+            Title(
+                text=f'{self.__data["lt_name"]} — {label} heatmap',
+                text_font_style="normal",
+                align="center"),
+            "above")
+        plt.xaxis.axis_label = "Time since level start (s)" \
+            if self.__data["resampled"]["time_base"] == "relative" else "Time (s)"
+        plt.yaxis.axis_label = "Level (mm)"
+        plt.yaxis.ticker = list(range(len(level_mm)))
+        plt.yaxis.major_label_overrides = {
+            _i: f"{level_val:0.0f}" for _i, level_val in enumerate(level_mm)}
+        plt.y_range.range_padding = 0
+        plt.x_range.range_padding = 0
+        self.__link_x_range(plt, "lt_heatmap")
+        plt.margin = self.__plot_margin
+        color_bar = ColorBar(color_mapper=mapper, title=f"{label} ({unit})",
+                             formatter=NumeralTickFormatter(format=tick_format))
+        plt.add_layout(color_bar, "right")
+
+        #
+        # Append plot to HTML elements for final report.
+        #
+        self.__append(plt)
+
+    def __heatmap_channels(self):
+        """ Resampled channels drawn as heatmaps, none without data["resampled"]. """
+
+        channels = self.__data.get("resampled", {}).get("channels", {})
+        return [channel for channel, *_format in HEATMAPS if channel in channels]
+
+    def plot_heatmaps(self, *channels):
+        """
+        Heatmaps of the resampled `channels`, all by default (requires
+        data["resampled"]).
+        """
+
+        if "resampled" not in self.__data:
+            self.__logger.debug("No resampled data, skipping heatmaps.")
+            return
+
+        channels = channels or self.__heatmap_channels()
+        for channel, label, unit, tick_format in HEATMAPS:
+            if channel in channels:
+                self.__plot_heatmap(channel, label, unit, tick_format)
+
+    def __out_file_name(self):
+        """ Report file name, the output dir is created if needed. """
+
         if not os.path.isdir(self.__settings["BOKEH"]["OUT_DIR"]):
             self.__logger.debug("Creating output dir %s",
                                 self.__settings["BOKEH"]["OUT_DIR"])
             os.mkdir(self.__settings["BOKEH"]["OUT_DIR"])
 
-        file_name = self.__settings["BOKEH"]["OUT_DIR"] + \
-            self.__data["lt_name"] + ".html"
+        return self.__settings["BOKEH"]["OUT_DIR"] + self.__data["lt_name"] + ".html"
+
+    def fragment_inputs(self, step):
+        """
+        `[(part, inputs)]` of the fragments of `step` (see lt_report): one
+        per figure, i.e. one per channel for the heatmaps.
+        """
+
+        if step != "plot_heatmaps":
+            return [(None, self.INPUTS[step])]
+        return [(channel, (HEATMAP_DATA + (f"resampled.channels.{channel}",),
+                           self.INPUTS[step][1]))
+                for channel in self.__heatmap_channels()]
+
+    def render_fragment(self, step, part=None):
+        """
+        Run `step` (for the heatmap of channel `part` only, see
+        `fragment_inputs`) and return the HTML of its figure (see lt_report).
+        """
+
+        self.__linked = {}
+        start = len(self.__html_elems)
+        getattr(self, step)(*(() if part is None else (part,)))
+        elems = self.__html_elems[start:]
+        if not elems:
+            return ""
+        script, div = components(column(children=elems, sizing_mode="stretch_width"))
+        return script + "\n" + div + "\n"
+
+    def write_fragments(self, fragments):
+        """ Write the report made of the HTML `fragments` (see lt_report). """
+
+        file_name = self.__out_file_name()
+        with ReportWriter(file_name,
+                          self.__settings["GENERAL"]["HTML_COMPRESSION"]) as html_file:
+            html_file.write(f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{self.__data["lt_name"]} • Bokeh</title>
+{CDN.render()}
+</head>
+<body>
+""")
+            for fragment in fragments:
+                html_file.write(fragment)
+            html_file.write(LINK_AXES_SCRIPT % json.dumps(LINKED_AXES))
+            html_file.write("</body>\n</html>\n")
+
+        if self.__settings["GENERAL"]["SHOW_HTML"]:
+            view(file_name)
+
+    def write_to_html_file(self):
+        """ ___ """
+
+        file_name = self.__out_file_name()
         output_file(file_name, title=f'{self.__data["lt_name"]} • Bokeh')
 
         html_out = column(children=self.__html_elems,
@@ -339,3 +600,8 @@ class PlotBokeh():
             show(html_out)
         else:
             save(html_out)
+
+        # Precompressed siblings for static file servers.
+        compress_file(file_name, self.__settings["GENERAL"]["HTML_COMPRESSION"])
+        record_written(file_name, *(f"{file_name}.{fmt}"
+                                    for fmt in self.__settings["GENERAL"]["HTML_COMPRESSION"]))
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+PLOT COMPARE
+
+Single Bokeh report comparing several datasets (see lt_compare): for each
+channel, an overlay of all the files, and the difference and the ratio to
+the reference file, level by level, on the common downsampled time grid.
+
+@author         Nicolas Jeanmonod
+@date           2026-10-19
+
+"""
+
+
+import logging
+import os
+
+import bokeh
+import numpy as np
+from bokeh.layouts import column
+from bokeh.models import ColumnDataSource, Legend, NumeralTickFormatter, Title
+from bokeh.models.widgets import Div
+from bokeh.plotting import figure, output_file, save, show
+
+from lt_compress import compress_file
+from lt_metrics import record_written
+from lt_settings import level_style
+
+
+class PlotCompare():
+    """ ___ """
+
+    # Line dash of each file, cycled.
+    DASHES = ("solid", "dashed", "dotted", "dotdash", "dashdot")
+
+    # Channel: (label, symbol, unit, tick format).
+    CHANNELS = {
+        "Current_A": ("Current", "I", "A", "0.000"),
+        "Resistance_ohm": ("Resistance", "R", "Ω", "0"),
+        "resistivity": ("Resistivity", "ϱ", "Ω/mm", "0.000"),
+    }
+
+    def __init__(self, settings, aggregate):
+        """ ___ """
+
+        self.__settings = settings
+        self.__aggregate = aggregate
+        self.__name = " vs ".join(aggregate.names)
+        self.__html_elems = []
+        self.__plot_margin = (20, 100, 20, 100)
+
+        self.__logger = logging.getLogger(__name__)
+        self.__logger.debug("bokeh %s", bokeh.__version__)
+
+    def title(self):
+        """ ___ """
+
+        title = Div(
+            text=f"""
+                <h1>{self.__name}</h1>
+                <h2>Bokeh comparison — reference {self.__aggregate.names[0]}</h2>
+                """,
+            styles={
+                "width": "100%",
+                "height": "100px",
+                "text-align": "center",
+                "text-transform": "uppercase"
+            },
+            margin=self.__plot_margin
+        )
+        self.__html_elems.append(title)
+
+    def __plot(self, channel, values, kind, files, ratio=False):
+        """
+        One line per file in `files` and level, `values` is (file, level, time).
+        `ratio`: the values are ratios, without unit.
+        """
+
+        label, symbol, unit, tick_format = self.CHANNELS[channel]
+        if ratio:
+            symbol, unit, tick_format = f"{symbol} ratio", "–", "0.000"
+        plt = figure(tools=self.__settings["BOKEH"]["TOOLS"])
+        legend_labels = []
+
+        # A single data source per figure: the time column is shared by all the lines.
+        columns = {"t": self.__aggregate.time}
+        for _f in files:
+            for level in range(len(self.__aggregate.level_mm)):
+                if np.isfinite(values[_f, level]).any():
+                    columns[f"y_{_f}_{level}"] = values[_f, level]
+        data_source = ColumnDataSource(data=columns)
+
+        for _f in files:
+            name = self.__aggregate.names[_f]
+            dash = self.DASHES[_f % len(self.DASHES)]
+            for level, level_val in enumerate(self.__aggregate.level_mm):
+                if f"y_{_f}_{level}" not in columns:
+                    continue
+                color, alpha_1, _alpha_6, _size = level_style(self.__settings, level)
+                pl = plt.line("t", f"y_{_f}_{level}", source=data_source, line_dash=dash,
+                              color=color, alpha=alpha_1)
+                legend_labels.append((f"{name} {symbol} @ L{level_val:0.0f}mm", [pl]))
+
+        #
+        # Format plot.
+        #
+        plt.toolbar.logo = None
+        plt.width = self.__settings["GENERAL"]["PLOT_WIDTH"]
+        plt.height = self.__settings["GENERAL"]["PLOT_HEIGHT"]
+        plt.add_layout(
+            Title(
+                text=f"{self.__name} — {label} {kind}",
+                text_font_style="normal",
+                align="center"),
+            "above")
+        plt.xaxis.axis_label = "Time since level start (s)"
+        plt.yaxis.axis_label = f"{label} ({unit})"
+        plt.yaxis.formatter = NumeralTickFormatter(format=tick_format)
+        if len(self.__html_elems) > 1:
+            plt.x_range = self.__html_elems[1].x_range
+        plt.margin = self.__plot_margin
+        legend = Legend(items=legend_labels, location="top_center")
+        plt.add_layout(legend, "right")
+        plt.legend.click_policy = "hide"
+
+        self.__html_elems.append(plt)
+
+    def plot_overlay(self, channel):
+        """ ___ """
+
+        files = range(len(self.__aggregate.names))
+        self.__plot(channel, self.__aggregate.channel(channel), "overlay", files)
+
+    def plot_difference(self, channel):
+        """ ___ """
+
+        files = range(1, len(self.__aggregate.names))
+        self.__plot(channel, self.__aggregate.difference(channel),
+                    f"difference to {self.__aggregate.names[0]}", files)
+
+    def plot_ratio(self, channel):
+        """ ___ """
+
+        files = range(1, len(self.__aggregate.names))
+        self.__plot(channel, self.__aggregate.ratio(channel),
+                    f"ratio to {self.__aggregate.names[0]}", files, ratio=True)
+
+    def write_to_html_file(self):
+        """ ___ """
+
+        #
+        # Create output dir if it does not exist.
+        #
+        if not os.path.isdir(self.__settings["COMPARE"]["OUT_DIR"]):
+            self.__logger.debug("Creating output dir %s",
+                                self.__settings["COMPARE"]["OUT_DIR"])
+            os.makedirs(self.__settings["COMPARE"]["OUT_DIR"])
+
+        file_name = self.__settings["COMPARE"]["OUT_DIR"] + \
+            "_vs_".join(self.__aggregate.names) + ".html"
+        output_file(file_name, title=f"{self.__name} • Bokeh")
+
+        html_out = column(children=self.__html_elems,
+                          sizing_mode="stretch_width")
+
+        if self.__settings["GENERAL"]["SHOW_HTML"]:
+            show(html_out)
+        else:
+            save(html_out)
+
+        # Precompressed siblings for static file servers.
+        compress_file(file_name, self.__settings["GENERAL"]["HTML_COMPRESSION"])
+        record_written(file_name, *(f"{file_name}.{fmt}"
+                                    for fmt in self.__settings["GENERAL"]["HTML_COMPRESSION"]))
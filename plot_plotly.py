@@ -22,15 +22,51 @@ Plotly documentation
 
 import logging
 import os
+import numpy as np
 import plotly as py
 import plotly.graph_objs as go
 import subprocess
 import sys
 
+from lt_backends import FIGURE_DATA, HEATMAP_DATA
+from lt_compress import ReportWriter
+from lt_metrics import METRICS
+from lt_resample import level_raster
+from lt_settings import level_style
+
+
+# Settings each figure depends on, see lt_report.
+FIGURE_SETTINGS = ("GENERAL.COLORS", "GENERAL.PLOT_WIDTH", "GENERAL.PLOT_HEIGHT")
+
+# Samples sent to the figures, see lt_metrics.
+POINTS_RENDERED = METRICS.counter("lt_points_rendered", "Samples drawn in the figures.")
+
+# Heatmaps: (channel, label, unit).
+HEATMAPS = (("Current_A", "Current", "A"),
+            ("Resistance_ohm", "Resistance", "Ω"),
+            ("resistivity", "Resistivity", "Ω/mm"))
+
+
+def _trace_points(trace):
+    """ Samples of a trace: the size of its largest x / y / z array. """
+
+    return max((np.size(values) for values in (getattr(trace, axis, None)
+                                                for axis in ("x", "y", "z"))
+                if values is not None), default=0)
+
 
 class PlotPlotly():
     """ ___  """
 
+    # Inputs of each step: (data paths, settings paths), see lt_report.
+    INPUTS = {
+        **{step: (paths, FIGURE_SETTINGS) for step, paths in FIGURE_DATA.items()},
+        "title": (FIGURE_DATA["title"], ()),
+        "plot_heatmaps": (FIGURE_DATA["plot_heatmaps"],
+                          FIGURE_SETTINGS + ("PLOTLY.HEATMAP_COLORSCALE",)),
+    }
+    FRAGMENT_VERSION = f"plotly {py.__version__}"
+
     def __init__(self, settings, data):
 
         self.__settings = settings
@@ -117,6 +153,41 @@ class PlotPlotly():
             "markers": 4,
         }
 
+    def __append(self, data, layout):
+        """ Create the figure of the traces `data` and append it to the HTML to be displayed. """
+
+        if METRICS.enabled:
+            POINTS_RENDERED.inc(sum(_trace_points(trace) for trace in data), backend="plotly")
+        fig = go.Figure(data=data, layout=layout).to_html(
+            full_html=False,
+            include_plotlyjs="cdn",
+            include_mathjax=False,
+            config={"scrollZoom": False})
+        self.__html_elems.append(fig)
+
+    def __event_traces(self, channel):
+        """ Marker traces of the glitches and steps detected on `channel` (see lt_events). """
+
+        events = self.__data.get("events", {}).get(channel)
+        if events is None:
+            return []
+
+        traces = []
+        for kind, label, symbol, color in (("glitch", "Glitches", "x", "black"),
+                                            ("step", "Steps", "triangle-up", "red")):
+            levels, meas = events[kind]
+            if not len(levels):
+                continue
+            traces.append(go.Scatter(
+                x=self.__data["lt_data"]["KeithleyTimeStamp"][levels, meas],
+                y=self.__data["lt_data"][channel][levels, meas],
+                mode="markers",
+                marker={"symbol": symbol, "color": color,
+                        "size": 3 * self.__SIZES["markers"]},
+                name=f"{label} ({len(levels)})"
+            ))
+        return traces
+
     def title(self):
         """ ___ """
 
@@ -146,6 +217,7 @@ class PlotPlotly():
         #
         data = []
         for level in range(self.__data["level_count"]):
+            color = level_style(self.__settings, level)[0]
             level_val = self.__data["lt_data"]["Level_mm"][level][0]
             legend_label = f"I(t) @ L{level_val:0.0f}mm"
             trace = go.Scatter(
@@ -154,14 +226,14 @@ class PlotPlotly():
                 mode="lines+markers",
                 opacity=self.__OPACITIES["lines"],
                 line={
-                    "color": self.__settings["GENERAL"]["COLORS"][level],
+                    "color": color,
                     "width": self.__WIDTHS["lines"]
                 },
                 marker={
                     "size": self.__SIZES["markers"],
                     "line": {"width": self.__WIDTHS["marker_lines"],
-                             "color": self.__settings["GENERAL"]["COLORS"][level]},
-                    "color": self.__settings["GENERAL"]["COLORS"][level],
+                             "color": color},
+                    "color": color,
                     "opacity": self.__OPACITIES["markers"],
                 },
                 name=legend_label
@@ -169,6 +241,9 @@ class PlotPlotly():
 
             data.append(trace)
 
+        # Glitches and steps detected on the channel (if any).
+        data.extend(self.__event_traces("Current_A"))
+
         #
         # Layout.
         #
@@ -200,12 +275,7 @@ class PlotPlotly():
         #
         # Create figure and append it to the HTML to be displayed.
         #
-        fig = go.Figure(data=data, layout=layout).to_html(
-            full_html=False,
-            include_plotlyjs="cdn",
-            include_mathjax=False,
-            config={"scrollZoom": False})
-        self.__html_elems.append(fig)
+        self.__append(data, layout)
 
     def plot_resistance_vs_time(self):
         """ ___ """
@@ -221,6 +291,7 @@ class PlotPlotly():
         #
         data = []
         for level in range(self.__data["level_count"]):
+            color = level_style(self.__settings, level)[0]
             level_val = self.__data["lt_data"]["Level_mm"][level][0]
             legend_label = f"R(t) @ L{level_val:0.0f}mm"
             trace = go.Scatter(
@@ -229,14 +300,14 @@ class PlotPlotly():
                 mode="lines+markers",
                 opacity=self.__OPACITIES["lines"],
                 line={
-                    "color": self.__settings["GENERAL"]["COLORS"][level],
+                    "color": color,
                     "width": self.__WIDTHS["lines"]
                 },
                 marker={
                     "size": self.__SIZES["markers"],
                     "line": {"width": self.__WIDTHS["marker_lines"],
-                             "color": self.__settings["GENERAL"]["COLORS"][level]},
-                    "color": self.__settings["GENERAL"]["COLORS"][level],
+                             "color": color},
+                    "color": color,
                     "opacity": self.__OPACITIES["markers"],
                 },
                 name=legend_label
@@ -244,6 +315,9 @@ class PlotPlotly():
 
             data.append(trace)
 
+        # Glitches and steps detected on the channel (if any).
+        data.extend(self.__event_traces("Resistance_ohm"))
+
         #
         # Layout.
         #
@@ -275,12 +349,7 @@ class PlotPlotly():
         #
         # Create figure and append it to the HTML to be displayed.
         #
-        fig = go.Figure(data=data, layout=layout).to_html(
-            full_html=False,
-            include_plotlyjs="cdn",
-            include_mathjax=False,
-            config={"scrollZoom": False})
-        self.__html_elems.append(fig)
+        self.__append(data, layout)
 
     def plot_level_vs_time(self):
         """ ___ """
@@ -296,6 +365,7 @@ class PlotPlotly():
         #
         data = []
         for level in range(self.__data["level_count"]):
+            color = level_style(self.__settings, level)[0]
             level_val = self.__data["lt_data"]["Level_mm"][level][0]
             legend_label = f"L(t) @ L{level_val:0.0f}mm"
             trace = go.Scatter(
@@ -304,14 +374,14 @@ class PlotPlotly():
                 mode="lines+markers",
                 opacity=self.__OPACITIES["lines"],
                 line={
-                    "color": self.__settings["GENERAL"]["COLORS"][level],
+                    "color": color,
                     "width": self.__WIDTHS["lines"]
                 },
                 marker={
                     "size": self.__SIZES["markers"],
                     "line": {"width": self.__WIDTHS["marker_lines"],
-                             "color": self.__settings["GENERAL"]["COLORS"][level]},
-                    "color": self.__settings["GENERAL"]["COLORS"][level],
+                             "color": color},
+                    "color": color,
                     "opacity": self.__OPACITIES["markers"],
                 },
                 name=legend_label
@@ -350,12 +420,7 @@ class PlotPlotly():
         #
         # Create figure and append it to the HTML to be displayed.
         #
-        fig = go.Figure(data=data, layout=layout).to_html(
-            full_html=False,
-            include_plotlyjs="cdn",
-            include_mathjax=False,
-            config={"scrollZoom": False})
-        self.__html_elems.append(fig)
+        self.__append(data, layout)
 
     def plot_resistivity_vs_time(self):
         """ ___ """
@@ -364,29 +429,30 @@ class PlotPlotly():
         # Prepare data source.
         #
         _x = self.__data["lt_data"]["KeithleyTimeStamp"]
-        _y = self.__data["lt_data"]["resistivity"]
 
         #
-        # Create plot.
+        # Create plot. Only levels holding valid resistivity samples are plotted,
+        # the lines are broken where samples are masked.
         #
         data = []
-        for level in range(self.__data["level_count"]):
+        for level, meas, _y in self.__data["lt_data"]["resistivity"].iter_lines():
+            color = level_style(self.__settings, level)[0]
             level_val = self.__data["lt_data"]["Level_mm"][level][0]
             legend_label = f"ϱ(t) @ L{level_val:0.0f}mm"
             trace = go.Scatter(
-                x=_x[level],
-                y=_y[level],
+                x=_x[level][meas],
+                y=_y,
                 mode="lines+markers",
                 opacity=self.__OPACITIES["lines"],
                 line={
-                    "color": self.__settings["GENERAL"]["COLORS"][level],
+                    "color": color,
                     "width": self.__WIDTHS["lines"]
                 },
                 marker={
                     "size": self.__SIZES["markers"],
                     "line": {"width": self.__WIDTHS["marker_lines"],
-                             "color": self.__settings["GENERAL"]["COLORS"][level]},
-                    "color": self.__settings["GENERAL"]["COLORS"][level],
+                             "color": color},
+                    "color": color,
                     "opacity": self.__OPACITIES["markers"],
                 },
                 name=legend_label
@@ -425,12 +491,7 @@ class PlotPlotly():
         #
         # Create figure and append it to the HTML to be displayed.
         #
-        fig = go.Figure(data=data, layout=layout).to_html(
-            full_html=False,
-            include_plotlyjs="cdn",
-            include_mathjax=False,
-            config={"scrollZoom": False})
-        self.__html_elems.append(fig)
+        self.__append(data, layout)
 
     def plot_resistance_vs_current(self):
         """ ___ """
@@ -446,6 +507,7 @@ class PlotPlotly():
         #
         data = []
         for level in range(self.__data["level_count"]):
+            color = level_style(self.__settings, level)[0]
             level_val = self.__data["lt_data"]["Level_mm"][level][0]
             legend_label = f"R(I) @ L{level_val:0.0f}mm"
             trace = go.Scatter(
@@ -454,21 +516,34 @@ class PlotPlotly():
                 mode="lines+markers",
                 opacity=self.__OPACITIES["lines"],
                 line={
-                    "color": self.__settings["GENERAL"]["COLORS"][level],
+                    "color": color,
                     "width": self.__WIDTHS["lines"]
                 },
                 marker={
                     "size": self.__SIZES["markers"],
                     "line": {"width": self.__WIDTHS["marker_lines"],
-                             "color": self.__settings["GENERAL"]["COLORS"][level]},
-                    "color": self.__settings["GENERAL"]["COLORS"][level],
+                             "color": color},
+                    "color": color,
                     "opacity": self.__OPACITIES["markers"],
                 },
-                name=legend_label
+                name=legend_label,
+                legendgroup=legend_label
             )
 
             data.append(trace)
 
+            # Fitted R(I) curve (see lt_fit), hidden together with the level.
+            if "fit" in self.__data and np.isfinite(self.__data["fit"]["rms"][level]):
+                data.append(go.Scatter(
+                    x=self.__data["fit"]["curve_i"][level],
+                    y=self.__data["fit"]["curve_r"][level],
+                    mode="lines",
+                    line={"color": color, "width": 2 * self.__WIDTHS["lines"], "dash": "dash"},
+                    name=f"{legend_label} fit",
+                    legendgroup=legend_label,
+                    showlegend=False
+                ))
+
         #
         # Layout.
         #
@@ -500,12 +575,78 @@ class PlotPlotly():
         #
         # Create figure and append it to the HTML to be displayed.
         #
-        fig = go.Figure(data=data, layout=layout).to_html(
-            full_html=False,
-            include_plotlyjs="cdn",
-            include_mathjax=False,
-            config={"scrollZoom": False})
-        self.__html_elems.append(fig)
+        self.__append(data, layout)
+
+    def __plot_heatmap(self, channel, label, unit):
+        """ Level × time raster of `channel`, drawn as a single heatmap trace. """
+
+        time_s, level_mm, raster = level_raster(self.__data, channel)
+
+        #
+        # Create plot.
+        #
+        data = [go.Heatmap(
+            x=time_s,
+            y=level_mm,
+            z=raster,
+            colorscale=self.__settings["PLOTLY"]["HEATMAP_COLORSCALE"],
+            colorbar={"title": {"text": f"{label} ({unit})"}},
+            hoverongaps=False,
+        )]
+
+        #
+        # Layout.
+        #
+        xaxis_title = "Time since level start (s)" \
+            if self.__data["resampled"]["time_base"] == "relative" else "Time (s)"
+        layout = go.Layout(
+            title={
+                "text":
+                f'<span style="font-weight:bold; text-transform:uppercase">'
+                f'{self.__data["lt_name"]} — {label} heatmap',
+                "x": 0.5,
+                "y": 0.9,
+                "xanchor": "center",
+                "yanchor": "top",
+            },
+            plot_bgcolor=self.__COLORS["background"],
+            paper_bgcolor=self.__COLORS["background"],
+            xaxis={"title": xaxis_title, "ticklen": 5, "zeroline": False, "automargin": True,
+                   "ticks": "inside",  "showline": True, "linewidth": 1,
+                   "linecolor": "black", "mirror": True, },
+            yaxis={"title": "Level (mm)", "ticklen": 5, "zeroline": False, "automargin": True,
+                   "ticks": "inside",  "showline": True, "linewidth": 1,
+                   "linecolor": "black", "mirror": True},
+            hovermode="closest",
+            height=self.__settings["GENERAL"]["PLOT_HEIGHT"],
+            width=self.__settings["GENERAL"]["PLOT_WIDTH"],
+        )
+
+        #
+        # Create figure and append it to the HTML to be displayed.
+        #
+        self.__append(data, layout)
+
+    def __heatmap_channels(self):
+        """ Resampled channels drawn as heatmaps, none without data["resampled"]. """
+
+        channels = self.__data.get("resampled", {}).get("channels", {})
+        return [channel for channel, *_format in HEATMAPS if channel in channels]
+
+    def plot_heatmaps(self, *channels):
+        """
+        Heatmaps of the resampled `channels`, all by default (requires
+        data["resampled"]).
+        """
+
+        if "resampled" not in self.__data:
+            self.__logger.debug("No resampled data, skipping heatmaps.")
+            return
+
+        channels = channels or self.__heatmap_channels()
+        for channel, label, unit in HEATMAPS:
+            if channel in channels:
+                self.__plot_heatmap(channel, label, unit)
 
     def open_file(self, filename):
         if sys.platform == "win32":
@@ -514,9 +655,42 @@ class PlotPlotly():
             opener = "open" if sys.platform == "darwin" else "xdg-open"
             subprocess.call([opener, filename])
 
+    @staticmethod
+    def __wrap(html_elem):
+        """ ___ """
+
+        return '<div class=".page-break-inside-avoid">' + html_elem + '</div>'
+
+    def fragment_inputs(self, step):
+        """
+        `[(part, inputs)]` of the fragments of `step` (see lt_report): one
+        per figure, i.e. one per channel for the heatmaps.
+        """
+
+        if step != "plot_heatmaps":
+            return [(None, self.INPUTS[step])]
+        return [(channel, (HEATMAP_DATA + (f"resampled.channels.{channel}",),
+                           self.INPUTS[step][1]))
+                for channel in self.__heatmap_channels()]
+
+    def render_fragment(self, step, part=None):
+        """
+        Run `step` (for the heatmap of channel `part` only, see
+        `fragment_inputs`) and return the HTML of its figure (see lt_report).
+        """
+
+        start = len(self.__html_elems)
+        getattr(self, step)(*(() if part is None else (part,)))
+        return "".join(self.__wrap(elem) for elem in self.__html_elems[start:])
+
     def write_to_html_file(self):
         """ ___ """
 
+        self.write_fragments([self.__wrap(elem) for elem in self.__html_elems])
+
+    def write_fragments(self, fragments):
+        """ Write the report made of the HTML `fragments` (see lt_report). """
+
         #
         # Create output dir if it does not exist.
         #
@@ -544,14 +718,13 @@ class PlotPlotly():
 <body>
 <div class="centered">"""
         end_html = "\n</div>\n</body>\n</html>"
-        html_file = open(file_name, 'w')
-        html_file.write(start_html)
-        for htmL_elem in self.__html_elems:
-            inner_html = '<div class=".page-break-inside-avoid">'
-            inner_html += htmL_elem
-            inner_html += '</div>'
-            html_file.write(inner_html)
-        html_file.write(end_html)
+        # The precompressed siblings (if any) are written along the way.
+        with ReportWriter(file_name,
+                          self.__settings["GENERAL"]["HTML_COMPRESSION"]) as html_file:
+            html_file.write(start_html)
+            for fragment in fragments:
+                html_file.write(fragment)
+            html_file.write(end_html)
 
         if self.__settings["GENERAL"]["SHOW_HTML"]:
             self.open_file(file_name)
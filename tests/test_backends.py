@@ -0,0 +1,37 @@
+"""Tests of lt_backends."""
+
+import sys
+import types
+
+import pytest
+
+from lt_backends import BACKENDS, RENDER_STEPS, Renderer, load_backend, register_backend
+
+
+@pytest.fixture(name="fake_module")
+def fixture_fake_module():
+    module = types.ModuleType("fake_backend")
+    sys.modules["fake_backend"] = module
+    yield module
+    del sys.modules["fake_backend"]
+    BACKENDS.pop("FAKE", None)
+
+
+def test_load_backend_checks_the_protocol(fake_module):
+    fake_module.Incomplete = type("Incomplete", (), {"title": lambda self: None})
+    register_backend("FAKE", "fake_backend", "Incomplete")
+
+    with pytest.raises(TypeError, match="Renderer protocol: missing plot_current_vs_time"):
+        load_backend("FAKE")
+
+
+def test_load_backend_returns_renderer(fake_module):
+    fake_module.Complete = type("Complete", (), {step: lambda self: None
+                                                 for step in RENDER_STEPS})
+    register_backend("FAKE", "fake_backend", "Complete")
+
+    assert issubclass(load_backend("FAKE"), Renderer)
+
+
+def test_registered_backends_implement_the_protocol():
+    assert issubclass(load_backend("NPZ"), Renderer)
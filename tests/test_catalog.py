@@ -0,0 +1,77 @@
+"""Tests of lt_catalog."""
+
+import gzip
+import os
+import pathlib
+import shutil
+
+import pytest
+
+import lt_catalog
+from lt_catalog import Catalog
+from lt_index import LTFormatError, read_channels, scan_index
+
+
+LT01 = pathlib.Path(__file__).parents[1] / "data" / "LT01.xml"
+
+
+def corrupt_copy(tmp_path, name):
+    """Copy of LT01 whose HePressure_mbar and Current_A hold a non-numeric token."""
+
+    text = LT01.read_text(encoding="utf-8")
+    for tag in ("HePressure_mbar", "Current_A"):
+        start = text.index(">", text.index(f"<{tag} ")) + 1
+        text = text[:start] + "abc " + text[start:].split(" ", 1)[1]
+    (tmp_path / name).write_text(text, encoding="utf-8")
+    return str(tmp_path / name)
+
+
+def test_read_channels_non_numeric(tmp_path):
+    file_name = corrupt_copy(tmp_path, "LT02.xml")
+    with pytest.raises(LTFormatError, match=r"LT02\.xml: <Current_A> holds a non-numeric"):
+        read_channels(file_name, scan_index(file_name), ("Current_A",))
+
+
+def test_update_skips_corrupt_file(tmp_path):
+    shutil.copy(LT01, tmp_path / "LT01.xml")
+    corrupt_copy(tmp_path, "LT02.xml")
+
+    with Catalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        counts = catalog.update(str(tmp_path))
+        assert counts["added"] == 1
+        assert counts["failed"] == 1
+        assert catalog.names() == ["LT01"]
+
+
+def test_update_records_decoder_errors(tmp_path, monkeypatch):
+    shutil.copy(LT01, tmp_path / "LT01.xml")
+    (tmp_path / "LT02.xml.xz").write_bytes(b"not xz data")
+    (tmp_path / "LT03.xml.gz").write_bytes(gzip.compress(LT01.read_bytes())[:5000])
+    (tmp_path / "LT04.xml.zst").write_bytes(b"not zstd data")
+    parsed = []
+    monkeypatch.setattr(lt_catalog, "file_metadata",
+                        lambda path, parse=lt_catalog.file_metadata: parsed.append(path)
+                        or parse(path))
+
+    with Catalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        counts = catalog.update(str(tmp_path))
+        assert (counts["added"], counts["failed"]) == (1, 3)
+        errors = {row["name"]: row["error"] for row in catalog.failures()}
+        assert errors["LT02"].startswith("LZMAError")
+        assert errors["LT03"].startswith("EOFError")
+        # ImportError without the zstandard package, ZstdError with it.
+        assert errors["LT04"].startswith(("ImportError", "ZstdError"))
+
+        # The unchanged bad files are not read again.
+        del parsed[:]
+        counts = catalog.update(str(tmp_path))
+        assert (counts["unchanged"], counts["failed"], parsed) == (1, 3, [])
+
+        # LT02 replaced by a valid file, LT03 deleted.
+        os.remove(tmp_path / "LT02.xml.xz")
+        shutil.copy(LT01, tmp_path / "LT02.xml")
+        os.remove(tmp_path / "LT03.xml.gz")
+        counts = catalog.update(str(tmp_path))
+        assert (counts["added"], counts["failed"]) == (1, 1)
+        assert [row["name"] for row in catalog.failures()] == ["LT04"]
+        assert catalog.names() == ["LT01", "LT02"]
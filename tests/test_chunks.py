@@ -0,0 +1,45 @@
+"""Tests of lt_chunks."""
+
+import gzip
+
+import numpy as np
+import pytest
+
+from lt_chunks import RunningStats, ValueReader
+from lt_index import LTFormatError
+
+
+def test_running_stats_match_numpy():
+    rng = np.random.default_rng(0)
+    # Large offset, as for timestamps.
+    values = 1.7e9 + rng.normal(size=(3, 1000))
+    values[1, ::7] = np.nan
+    values[2] = np.nan
+
+    stats = RunningStats(3)
+    for level in range(3):
+        for start in range(0, 1000, 128):
+            stats.update(level, values[level, start:start + 128])
+    result = stats.result()
+
+    np.testing.assert_array_equal(result["count"], [1000, 857, 0])
+    np.testing.assert_allclose(result["mean"][:2], np.nanmean(values[:2], axis=1))
+    np.testing.assert_allclose(result["std"][:2], np.nanstd(values[:2], axis=1), rtol=1e-9)
+    np.testing.assert_array_equal(result["min"][:2], np.nanmin(values[:2], axis=1))
+    np.testing.assert_array_equal(result["max"][:2], np.nanmax(values[:2], axis=1))
+    for key in ("mean", "std", "min", "max"):
+        assert np.isnan(result[key][2])
+
+
+@pytest.mark.parametrize("suffix", [".xml", ".xml.gz"])
+def test_value_reader_rejects_truncated_payload(tmp_path, suffix):
+    text = b"<Array><Val>1 2 3 4 5"
+    file_name = tmp_path / f"LT99{suffix}"
+    file_name.write_bytes(gzip.compress(text) if suffix.endswith(".gz") else text)
+    start = text.index(b"1")
+    # The index expects 10 values, the file ends after 5.
+    reader = ValueReader(str(file_name), start, start + 20)
+
+    with pytest.raises(LTFormatError, match="truncated"):
+        reader.read(10)
+    reader.close()
@@ -0,0 +1,53 @@
+"""Tests of lt_compare."""
+
+import numpy as np
+
+from lt_compare import CompareAggregate
+
+
+def _dataset(name, levels, current, resistance):
+    """Dataset of 2 levels × 3 measurements, one second apart."""
+
+    time_s = np.tile(np.arange(3.0), (2, 1)) + np.array([[0.0], [10.0]])
+    return {
+        "lt_name": name,
+        "lt_data": {
+            "Level_mm": np.repeat(np.asarray(levels, dtype=float)[:, np.newaxis], 3, axis=1),
+            "KeithleyTimeStamp": time_s,
+            "Current_A": np.asarray(current, dtype=float),
+            "Resistance_ohm": np.asarray(resistance, dtype=float),
+            "resistivity": np.asarray(resistance, dtype=float) / 100,
+        },
+    }
+
+
+def test_difference_and_ratio():
+    aggregate = CompareAggregate(3)
+    aggregate.add(_dataset("REF", [10, 20], [[1, 2, 4], [2, 2, 2]], [[10, 10, 10], [5, 5, 5]]))
+    # Levels stored in the other order, the second one missing in the reference.
+    aggregate.add(_dataset("B", [30, 10], [[9, 9, 9], [2, 3, 2]], [[1, 1, 1], [20, 5, 30]]))
+
+    np.testing.assert_array_equal(aggregate.time, [0.0, 1.0, 2.0])
+    difference = aggregate.difference("Current_A")
+    ratio = aggregate.ratio("Resistance_ohm")
+    assert difference.shape == ratio.shape == (2, 2, 3)
+
+    np.testing.assert_array_equal(difference[0], 0.0)
+    np.testing.assert_array_equal(ratio[0], 1.0)
+    np.testing.assert_allclose(difference[1, 0], [1.0, 1.0, -2.0])
+    np.testing.assert_allclose(ratio[1, 0], [2.0, 0.5, 3.0])
+    # Level 20 mm is absent from B.
+    assert np.isnan(difference[1, 1]).all()
+    assert np.isnan(ratio[1, 1]).all()
+
+
+def test_to_arrays():
+    aggregate = CompareAggregate(3)
+    aggregate.add(_dataset("REF", [10, 20], [[1, 2, 4], [2, 2, 2]], [[10, 10, 10], [5, 5, 5]]))
+    aggregate.add(_dataset("B", [10, 20], [[2, 2, 2], [2, 2, 2]], [[5, 5, 5], [5, 5, 5]]))
+
+    arrays = aggregate.to_arrays()
+
+    assert arrays["names"].tolist() == ["REF", "B"]
+    np.testing.assert_array_equal(arrays["resistivity_ratio"][1, 0], 0.5)
+    np.testing.assert_array_equal(arrays["Current_A_difference"][1, 0], [1.0, 0.0, -2.0])
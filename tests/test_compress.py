@@ -0,0 +1,39 @@
+"""Tests of lt_compress."""
+
+import gzip
+
+from lt_compress import ReportWriter, compress_file
+
+
+def test_report_writer_removes_stale_siblings(tmp_path):
+    file_name = str(tmp_path / "LT01.html")
+    with ReportWriter(file_name, ("gz",)) as html_file:
+        html_file.write("<html>old</html>")
+    assert (tmp_path / "LT01.html.gz").exists()
+
+    with ReportWriter(file_name) as html_file:
+        html_file.write("<html>new</html>")
+
+    assert (tmp_path / "LT01.html").read_text() == "<html>new</html>"
+    assert not (tmp_path / "LT01.html.gz").exists()
+
+
+def test_compress_file_removes_stale_siblings(tmp_path):
+    file_name = str(tmp_path / "LT01.html")
+    (tmp_path / "LT01.html").write_text("<html>new</html>")
+    (tmp_path / "LT01.html.gz").write_bytes(gzip.compress(b"<html>old</html>"))
+    (tmp_path / "LT01.html.br").write_bytes(b"old")
+
+    compress_file(file_name, ())
+
+    assert not (tmp_path / "LT01.html.gz").exists()
+    assert not (tmp_path / "LT01.html.br").exists()
+
+
+def test_compress_file_writes_requested_siblings(tmp_path):
+    file_name = str(tmp_path / "LT01.html")
+    (tmp_path / "LT01.html").write_text("<html>new</html>")
+
+    compress_file(file_name, ("gz",))
+
+    assert gzip.decompress((tmp_path / "LT01.html.gz").read_bytes()) == b"<html>new</html>"
@@ -0,0 +1,60 @@
+"""Tests of lt_dataset."""
+
+import pathlib
+
+import numpy as np
+import pytest
+
+from lt_dataset import LTDataset
+
+
+LT01 = pathlib.Path(__file__).parents[1] / "data" / "LT01.xml"
+
+
+@pytest.fixture(name="dataset", scope="module")
+def fixture_dataset():
+    return LTDataset.open(str(LT01))
+
+
+def test_evenly_spaced_levels_are_views(dataset):
+    full = dataset["Current_A"]
+    view = dataset.levels(slice(2, 20, 3))
+
+    values = view["Current_A"]
+
+    np.testing.assert_array_equal(view.level_indices, [2, 5, 8, 11, 14, 17])
+    np.testing.assert_array_equal(values, full[2:20:3])
+    assert np.shares_memory(values, full)
+    assert not values.flags.writeable
+
+
+def test_irregular_levels_are_copied(dataset):
+    full = dataset["Current_A"]
+
+    values = dataset.levels([1, 2, 7])["Current_A"]
+
+    np.testing.assert_array_equal(values, full[[1, 2, 7]])
+    assert not np.shares_memory(values, full)
+
+
+def test_window_bounds(dataset):
+    view = dataset.window(300, 900)
+    time_s = view["KeithleyTimeStamp"]
+    full = dataset["KeithleyTimeStamp"][view.level_indices]
+
+    assert view.shape == time_s.shape
+    inside = np.isfinite(time_s)
+    assert time_s[inside].min() >= 300 and time_s[inside].max() < 900
+    # Every sample of the window is kept.
+    expected = np.count_nonzero((full >= 300) & (full < 900), axis=1)
+    np.testing.assert_array_equal(np.count_nonzero(inside, axis=1), expected)
+    assert 0 < len(view) < len(dataset)
+
+
+def test_windows_intersect(dataset):
+    view = dataset.window(300, 900).window(600, 1200)
+
+    time_s = view["KeithleyTimeStamp"]
+
+    assert np.nanmin(time_s) >= 600 and np.nanmax(time_s) < 900
+    assert len(dataset.window(2000, 100)) == 0
@@ -0,0 +1,59 @@
+"""Tests of lt_events."""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from lt_events import fill_missing, find_glitches, find_steps, rolling_median
+
+
+def _noise(levels, meas, seed=0):
+    return np.random.default_rng(seed).normal(scale=0.01, size=(levels, meas))
+
+
+def test_glitch_found_in_level_with_nan():
+    values = _noise(3, 500)
+    values[1, 100] = 5.0
+    values[1, 200] = np.nan
+    values[2, :] = np.nan
+
+    levels, meas = find_glitches(values, 15, 6.0, 0.02)
+
+    assert list(zip(levels, meas)) == [(1, 100)]
+
+
+def test_nan_is_never_flagged():
+    values = _noise(1, 500)
+    values[0, 100:103] = np.nan
+
+    levels, _meas = find_glitches(values, 15, 6.0, 0.02)
+
+    assert len(levels) == 0
+
+
+def test_step_found_in_level_with_nan():
+    values = _noise(2, 500)
+    values[:, 250:] += 5.0
+    values[0, 30] = np.nan
+
+    levels, meas = find_steps(values, 10, 8.0, 0.02)
+
+    assert list(zip(levels, meas)) == [(0, 250), (1, 250)]
+
+
+def test_fill_missing():
+    values = np.array([[np.nan, 1.0, np.nan, 3.0], [np.nan] * 4])
+
+    filled, valid = fill_missing(values)
+
+    np.testing.assert_array_equal(filled[0], [1.0, 1.0, 1.0, 3.0])
+    assert np.isnan(filled[1]).all()
+    np.testing.assert_array_equal(valid[0], [False, True, False, True])
+
+
+def test_rolling_median_is_exact():
+    values = _noise(4, 1200)
+    for window in (3, 5, 15, 21):
+        half = window // 2
+        padded = np.pad(values, ((0, 0), (half, half)), mode="edge")
+        expected = np.median(sliding_window_view(padded, window, axis=1), axis=-1)
+        np.testing.assert_array_equal(rolling_median(values, window), expected)
@@ -0,0 +1,30 @@
+"""Tests of lt_fit."""
+
+import numpy as np
+
+from lt_fit import fit_rows
+
+
+def test_constant_current_degree_0():
+    x = np.full((2, 50), 3.0)
+    y = np.vstack((np.full(50, 2.0), np.linspace(1.0, 3.0, 50)))
+    fit = fit_rows(x, y, degree=0)
+    np.testing.assert_allclose(fit["coef"][:, 0], [2.0, 2.0])
+    np.testing.assert_allclose(fit["x_min"], [3.0, 3.0])
+
+
+def test_constant_current_degree_1():
+    x = np.full((1, 50), 3.0)
+    y = np.linspace(1.0, 3.0, 50)[np.newaxis]
+    fit = fit_rows(x, y, degree=1)
+    assert np.isnan(fit["coef"]).all()
+    assert np.isnan(fit["r2"]).all()
+
+
+def test_linear_fit_with_nan():
+    x = np.linspace(0.0, 10.0, 50)[np.newaxis]
+    y = 0.5 + 2.0 * x
+    y[0, 7] = np.nan
+    fit = fit_rows(x, y, degree=1)
+    np.testing.assert_allclose(fit["coef"][0], [0.5, 2.0])
+    assert fit["count"][0] == 49
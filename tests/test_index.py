@@ -0,0 +1,64 @@
+"""Tests of lt_index."""
+
+import pytest
+
+from lt_index import CHANNELS, LTFormatError, resolve_channels, scan_index, validate_index
+
+
+def _write_file(path, sizes=None, values="1 2 3 4 5 6"):
+    """Data file of 3 measurements × 2 levels, `sizes` overriding the size attributes."""
+
+    sizes = sizes or {}
+    elements = "".join(
+        f'\t<{channel} idx="1" type="double" size="{sizes.get(channel, "3 2")}">'
+        f"{values}</{channel}>\n"
+        for channel in CHANNELS
+    )
+    path.write_text('<?xml version="1.0"?>\n<root type="struct" size="1 1">\n'
+                    '\t<ID idx="1" type="char" size="1 4">LT99</ID>\n'
+                    f"{elements}</root>\n")
+    return str(path)
+
+
+def test_valid_file(tmp_path):
+    file_name = _write_file(tmp_path / "LT99.xml")
+
+    index = scan_index(file_name)
+
+    assert index["Current_A"]["size"] == (3, 2)
+    assert validate_index(file_name, index) == (3, 2)
+
+
+@pytest.mark.parametrize("size", ["3", "3 x", "3 2 1", "-3 2", ""])
+def test_scan_index_rejects_invalid_size(tmp_path, size):
+    file_name = _write_file(tmp_path / "LT99.xml", {"Voltage_V": size})
+
+    with pytest.raises(LTFormatError, match="invalid size .* for <Voltage_V>"):
+        scan_index(file_name)
+
+
+def test_validate_index_rejects_inconsistent_sizes(tmp_path):
+    file_name = _write_file(tmp_path / "LT99.xml", {"Current_A": "2 3"})
+
+    with pytest.raises(LTFormatError, match="inconsistent channel sizes"):
+        validate_index(file_name, scan_index(file_name))
+
+
+def test_validate_index_rejects_size_beyond_payload(tmp_path):
+    size = {channel: "300 2" for channel in CHANNELS}
+    file_name = _write_file(tmp_path / "LT99.xml", size)
+
+    with pytest.raises(LTFormatError, match="payload too short for 600 values"):
+        validate_index(file_name, scan_index(file_name))
+
+
+def test_resolve_channels_replaces_derived_channels():
+    # File order, duplicates removed, resistivity -> Level_mm + Resistance_ohm.
+    assert resolve_channels(["Resistance_ohm", "resistivity", "KeithleyTimeStamp"]) == (
+        "Level_mm", "KeithleyTimeStamp", "Resistance_ohm")
+    assert resolve_channels([]) == ()
+
+
+def test_resolve_channels_rejects_unknown_channel():
+    with pytest.raises(ValueError, match="Unknown channel 'Temperature_K'"):
+        resolve_channels(["Current_A", "Temperature_K"])
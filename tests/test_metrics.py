@@ -0,0 +1,88 @@
+"""Tests of lt_metrics."""
+
+from lt_metrics import METRICS, Registry, record_written
+
+
+def _registry():
+    registry = Registry()
+    registry.enable()
+    return registry
+
+
+def test_openmetrics_exposition():
+    registry = _registry()
+    files = registry.counter("lt_files_read", "Data files read.")
+    duration = registry.gauge("lt_run", "Duration of the run.", "seconds")
+    parse = registry.histogram("lt_parse", "Time to parse a file.", "seconds",
+                               buckets=(0.1, 1.0))
+
+    files.inc(backend='BOKEH "1"')
+    files.inc(2, backend='BOKEH "1"')
+    duration.set(1.5)
+    for value in (0.05, 0.5, 3.0):
+        parse.observe(value)
+
+    assert registry.to_openmetrics() == (
+        "# TYPE lt_files_read counter\n"
+        "# HELP lt_files_read Data files read.\n"
+        'lt_files_read_total{backend="BOKEH \\"1\\""} 3\n'
+        "# TYPE lt_run_seconds gauge\n"
+        "# UNIT lt_run_seconds seconds\n"
+        "# HELP lt_run_seconds Duration of the run.\n"
+        "lt_run_seconds 1.5\n"
+        "# TYPE lt_parse_seconds histogram\n"
+        "# UNIT lt_parse_seconds seconds\n"
+        "# HELP lt_parse_seconds Time to parse a file.\n"
+        'lt_parse_seconds_bucket{le="0.1"} 1\n'
+        'lt_parse_seconds_bucket{le="1.0"} 2\n'
+        'lt_parse_seconds_bucket{le="+Inf"} 3\n'
+        "lt_parse_seconds_sum 3.55\n"
+        "lt_parse_seconds_count 3\n"
+        "# EOF\n"
+    )
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry()
+    files = registry.counter("lt_files_read", "Data files read.")
+    parse = registry.histogram("lt_parse", "Time to parse a file.", "seconds")
+
+    files.inc()
+    with parse.time():
+        pass
+
+    assert registry.to_openmetrics() == (
+        "# TYPE lt_files_read counter\n# HELP lt_files_read Data files read.\n"
+        "# TYPE lt_parse_seconds histogram\n# UNIT lt_parse_seconds seconds\n"
+        "# HELP lt_parse_seconds Time to parse a file.\n# EOF\n")
+
+
+def test_merge_worker_snapshot():
+    worker = _registry()
+    worker.counter("lt_points_rendered", "Points rendered.").inc(100, backend="PLOTLY")
+    worker.histogram("lt_render", "Time per render step.", "seconds",
+                     buckets=(1.0,)).observe(0.5, step="title")
+    main = _registry()
+    main.counter("lt_points_rendered", "Points rendered.").inc(20, backend="PLOTLY")
+
+    main.merge(worker.snapshot())
+
+    text = main.to_openmetrics()
+    assert 'lt_points_rendered_total{backend="PLOTLY"} 120\n' in text
+    assert 'lt_render_seconds_bucket{step="title",le="1.0"} 1\n' in text
+
+
+def test_record_written(tmp_path):
+    report = tmp_path / "LT99.html"
+    report.write_text("<html></html>")
+    METRICS.enable()
+    try:
+        record_written(str(report), str(report) + ".gz")
+        text = METRICS.to_openmetrics()
+    finally:
+        METRICS.enable(False)
+        METRICS.reset()
+
+    assert 'lt_files_written_total{format="html"} 1\n' in text
+    assert 'lt_written_bytes_total{format="html"} 13\n' in text
+    assert 'format="gz"' not in text
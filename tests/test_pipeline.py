@@ -0,0 +1,72 @@
+"""Tests of lt_pipeline."""
+
+import threading
+import time
+
+import pytest
+
+from lt_pipeline import pipeline
+
+
+def _slow(delays):
+    """Stage sleeping `delays[item]` before returning the item."""
+
+    def stage(item):
+        time.sleep(delays[item])
+        return item
+    return stage
+
+
+@pytest.mark.parametrize("depth", [0, 1, 3])
+def test_order_is_kept(depth):
+    delays = [0.02, 0.0, 0.01, 0.0, 0.005]
+    stages = [_slow(delays), lambda item: item * 10, _slow([0.0] * 50)]
+
+    assert list(pipeline(range(5), stages, depth)) == [0, 10, 20, 30, 40]
+
+
+def test_next_item_is_prefetched():
+    read = [threading.Event() for _ in range(2)]
+
+    def read_stage(item):
+        read[item].set()
+        return item
+
+    results = pipeline(range(2), [read_stage], depth=1)
+    assert next(results) == 0
+    # The file 1 is read while the caller still holds the file 0.
+    assert read[1].wait(timeout=5)
+    assert list(results) == [1]
+
+
+def test_stage_error_is_raised_in_order():
+    def parse(item):
+        if item == 2:
+            raise ValueError("bad file 2")
+        return item
+
+    results = pipeline(range(5), [parse], depth=2)
+
+    assert next(results) == 0
+    assert next(results) == 1
+    with pytest.raises(ValueError, match="bad file 2"):
+        next(results)
+
+
+def test_source_error_is_raised():
+    def items():
+        yield 0
+        raise OSError("listing failed")
+
+    with pytest.raises(OSError, match="listing failed"):
+        list(pipeline(items(), [lambda item: item], depth=1))
+
+
+def test_early_close_releases_the_threads():
+    before = threading.active_count()
+    results = pipeline(range(100), [lambda item: item], depth=1)
+
+    assert next(results) == 0
+    results.close()
+
+    assert threading.active_count() == before
@@ -0,0 +1,65 @@
+"""Tests of lt_report."""
+
+import numpy as np
+
+from lt_report import do_plots_incremental
+
+
+class Renderer():
+    """Fake renderer: one trace, one heatmap per resampled channel."""
+
+    INPUTS = {
+        "plot_trace": (("lt_data.Current_A",), ("GENERAL.PLOT_WIDTH",)),
+        "plot_heatmaps": (("resampled",), ()),
+    }
+
+    def __init__(self):
+        self.written = None
+
+    def fragment_inputs(self, step):
+        if step != "plot_heatmaps":
+            return [(None, self.INPUTS[step])]
+        return [(channel, ((f"resampled.channels.{channel}",), ()))
+                for channel in ("Current_A", "resistivity")]
+
+    def render_fragment(self, step, part=None):
+        return f"<{step} {part}>"
+
+    def write_fragments(self, fragments):
+        self.written = fragments
+
+
+def _run(tmp_path, data, width=800):
+    settings = {"GENERAL": {"CACHE_DIR": str(tmp_path), "PLOT_WIDTH": width}}
+    plt = Renderer()
+    rendered = do_plots_incremental("FAKE", plt, ["plot_trace", "plot_heatmaps",
+                                                  "write_to_html_file"], data, settings)
+    return rendered, plt.written
+
+
+def _data(resistivity=1.0):
+    return {
+        "lt_name": "LT99",
+        "lt_data": {"Current_A": np.arange(4.0)},
+        "resampled": {"channels": {"Current_A": np.ones(3),
+                                   "resistivity": np.full(3, resistivity)}},
+    }
+
+
+def test_one_fragment_per_figure(tmp_path):
+    rendered, written = _run(tmp_path, _data())
+
+    assert rendered == ["plot_trace", "plot_heatmaps.Current_A", "plot_heatmaps.resistivity"]
+    assert written == ["<plot_trace None>", "<plot_heatmaps Current_A>",
+                       "<plot_heatmaps resistivity>"]
+
+
+def test_only_changed_figures_are_rendered(tmp_path):
+    _run(tmp_path, _data())
+
+    assert _run(tmp_path, _data())[0] == []
+    # A new resistivity only re-renders its heatmap.
+    rendered, written = _run(tmp_path, _data(resistivity=2.0))
+    assert rendered == ["plot_heatmaps.resistivity"]
+    assert len(written) == 3
+    assert _run(tmp_path, _data(resistivity=2.0), width=900)[0] == ["plot_trace"]
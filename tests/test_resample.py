@@ -0,0 +1,69 @@
+"""Tests of lt_resample."""
+
+import numpy as np
+import pytest
+
+from lt_resample import resample, resample_rows
+
+
+def _rows(seed=0):
+    """3 levels on irregular, increasing and far apart time bases."""
+
+    rng = np.random.default_rng(seed)
+    xp = np.cumsum(rng.uniform(0.5, 1.5, size=(3, 50)), axis=1) + np.array([[0.0], [1e3], [5.0]])
+    return xp, rng.normal(size=xp.shape)
+
+
+def test_linear_matches_np_interp_per_row():
+    xp, fp = _rows()
+    x = np.linspace(0.0, 1100.0, 2000)
+
+    out = resample_rows(x, xp, fp, "linear")
+
+    for row in range(3):
+        inside = (x >= xp[row, 0]) & (x <= xp[row, -1])
+        np.testing.assert_allclose(out[row, inside], np.interp(x[inside], xp[row], fp[row]))
+        assert np.isnan(out[row, ~inside]).all()
+
+
+def test_nearest_picks_closest_sample():
+    xp, fp = _rows()
+    x = np.linspace(xp[0, 0], xp[0, -1], 300)
+
+    out = resample_rows(x, xp[:1], fp[:1], "nearest")
+
+    expected = fp[0, np.abs(x[:, None] - xp[0]).argmin(axis=1)]
+    np.testing.assert_array_equal(out[0], expected)
+
+
+def test_bin_mean():
+    xp = np.array([[0.0, 0.4, 0.6, 1.0, 2.9], [0.0, 1.0, 2.0, 3.0, 4.0]])
+    fp = np.array([[1.0, 3.0, 5.0, np.nan, 7.0], [1.0, 2.0, 3.0, 4.0, 5.0]])
+
+    out = resample_rows(np.array([0.0, 1.0, 2.0, 3.0]), xp, fp, "bin_mean")
+
+    # Bins centered on the grid: [-0.5, 0.5), [0.5, 1.5), ...
+    np.testing.assert_array_equal(out[0, :2], [2.0, 5.0])
+    assert np.isnan(out[0, 2])
+    np.testing.assert_array_equal(out[0, 3], 7.0)
+    np.testing.assert_array_equal(out[1], [1.0, 2.0, 3.0, 4.0])
+
+
+def test_unknown_method():
+    xp, fp = _rows()
+    with pytest.raises(ValueError, match="Unknown resampling method 'cubic'"):
+        resample_rows(xp[0], xp, fp, "cubic")
+
+
+def test_relative_time_base():
+    xp, fp = _rows()
+    data = {"lt_data": {"KeithleyTimeStamp": xp, "Current_A": fp}}
+    settings = {"RESAMPLE": {"TIME_BASE": "relative", "STEP_S": 1.0,
+                             "METHOD": "linear", "CHANNELS": ("Current_A",)}}
+
+    resampled = resample(data, settings)["resampled"]
+
+    assert resampled["time"][0] == 0.0
+    np.testing.assert_array_equal(np.diff(resampled["time"]), 1.0)
+    # Each level starts at 0 s, whatever its absolute start time.
+    np.testing.assert_allclose(resampled["channels"]["Current_A"][:, 0], fp[:, 0])
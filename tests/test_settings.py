@@ -0,0 +1,27 @@
+"""Tests of lt_settings."""
+
+import lt_analysis
+from lt_settings import level_style, load_settings
+
+
+def test_level_style_cycles():
+    settings = load_settings(lt_analysis.SETTINGS)
+    colors = settings["GENERAL"]["COLORS"]
+    assert level_style(settings, 0)[0] == colors[0]
+    assert level_style(settings, len(colors) + 2) == level_style(settings, 2)
+
+
+def test_level_style_plain_dict():
+    settings = load_settings(lt_analysis.SETTINGS)
+    plain = settings.to_dict()
+    for level in (0, 5, 3 * len(plain["GENERAL"]["COLORS"]) + 1):
+        assert level_style(plain, level) == level_style(settings, level)
+
+
+def test_level_styles_are_memoised():
+    plain = load_settings(lt_analysis.SETTINGS).to_dict()
+    # The same precomputed style, not rebuilt at each call.
+    assert level_style(plain, 1) is level_style(plain, 1)
+
+    plain["GENERAL"]["COLORS"] = ["#000000"]
+    assert level_style(plain, 3)[0] == "#000000"
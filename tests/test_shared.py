@@ -0,0 +1,82 @@
+"""Tests of lt_shared."""
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from lt_shared import attach, publish
+from lt_sparse import SparseRows
+
+
+def _data():
+    dense = np.array([[1.0, np.nan, 3.0], [np.nan] * 3])
+    return {
+        "lt_name": "LT99",
+        "meas_count": np.int64(3),
+        "lt_data": {
+            "Current_A": np.arange(6.0).reshape(2, 3),
+            "Level_mm": np.array([[10, 10, 10], [20, 20, 20]], dtype=np.int32),
+            "resistivity": SparseRows.from_dense(dense),
+        },
+        "events": {"Current_A": {"glitch": (np.array([1]), np.array([2]))}},
+        "fit": None,
+    }
+
+
+def _summary(descriptor):
+    """Worker job: what the worker sees of the published data."""
+
+    with attach(descriptor) as data:
+        current = data["lt_data"]["Current_A"]
+        return (data["lt_name"], data["meas_count"], current.sum(), current.flags.writeable,
+                data["lt_data"]["Level_mm"].dtype.str,
+                data["lt_data"]["resistivity"].to_dense().tolist(),
+                type(data["events"]["Current_A"]["glitch"]).__name__)
+
+
+def _unlinked(name):
+    try:
+        shared_memory.SharedMemory(name).close()
+    except FileNotFoundError:
+        return True
+    return False
+
+
+def test_round_trip_in_worker():
+    with publish(_data()) as descriptor:
+        with multiprocessing.get_context("fork").Pool(1) as pool:
+            summary = pool.apply(_summary, (descriptor,))
+        assert not _unlinked(descriptor["shm_name"])
+
+    name, meas_count, total, writeable, dtype, resistivity, glitch_type = summary
+    assert (name, meas_count, total, writeable) == ("LT99", 3, 15.0, False)
+    assert dtype == np.dtype(np.int32).str
+    np.testing.assert_array_equal(resistivity, [[1.0, np.nan, 3.0], [np.nan] * 3])
+    assert glitch_type == "tuple"
+    assert _unlinked(descriptor["shm_name"])
+
+
+def test_attach_gives_read_only_views():
+    with publish(_data()) as descriptor:
+        with attach(descriptor) as data:
+            current = data["lt_data"]["Current_A"]
+            np.testing.assert_array_equal(current, np.arange(6.0).reshape(2, 3))
+            with pytest.raises(ValueError, match="read-only"):
+                current[0, 0] = 1.0
+            del current, data
+    assert _unlinked(descriptor["shm_name"])
+
+
+def test_segment_unlinked_on_error():
+    with pytest.raises(RuntimeError):
+        with publish(_data()) as descriptor:
+            raise RuntimeError("render failed")
+    assert _unlinked(descriptor["shm_name"])
+
+
+def test_unsupported_content():
+    with pytest.raises(TypeError, match="Cannot share a set"):
+        with publish({"channels": {"Current_A"}}):
+            pass
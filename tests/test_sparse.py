@@ -0,0 +1,33 @@
+"""Tests of lt_sparse."""
+
+import numpy as np
+
+from lt_sparse import SparseRows
+
+
+DENSE = np.array([
+    [1.0, 2.0, np.nan, np.nan, 5.0, 6.0],
+    [np.nan] * 6,
+    [1.0, 2.0, 3.0, 4.0, np.nan, np.nan],
+])
+
+
+def test_round_trip():
+    rows = SparseRows.from_dense(DENSE)
+    assert rows.levels.tolist() == [0, 2]
+    assert rows.nnz == 8
+    np.testing.assert_array_equal(rows.to_dense(), DENSE)
+    assert rows.level_mask.tolist() == [True, False, True]
+
+
+def test_iter_lines_breaks_at_gaps():
+    lines = list(SparseRows.from_dense(DENSE).iter_lines())
+    level, meas, values = lines[0]
+    assert level == 0
+    assert meas.tolist() == [0, 1, 1, 4, 5]
+    np.testing.assert_array_equal(values, [1.0, 2.0, np.nan, 5.0, 6.0])
+    # No gap: the samples are unchanged.
+    level, meas, values = lines[1]
+    assert level == 2
+    assert meas.tolist() == [0, 1, 2, 3]
+    np.testing.assert_array_equal(values, [1.0, 2.0, 3.0, 4.0])